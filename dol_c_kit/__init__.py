@@ -16,6 +16,21 @@ from dol_c_kit.doltools import assemble_ori
 from dol_c_kit.doltools import assemble_oris
 from dol_c_kit.doltools import assemble_lis
 from dol_c_kit.doltools import assemble_nop
+from dol_c_kit.doltools import assemble_mtctr
+from dol_c_kit.doltools import assemble_bctr
+from dol_c_kit.doltools import assemble_far_branch
+from dol_c_kit.doltools import branch_in_range
+from dol_c_kit.doltools import mask_fields
+from dol_c_kit.doltools import pack_words
+from dol_c_kit.doltools import assemble_branch_many
+from dol_c_kit.doltools import assemble_addi_many
+from dol_c_kit.doltools import assemble_addis_many
+from dol_c_kit.doltools import assemble_ori_many
+from dol_c_kit.doltools import assemble_oris_many
+from dol_c_kit.doltools import assemble_li_many
+from dol_c_kit.doltools import assemble_lis_many
+from dol_c_kit.doltools import assemble_nop_many
+from dol_c_kit.doltools import assemble_far_branch_many
 from dol_c_kit.doltools import write_branch
 from dol_c_kit.doltools import write_addi
 from dol_c_kit.doltools import write_addis
@@ -24,13 +39,87 @@ from dol_c_kit.doltools import write_oris
 from dol_c_kit.doltools import write_li
 from dol_c_kit.doltools import write_lis
 from dol_c_kit.doltools import write_nop
+from dol_c_kit.doltools import write_mtctr
+from dol_c_kit.doltools import write_bctr
+from dol_c_kit.doltools import write_far_branch
+from dol_c_kit.doltools import write_branch_many
+from dol_c_kit.doltools import write_addi_many
+from dol_c_kit.doltools import write_addis_many
+from dol_c_kit.doltools import write_ori_many
+from dol_c_kit.doltools import write_oris_many
+from dol_c_kit.doltools import write_li_many
+from dol_c_kit.doltools import write_lis_many
+from dol_c_kit.doltools import write_nop_many
+from dol_c_kit.doltools import write_far_branch_many
+from dol_c_kit.doltools import SectionBuffers
+from dol_c_kit.doltools import encode_relocation
+from dol_c_kit.doltools import apply_relocations
+from dol_c_kit.doltools import assemble_asm
+from dol_c_kit.doltools import UndefinedSymbolError
+from dol_c_kit.doltools import R_PPC_ADDR32
+from dol_c_kit.doltools import R_PPC_ADDR24
+from dol_c_kit.doltools import R_PPC_ADDR16
+from dol_c_kit.doltools import R_PPC_ADDR16_LO
+from dol_c_kit.doltools import R_PPC_ADDR16_HI
+from dol_c_kit.doltools import R_PPC_ADDR16_HA
+from dol_c_kit.doltools import R_PPC_ADDR14
+from dol_c_kit.doltools import R_PPC_REL24
+from dol_c_kit.doltools import R_PPC_REL14
+from dol_c_kit.doltools import R_PPC_REL32
+from dol_c_kit.doltools import R_PPC_SDAREL16
+from dol_c_kit.doltools import R_PPC_EMB_SDA2REL
+from dol_c_kit.doltools import R_PPC_EMB_SDA21
+from dol_c_kit.doltools import PS12_LO
+from dol_c_kit.doltools import PS12_HI
+from dol_c_kit.doltools import PS12_HA
+from dol_c_kit.doltools import PS12_SDAREL
+from dol_c_kit.doltools import PS12_SDA2REL
+
+from dol_c_kit.geckotools import gecko_command_write
+from dol_c_kit.geckotools import gecko_command_writes
+from dol_c_kit.geckotools import gecko_code_writes
+from dol_c_kit.geckotools import apply_runs
+from dol_c_kit.geckotools import merge_writes
+from dol_c_kit.geckotools import CacheLineSize
+from dol_c_kit.geckotools import pack_trampolines
+from dol_c_kit.geckotools import gecko_code_size
+from dol_c_kit.geckotools import optimize_gecko_commands
+from dol_c_kit.geckotools import split_zero_runs
+from dol_c_kit.geckotools import program_data_commands
+from dol_c_kit.geckotools import yaz0_compress
+from dol_c_kit.geckotools import yaz0_decompress
+from dol_c_kit.geckotools import compressed_program_data_code
+from dol_c_kit.geckotools import GCTMagic
+from dol_c_kit.geckotools import GCTTerminator
+from dol_c_kit.geckotools import write_gecko_binary
+from dol_c_kit.geckotools import write_gecko_text
+from dol_c_kit.geckotools import GeckoCodeEntry
+from dol_c_kit.geckotools import read_gecko_text
+from dol_c_kit.geckotools import read_gecko_gct
+from dol_c_kit.geckotools import save_gecko_entries
+from dol_c_kit.geckotools import load_gecko_entries
+
+from dol_c_kit.dolscan import Signature
+from dol_c_kit.dolscan import DolScanner
+from dol_c_kit.dolscan import FunctionIndex
+from dol_c_kit.dolscan import build_function_index
+from dol_c_kit.dolscan import load_function_index
+from dol_c_kit.dolscan import translate_addresses
 
 from dol_c_kit.mangle import MangleError
 from dol_c_kit.mangle import ABI
+from dol_c_kit.mangle import MangleCache
+from dol_c_kit.mangle import mangle_cache
 from dol_c_kit.mangle import LDPlusPlus
 from dol_c_kit.mangle import mangle
+from dol_c_kit.mangle import mangle_many
 from dol_c_kit.mangle import itanium_mangle
 from dol_c_kit.mangle import macintosh_mangle
+from dol_c_kit.mangle import demangle
+from dol_c_kit.mangle import demangle_many
+
+from dol_c_kit.headerscan import HeaderIndex
+from dol_c_kit.headerscan import scan_header
 
 from dol_c_kit.devkit_tools import Project
 from dol_c_kit.devkit_tools import Compiler
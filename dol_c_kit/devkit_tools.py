@@ -1,14 +1,31 @@
 import subprocess
 import os
 import platform
+import hashlib
+import glob
+import mmap
+import csv
+import json
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from enum import Enum
-from dol_c_kit import assemble_branch, write_branch, mask_field, hi, lo, hia
+from dol_c_kit import assemble_branch, write_branch, assemble_far_branch, branch_in_range, mask_field
+from dol_c_kit import DolScanner
+from dol_c_kit import optimize_gecko_commands, program_data_commands, compressed_program_data_code, gecko_code_size
+from dol_c_kit import write_gecko_binary, write_gecko_text, GCTMagic, GCTTerminator
+from dol_c_kit import read_gecko_text, read_gecko_gct, save_gecko_entries, load_gecko_entries
+from dol_c_kit import gecko_code_writes, merge_writes, apply_runs, CacheLineSize, pack_trampolines
+from dol_c_kit import SectionBuffers, apply_relocations, encode_relocation, assemble_asm, UndefinedSymbolError
+from dol_c_kit import R_PPC_ADDR32, R_PPC_ADDR16_LO, R_PPC_ADDR16_HI, R_PPC_ADDR16_HA, R_PPC_REL24, R_PPC_SDAREL16, R_PPC_EMB_SDA2REL
+from dol_c_kit import PS12_LO, PS12_HI, PS12_HA, PS12_SDAREL, PS12_SDA2REL
 
-from dolreader.dol import DolFile, write_uint32
+from dolreader.dol import DolFile
+from dolreader.exceptions import UnmappedAddressError
 from dolreader.section import Section, TextSection, DataSection
 from elftools.elf.elffile import ELFFile
 from geckolibs.gct import GeckoCodeTable
-from geckolibs.geckocode import GeckoCode, GeckoCommand, WriteBranch, Write32, WriteString, Write16
+from geckolibs.geckocode import GeckoCommand, WriteBranch, Write32, WriteString, Write16
 
 
 class Hook(object):
@@ -24,62 +41,145 @@ class Hook(object):
         if dol.is_mapped(self.addr):
             self.good = True
     
-    def write_geckocommand(self, f):
+    def write_geckocommand(self, gecko_commands):
         self.good = True
         
     def dump_info(self):
         return repr("{:s} {:08X}".format(
                     "{:13s}".format("[Hook]       "), self.addr))[+1:-1]
 
-class BranchHook(Hook):
-    def __init__(self, addr, sym_name, lk_bit):
-        Hook.__init__(self, addr)
-        self.sym_name = sym_name
-        self.lk_bit = lk_bit
-    
-    def resolve(self, symbols):
-        if self.sym_name in symbols:
-            self.data = symbols[self.sym_name]['st_value']
-    
-    def apply_dol(self, dol):
-        if self.data and dol.is_mapped(self.addr):
-            dol.seek(self.addr)
-            dol.write(assemble_branch(self.addr, self.data, LK=self.lk_bit))
-            self.good = True
-    
-    def write_geckocommand(self, f):
-        if self.data:
-            gecko_command = WriteBranch(self.data, self.addr, isLink = self.lk_bit)
-            f.write(gecko_command.as_text() + "\n")
-            self.good = True
+# Branch, pointer, and immediate hooks are stored column-wise rather than as one object apiece.
+# Projects can declare hundreds of thousands of these, all of which only differ by a few numbers.
+class HookTable(object):
+    Branch = 0
+    Pointer = 1
+    Immediate16 = 2
+    Immediate12 = 3
+    
+    Modifiers = (None, "@h", "@l", "@ha", "@sda", "@sda2")
+    
+    # (kind, modifier) : relocation type
+    Relocations = {
+        (Branch,      0) : R_PPC_REL24,
+        (Pointer,     0) : R_PPC_ADDR32,
+        (Immediate16, 1) : R_PPC_ADDR16_HI,
+        (Immediate16, 2) : R_PPC_ADDR16_LO,
+        (Immediate16, 3) : R_PPC_ADDR16_HA,
+        (Immediate16, 4) : R_PPC_SDAREL16,
+        (Immediate16, 5) : R_PPC_EMB_SDA2REL,
+        (Immediate12, 1) : PS12_HI,
+        (Immediate12, 2) : PS12_LO,
+        (Immediate12, 3) : PS12_HA,
+        (Immediate12, 4) : PS12_SDAREL,
+        (Immediate12, 5) : PS12_SDA2REL,
+    }
+    
+    def __init__(self):
+        self.addrs = array("I")
+        self.kinds = array("B")
+        self.modifiers = array("B")
+        self.flags = array("B")   # LK for branches.  i and w (i | w << 1) for 12-bit immediates.
+        self.sym_ids = array("I")
+        self.sym_names = []
+        self.sym_name_ids = {}
+        self.values = array("I")
+        self.resolved = array("B")
+        self.good = array("B")
+        self.sda_base = None
+        self.sda2_base = None
     
-    def dump_info(self):
-        return repr("{:s} {:08X} {:s} {:s}".format(
-                    "[Branchlink] " if self.lk_bit else "[Branch]     ", self.addr, "-->" if self.good else "-X>", self.sym_name))[+1:-1]
-
-class PointerHook(Hook):
-    def __init__(self, addr, sym_name):
-        Hook.__init__(self, addr)
-        self.sym_name = sym_name
+    def __len__(self):
+        return len(self.addrs)
+    
+    def append(self, kind, addr, sym_name, modifier = None, flags = 0):
+        if modifier not in HookTable.Modifiers \
+        or (kind, HookTable.Modifiers.index(modifier)) not in HookTable.Relocations:
+            raise RuntimeError("Unknown modifier: \"{}\"!  Use \"@h\", \"@l\", \"@ha\", \"@sda\", or \"@sda2\".".format(modifier))
+        if sym_name not in self.sym_name_ids:
+            self.sym_name_ids[sym_name] = len(self.sym_names)
+            self.sym_names.append(sym_name)
+        self.addrs.append(addr)
+        self.kinds.append(kind)
+        self.modifiers.append(HookTable.Modifiers.index(modifier))
+        self.flags.append(flags)
+        self.sym_ids.append(self.sym_name_ids[sym_name])
     
     def resolve(self, symbols):
-        if self.sym_name in symbols:
-            self.data = symbols[self.sym_name]['st_value']
-    
-    def apply_dol(self, dol):
-        if self.data and dol.is_mapped(self.addr):
-            dol.write_uint32(self.addr, self.data)
-            self.good = True
-    
-    def write_geckocommand(self, f):
-        if self.data:
-            gecko_command = Write32(self.data, self.addr)
-            f.write(gecko_command.as_text() + "\n")
-            self.good = True
+        # Look up each distinct symbol once, then fan the values out to every hook using it.
+        sym_values = [symbols[sym_name]['st_value'] if sym_name in symbols else None for sym_name in self.sym_names]
+        values = [sym_values[sym_id] for sym_id in self.sym_ids]
+        self.resolved = array("B", (value != None for value in values))
+        self.values = array("I", (value if value != None else 0 for value in values))
+        self.good = array("B", bytes(len(self)))
         
+        self.sda_base = symbols["_SDA_BASE_"]['st_value'] if "_SDA_BASE_" in symbols else None
+        self.sda2_base = symbols["_SDA2_BASE_"]['st_value'] if "_SDA2_BASE_" in symbols else None
+        used = {modifier for modifier, resolved in zip(self.modifiers, self.resolved) if resolved}
+        if 4 in used and self.sda_base == None:
+            raise RuntimeError("You must set this project's sda_base member before using the @sda modifier!  Check out the set_sda_bases method.")
+        if 5 in used and self.sda2_base == None:
+            raise RuntimeError("You must set this project's sda2_base member before using the @sda2 modifier!  Check out the set_sda_bases method.")
+    
+    # Resolved branch hooks whose targets are too far away for a relative branch, as (addr, target)
+    def far_branches(self):
+        for kind, addr, value, resolved in zip(self.kinds, self.addrs, self.values, self.resolved):
+            if resolved and kind == HookTable.Branch and not branch_in_range(addr, value):
+                yield addr, value
+    
+    # Every resolved hook from start to end as a relocation.  Hooks overwrite whatever was there
+    # before, so each relocation gets a template for the bits outside of its field.
+    def relocations(self, veneers = None, start = 0, end = None):
+        end = len(self) if end == None else end
+        for i in range(start, end):
+            if not self.resolved[i]:
+                continue
+            kind, addr, modifier, flags, value = self.kinds[i], self.addrs[i], self.modifiers[i], self.flags[i], self.values[i]
+            if kind == HookTable.Branch:
+                if veneers:
+                    value = veneer_target(addr, value, veneers)
+                template = (18 << 26) | (flags & 0x1)
+            elif kind == HookTable.Immediate12:
+                template = ((flags & 0x1) << 12) | ((flags >> 1) << 13)
+            else:
+                template = 0
+            yield i, (HookTable.Relocations[(kind, modifier)], addr, value, template)
+    
+    def apply_dol(self, dol, veneers = None, start = 0, end = None):
+        relocations = list(self.relocations(veneers, start, end))
+        if not relocations:
+            return
+        indices, relocations = zip(*relocations)
+        results = apply_relocations(dol, relocations, self.sda_base, self.sda2_base)
+        for i, result in zip(indices, results):
+            self.good[i] = result
+    
+    def write_geckocommand(self, gecko_commands, start = 0, end = None):
+        for i, (r_type, addr, value, template) in self.relocations(None, start, end):
+            if r_type == R_PPC_REL24:
+                gecko_command = WriteBranch(value, addr, isLink = bool(template & 0x1))
+            elif r_type == R_PPC_ADDR32:
+                gecko_command = Write32(value, addr)
+            else:
+                size, mask, field = encode_relocation(r_type, addr, value, self.sda_base, self.sda2_base)
+                gecko_command = Write16(template | field, addr)
+            gecko_commands.append(gecko_command)
+            self.good[i] = True
+    
     def dump_info(self):
-        return repr("{:s} {:08X} {:s} {:s}".format(
-                    "[Pointer]    ", self.addr, "-->" if self.good else "-X>", self.sym_name))[+1:-1]
+        lines = []
+        for kind, addr, modifier, flags, sym_id, good in zip(self.kinds, self.addrs, self.modifiers, self.flags, self.sym_ids, self.good):
+            if kind == HookTable.Branch:
+                line = "{:s} {:08X} {:s} {:s}".format(
+                       "[Branchlink] " if flags & 0x1 else "[Branch]     ", addr, "-->" if good else "-X>", self.sym_names[sym_id])
+            elif kind == HookTable.Pointer:
+                line = "{:s} {:08X} {:s} {:s}".format(
+                       "[Pointer]    ", addr, "-->" if good else "-X>", self.sym_names[sym_id])
+            else:
+                line = "{:s} {:08X} {:s} {:s} {:s}".format(
+                       "[Immediate16]" if kind == HookTable.Immediate16 else "[Immediate12]", addr, "-->" if good else "-X>",
+                       self.sym_names[sym_id], HookTable.Modifiers[modifier])
+            lines.append(repr(line)[+1:-1])
+        return "\n".join(lines)
 
 class StringHook(Hook):
     def __init__(self, addr, string, encoding, max_strlen):
@@ -95,8 +195,7 @@ class StringHook(Hook):
             if len(self.data) > self.max_strlen:
                 print("Warning: \"{:s}\" exceeds {} bytes!".format(repr(self.string)[+1:-1], self.max_strlen))
             else:
-                while len(self.data) < self.max_strlen:
-                    self.data += b'\x00'
+                self.data = self.data.ljust(self.max_strlen, b'\x00')
     
     def apply_dol(self, dol):
         if dol.is_mapped(self.addr):
@@ -104,147 +203,275 @@ class StringHook(Hook):
             dol.write(self.data)
             self.good = True
     
-    def write_geckocommand(self, f):
+    def write_geckocommand(self, gecko_commands):
         gecko_command = WriteString(self.data, self.addr)
-        f.write(gecko_command.as_text() + "\n")
+        gecko_commands.append(gecko_command)
         self.good = True
         
     def dump_info(self):
         return repr("{:s} {:08X} {:s} \"{:s}\"".format(
                     "[String]     ", self.addr, "-->" if self.good else "-X>", self.string))[+1:-1]
 
-class FileHook(Hook):
-    def __init__(self, addr, filepath, start, end, max_size):
+# Instructions assembled in-process, for patches too short to be worth a toolchain run.
+class AsmHook(Hook):
+    def __init__(self, addr, src):
         Hook.__init__(self, addr)
-        self.data = bytearray()
-        self.filepath = filepath
-        self.start = start
-        self.end = end
-        self.max_size = max_size
+        self.src = src
+        self.data = None
     
     def resolve(self, symbols):
         try:
-            with open(self.filepath, "rb") as f:
-                if self.end == None:
-                    self.data = f.read()[self.start:]
-                else:
-                    self.data = f.read()[self.start:self.end]
-                if self.max_size != None:
-                    if len(self.data) > self.max_size:
-                        print("Warning: \"{:s}\" exceeds {} bytes!".format(repr(self.filepath)[+1:-1], self.max_size))
-                    else:
-                        while len(self.data) < self.max_size:
-                            self.data += b'\x00'
-        except OSError:
-            print("Warning: \"{:s}\" could not be opened!".format(repr(self.filepath)[+1:-1]))
+            self.data = assemble_asm(self.src, self.addr, symbols)
+        except UndefinedSymbolError as e:
+            print("Warning: {}".format(e))
+            self.data = None
     
     def apply_dol(self, dol):
-        if dol.is_mapped(self.addr):
+        if self.data != None and dol.is_mapped(self.addr):
             dol.seek(self.addr)
             dol.write(self.data)
             self.good = True
     
-    def write_geckocommand(self, f):
-        gecko_command = WriteString(self.data, self.addr)
-        f.write(gecko_command.as_text() + "\n")
-        self.good = True
-        
+    def write_geckocommand(self, gecko_commands):
+        if self.data != None:
+            if len(self.data) == 4:
+                gecko_command = Write32(int.from_bytes(self.data, "big"), self.addr)
+            else:
+                gecko_command = WriteString(self.data, self.addr)
+            gecko_commands.append(gecko_command)
+            self.good = True
+    
     def dump_info(self):
-        return repr("{:s} {:08X} {:s} \"{:s}\"".format(
-                    "[File]       ", self.addr, "-->" if self.good else "-X>", self.filepath))[+1:-1]
+        return repr("{:s} {:08X} {:s} {} instructions".format(
+                    "[Asm]        ", self.addr, "-->" if self.good else "-X>", len(self.data) // 4 if self.data != None else 0))[+1:-1]
+
+# Read-only mappings of files used by FileHooks.  Many hooks tend to pull small windows out of
+# the same large archive, so each file is only opened and mapped once per build.
+class FileMappings(object):
+    def __init__(self):
+        self.mappings = {}
+    
+    def get(self, filepath):
+        if filepath not in self.mappings:
+            with open(filepath, "rb") as f:
+                # Empty files can't be mapped, but an empty bytes object behaves the same for our purposes.
+                if os.fstat(f.fileno()).st_size == 0:
+                    self.mappings[filepath] = b''
+                else:
+                    self.mappings[filepath] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.mappings[filepath]
+    
+    def close(self):
+        for mapping in self.mappings.values():
+            if isinstance(mapping, mmap.mmap):
+                mapping.close()
+        self.mappings.clear()
 
-class Immediate16Hook(Hook):
-    def __init__(self, addr, sym_name, modifier):
+class FileHook(Hook):
+    def __init__(self, addr, filepath, start, end, max_size, mappings):
         Hook.__init__(self, addr)
-        self.sym_name = sym_name
-        self.modifier = modifier
+        self.filepath = filepath
+        self.start = start
+        self.end = end
+        self.max_size = max_size
+        self.mappings = mappings
+        self.mapping = None
+        self.range = (0, 0)
+        self.size = 0
     
     def resolve(self, symbols):
-        # I wrote these fancy @h, @l, @ha functions to barely use them, lol.  When writing
-        # 16-bit immediates, you don't really need to worry about whether or not it is
-        # signed, since you're masking off any sign extension that happens regardless.
-        if self.sym_name in symbols:
-            if self.modifier == "@h":
-                self.data = hi(symbols[self.sym_name]['st_value'], True)
-            elif self.modifier == "@l":
-                self.data = lo(symbols[self.sym_name]['st_value'], True)
-            elif self.modifier == "@ha":
-                self.data = hia(symbols[self.sym_name]['st_value'], True)
-            elif self.modifier == "@sda":
-                if symbols["_SDA_BASE_"]['st_value'] == None:
-                    raise RuntimeError("You must set this project's sda_base member before using the @sda modifier!  Check out the set_sda_bases method.")
-                self.data = mask_field(symbols[self.sym_name]['st_value'] - symbols["_SDA_BASE_"]['st_value'], 16, True)
-            elif self.modifier == "@sda2":
-                if symbols["_SDA2_BASE_"]['st_value'] == None:
-                    raise RuntimeError("You must set this project's sda2_base member before using the @sda2 modifier!  Check out the set_sda_bases method.")
-                self.data = mask_field(symbols[self.sym_name]['st_value'] - symbols["_SDA2_BASE_"]['st_value'], 16, True)
+        # Only the size of the requested range is needed until the hook is applied.
+        try:
+            self.mapping = self.mappings.get(self.filepath)
+        except OSError:
+            self.mapping = None
+            print("Warning: \"{:s}\" could not be opened!".format(repr(self.filepath)[+1:-1]))
+            return
+        start, end, _ = slice(self.start, self.end).indices(len(self.mapping))
+        self.range = (start, max(start, end))
+        self.size = self.range[1] - self.range[0]
+        if self.max_size != None:
+            if self.size > self.max_size:
+                print("Warning: \"{:s}\" exceeds {} bytes!".format(repr(self.filepath)[+1:-1], self.max_size))
             else:
-                print("Unknown modifier: \"{}\"".format(self.modifier))
-            self.data = mask_field(self.data, 16, True)
+                self.size = self.max_size
+    
+    def read(self):
+        with memoryview(self.mapping) as mapping:
+            return bytes(mapping[self.range[0]:self.range[1]]).ljust(self.size, b'\x00')
     
     def apply_dol(self, dol):
-        if self.data and dol.is_mapped(self.addr):
-            dol.write_uint16(self.addr, self.data)
+        if self.mapping != None and dol.is_mapped(self.addr):
+            section = dol.resolve_address(self.addr)
+            offset = self.addr - section.address
+            if offset + self.size > section.size:
+                raise UnmappedAddressError("Write goes over current section")
+            # Copy the range straight from the mapping into the section's buffer.
+            length = self.range[1] - self.range[0]
+            with section.data.getbuffer() as buffer, memoryview(self.mapping) as mapping:
+                buffer[offset:offset+length] = mapping[self.range[0]:self.range[1]]
+                buffer[offset+length:offset+self.size] = bytes(self.size - length)
             self.good = True
     
-    def write_geckocommand(self, f):
-        if self.data:
-            gecko_command = Write16(self.data, self.addr)
-            f.write(gecko_command.as_text() + "\n")
+    def write_geckocommand(self, gecko_commands):
+        if self.mapping != None:
+            gecko_command = WriteString(self.read(), self.addr)
+            gecko_commands.append(gecko_command)
             self.good = True
         
     def dump_info(self):
-        return repr("{:s} {:08X} {:s} {:s} {:s}".format(
-                    "[Immediate16]", self.addr, "-->" if self.good else "-X>", self.sym_name, self.modifier))[+1:-1]
+        return repr("{:s} {:08X} {:s} \"{:s}\"".format(
+                    "[File]       ", self.addr, "-->" if self.good else "-X>", self.filepath))[+1:-1]
 
-# Paired-Singles Load and Store have a 12-bit immediate field, unlike normal load/store instructions
-class Immediate12Hook(Hook):
-    def __init__(self, addr, w, i, sym_name, modifier):
-        Hook.__init__(self, addr)
-        self.w = w
-        self.i = i
-        self.sym_name = sym_name
-        self.modifier = modifier
+def parse_manifest_int(val):
+    if val == None or val == "":
+        return None
+    if isinstance(val, int):
+        return val
+    return int(val, 0)
+
+# Manifests are either a CSV file with a header row, or a JSON list of objects.  Both use the columns
+# address, path, string, start, end, max_size, and encoding.  Each row has either a path or a string.
+def read_asset_manifest(filepath):
+    with open(filepath, "r", newline="") as f:
+        if filepath.lower().endswith(".json"):
+            rows = json.load(f)
+        else:
+            # Empty cells are left out, like absent keys in JSON
+            rows = [{key : val for key, val in row.items() if val != ""} for row in csv.DictReader(f)]
+    entries = []
+    for i, row in enumerate(rows):
+        addr = parse_manifest_int(row.get("address"))
+        path = row.get("path") or None
+        string = row.get("string")
+        if addr == None or (path == None and string == None):
+            raise RuntimeError("{}: entry {} needs an address and either a path or a string!".format(filepath, i))
+        start = parse_manifest_int(row.get("start"))
+        entries.append((addr, path, string, start if start != None else 0, parse_manifest_int(row.get("end")),
+                        parse_manifest_int(row.get("max_size")), row.get("encoding") or "ascii"))
+    return entries
+
+# Many files and strings from a manifest, resolved and applied in one go.  Files are read on a thread
+# pool straight into a single buffer, and the whole table is applied to the DOL as one batch.
+class AssetTableHook(Hook):
+    def __init__(self, manifest_path, jobs):
+        Hook.__init__(self, None)
+        self.manifest_path = manifest_path
+        self.entries = read_asset_manifest(manifest_path)
+        self.jobs = jobs
+        self.blob = bytearray()
+        self.layout = []
+        self.results = []
     
     def resolve(self, symbols):
-        # I wrote these fancy @h, @l, @ha functions to barely use them, lol.  When writing
-        # 16-bit immediates, you don't really need to worry about whether or not it is
-        # signed, since you're masking off any sign extension that happens regardless.
-        if self.sym_name in symbols:
-            if self.modifier == "@h":
-                self.data = hi(symbols[self.sym_name]['st_value'], True)
-            elif self.modifier == "@l":
-                self.data = lo(symbols[self.sym_name]['st_value'], True)
-            elif self.modifier == "@ha":
-                self.data = hia(symbols[self.sym_name]['st_value'], True)
-            elif self.modifier == "@sda":
-                if symbols["_SDA_BASE_"]['st_value'] == None:
-                    raise RuntimeError("You must set this project's sda_base member before using the @sda modifier!  Check out the set_sda_bases method.")
-                self.data = mask_field(symbols[self.sym_name]['st_value'] - symbols["_SDA_BASE_"]['st_value'], 16, True)
-            elif self.modifier == "@sda2":
-                if symbols["_SDA2_BASE_"]['st_value'] == None:
-                    raise RuntimeError("You must set this project's sda2_base member before using the @sda2 modifier!  Check out the set_sda_bases method.")
-                self.data = mask_field(symbols[self.sym_name]['st_value'] - symbols["_SDA2_BASE_"]['st_value'], 16, True)
+        strings = [string.encode(encoding) + b'\x00' if path == None else None
+                   for addr, path, string, start, end, max_size, encoding in self.entries]
+        
+        paths = list({path for addr, path, string, start, end, max_size, encoding in self.entries if path != None})
+        with ThreadPoolExecutor(self.jobs) as executor:
+            file_sizes = dict(zip(paths, executor.map(try_getsize, paths)))
+        
+        # Lay out the whole table and validate its sizes before reading anything.
+        self.layout = []
+        oversized = []
+        missing = set()
+        reads = {}
+        blob_size = 0
+        for (addr, path, string, start, end, max_size, encoding), data in zip(self.entries, strings):
+            if path != None:
+                if file_sizes[path] == None:
+                    missing.add(path)
+                    self.layout.append((addr, None, 0))
+                    continue
+                start, end, _ = slice(start, end).indices(file_sizes[path])
+                length = max(end - start, 0)
+                reads.setdefault(path, []).append((start, blob_size, length))
             else:
-                print("Unknown modifier: \"{}\"".format(self.modifier))
-            self.data = mask_field(self.data, 12, True)
-            self.data |= (mask_field(self.i, 1, False) << 12)
-            self.data |= (mask_field(self.w, 3, False) << 13)
+                length = len(data)
+            size = length
+            if max_size != None:
+                if length > max_size:
+                    oversized.append((path if path != None else string, max_size))
+                else:
+                    size = max_size
+            self.layout.append((addr, blob_size, size))
+            blob_size += size
+        for path in sorted(missing):
+            print("Warning: \"{:s}\" could not be opened!".format(repr(path)[+1:-1]))
+        for name, max_size in oversized:
+            print("Warning: \"{:s}\" exceeds {} bytes!".format(repr(name)[+1:-1], max_size))
+        
+        self.blob = bytearray(blob_size)
+        with memoryview(self.blob) as blob:
+            for (addr, offset, size), data in zip(self.layout, strings):
+                if data != None:
+                    blob[offset:offset+len(data)] = data
+            with ThreadPoolExecutor(self.jobs) as executor:
+                read = dict(zip(reads, executor.map(lambda path: read_ranges(path, reads[path], blob), reads)))
+        
+        # A file can still fail to open after its size was read, so its entries are skipped too.
+        unreadable = {path for path in read if not read[path]}
+        for path in sorted(unreadable):
+            print("Warning: \"{:s}\" could not be opened!".format(repr(path)[+1:-1]))
+        self.layout = [(addr, None, 0) if entry[1] in unreadable else (addr, offset, size)
+                       for entry, (addr, offset, size) in zip(self.entries, self.layout)]
     
     def apply_dol(self, dol):
-        if self.data and dol.is_mapped(self.addr):
-            dol.write_uint16(self.addr, self.data)
-            self.good = True
+        self.results = [False] * len(self.layout)
+        with SectionBuffers(dol) as buffers, memoryview(self.blob) as blob:
+            for i in sorted(range(len(self.layout)), key=lambda i: self.layout[i][0]):
+                addr, offset, size = self.layout[i]
+                if offset == None:
+                    continue
+                buffer, buffer_offset = buffers.locate(addr, size)
+                if buffer != None:
+                    buffer[buffer_offset:buffer_offset+size] = blob[offset:offset+size]
+                    self.results[i] = True
+        self.good = all(self.results)
+    
+    def write_geckocommand(self, gecko_commands):
+        self.results = [False] * len(self.layout)
+        for i, (addr, offset, size) in enumerate(self.layout):
+            if offset != None:
+                gecko_command = WriteString(bytes(self.blob[offset:offset+size]), addr)
+                gecko_commands.append(gecko_command)
+                self.results[i] = True
+        self.good = all(self.results)
     
-    def write_geckocommand(self, f):
-        if self.data:
-            gecko_command = Write16(self.data, self.addr)
-            f.write(gecko_command.as_text() + "\n")
-            self.good = True
-        
     def dump_info(self):
-        return repr("{:s} {:08X} {:s} {:s} {:s}".format(
-                    "[Immediate12]", self.addr, "-->" if self.good else "-X>", self.sym_name, self.modifier))[+1:-1]
+        lines = []
+        for (addr, path, string, start, end, max_size, encoding), good in zip(self.entries, self.results or [False] * len(self.entries)):
+            lines.append(repr("{:s} {:08X} {:s} \"{:s}\"".format(
+                         "[File]       " if path != None else "[String]     ", addr, "-->" if good else "-X>", path if path != None else string))[+1:-1])
+        return "\n".join(lines)
+
+# Branch through a veneer when the target itself is out of reach.  The veneer is in the new
+# section, which must be in reach instead.
+def veneer_target(addr, target_addr, veneers):
+    if branch_in_range(addr, target_addr) or target_addr not in veneers:
+        return target_addr
+    veneer_addr = veneers[target_addr]
+    if not branch_in_range(addr, veneer_addr):
+        raise RuntimeError("The branch at {:08X} can't reach {:08X}, nor its veneer at {:08X}!  "
+                           "The base address must be within 32 MiB of every far branch hook.".format(addr, target_addr, veneer_addr))
+    return veneer_addr
+
+def try_getsize(filepath):
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return None
+
+# Returns whether or not the file could be read
+def read_ranges(filepath, ranges, blob):
+    try:
+        with open(filepath, "rb") as f:
+            for start, offset, length in ranges:
+                f.seek(start)
+                f.readinto(blob[offset:offset+length])
+    except OSError:
+        return False
+    return True
 
 def find_rom_end(dol):
     rom_end = 0x80000000
@@ -260,6 +487,39 @@ def try_remove(filepath):
     except FileNotFoundError:
         return False
 
+# Growing an empty BytesIO zero-fills it in place.  BytesIO(bytes(size)) would instead have to
+# copy the zeroes the first time getbuffer() is called.
+def allocate_section_data(size):
+    data = BytesIO()
+    if size > 0:
+        data.seek(size - 1)
+        data.write(b'\x00')
+        data.seek(0)
+    return data
+
+def file_digest(filepath):
+    try:
+        sha256 = hashlib.sha256()
+        with open(filepath, "rb") as f:
+            for chunk in iter(lambda: f.read(0x100000), b''):
+                sha256.update(chunk)
+    except OSError:
+        return None
+    return sha256.hexdigest()
+
+# Code lists are cached under a name from their path, so editing one replaces its cache
+def gecko_cache_name(filepath):
+    return "gecko_{}.gcl".format(hashlib.sha256(os.path.abspath(filepath).encode("utf-8")).hexdigest()[:16])
+
+# Returns False if the file already holds identical data, in which case it is left untouched.
+# Only a file of the same size is read back, a chunk at a time.
+def write_if_changed(filepath, data):
+    if try_getsize(filepath) == len(data) and file_digest(filepath) == hashlib.sha256(data).hexdigest():
+        return False
+    with open(filepath, "wb") as f:
+        f.write(data)
+    return True
+
 SupportedGeckoCodetypes = [
     GeckoCommand.Type.WRITE_8,
     GeckoCommand.Type.WRITE_16,
@@ -337,9 +597,16 @@ class Project(object):
         
         # Patches member variables
         self.hooks = []
+        self.symbol_hooks = HookTable()
+        # How many symbol hooks were declared before each of self.hooks, so that both are applied
+        # in the order they were declared
+        self.hook_positions = []
         self.gecko_codetable = GeckoCodeTable(gameName=self.project_name)
         self.gecko_code_metadata = []
+        self.gecko_cache_files = set()
         self.osarena_patcher = None
+        self.file_mappings = FileMappings()
+        self.scanner = None
         
         # For one-time messages
         self.message_flags = [0,0,0,0,0,0,0,0,0,0,0,0]
@@ -361,39 +628,66 @@ class Project(object):
     def add_linker_script_file(self, filepath):
         self.linker_script_files.append(filepath)
     
+    # Parsed code lists are cached in obj_dir, one file for each code list, and only parsed again
+    # when their digest changes.
     def add_gecko_txt_file(self, filepath):
-        with open(filepath, "r") as f:
-            gecko_codetable = GeckoCodeTable.from_text(f)
-        for gecko_code in gecko_codetable:
-            self.gecko_codetable.add_child(gecko_code)
+        digest = file_digest(filepath)
+        cache_path = self.obj_dir + gecko_cache_name(filepath)
+        self.gecko_cache_files.add(cache_path)
+        entries = None
+        if digest != None:
+            try:
+                entries = load_gecko_entries(cache_path, digest)
+            except (OSError, RuntimeError):
+                pass
+        if entries == None:
+            with open(filepath, "r") as f:
+                entries = read_gecko_text(f)
+            try:
+                save_gecko_entries(cache_path, entries, digest)
+            except OSError:
+                print("Warning: \"{:s}\" could not be opened!".format(repr(cache_path)[+1:-1]))
+        for entry in entries:
+            self.gecko_codetable.add_child(entry.materialize())
     
     def add_gecko_gct_file(self, filepath):
         with open(filepath, "rb") as f:
-            code_table = GeckoCodeTable.from_bytes(f)
-        self.gecko_codetable.append(code_table)
+            entries = read_gecko_gct(f, os.path.basename(filepath))
+        for entry in entries:
+            self.gecko_codetable.add_child(entry.materialize())
     
     # Hook stuff
     
     def hook_branch(self, addr, sym_name, LK=False):
-        self.hooks.append(BranchHook(addr, sym_name, LK))
+        self.symbol_hooks.append(HookTable.Branch, addr, sym_name, flags = int(bool(LK)))
     
     def hook_branchlink(self, addr, sym_name):
         self.hook_branch(addr, sym_name, LK=True)
     
     def hook_pointer(self, addr, sym_name):
-        self.hooks.append(PointerHook(addr, sym_name))
+        self.symbol_hooks.append(HookTable.Pointer, addr, sym_name)
     
     def hook_string(self, addr, string, encoding = "ascii", max_strlen = None):
-        self.hooks.append(StringHook(addr, string, encoding, max_strlen))
+        self.__add_hook(StringHook(addr, string, encoding, max_strlen))
     
     def hook_file(self, addr, filepath, start = 0, end = None, max_size = None):
-        self.hooks.append(FileHook(addr, filepath, start, end, max_size))
+        self.__add_hook(FileHook(addr, filepath, start, end, max_size, self.file_mappings))
+    
+    def hook_table(self, manifest_path, jobs = None):
+        self.__add_hook(AssetTableHook(manifest_path, jobs))
+    
+    def hook_asm(self, addr, src):
+        self.__add_hook(AsmHook(addr, src))
     
     def hook_immediate16(self, addr, sym_name, modifier):
-        self.hooks.append(Immediate16Hook(addr, sym_name, modifier))
+        self.symbol_hooks.append(HookTable.Immediate16, addr, sym_name, modifier)
     
     def hook_immediate12(self, addr, w, i, sym_name, modifier):
-        self.hooks.append(Immediate12Hook(addr, w, i, sym_name, modifier))
+        self.symbol_hooks.append(HookTable.Immediate12, addr, sym_name, modifier, mask_field(i, 1, False) | mask_field(w, 3, False) << 1)
+    
+    def __add_hook(self, hook):
+        self.hooks.append(hook)
+        self.hook_positions.append(len(self.symbol_hooks))
     
     # Set stuff
     
@@ -404,6 +698,16 @@ class Project(object):
         self.sda_base = sda_base
         self.sda2_base = sda2_base
     
+    def set_scan_dol(self, dol_path):
+        with open(dol_path, "rb") as f:
+            self.scanner = DolScanner(DolFile(f))
+    
+    # Look up a hook address by signature instead of hardcoding it
+    def find(self, signature, offset = 0):
+        if self.scanner == None:
+            raise RuntimeError("You must set this project's scan DOL before using find!  Check out the set_scan_dol method.")
+        return self.scanner.find(signature, offset)
+    
     # Do stuff
     
     def build_dol(self, in_dol_path, out_dol_path):
@@ -418,100 +722,238 @@ class Project(object):
         if self.base_addr % 32:
             print("WARNING!  DOL sections must be 32-byte aligned for OSResetSystem to work properly!\n")
         
-        datablob = bytearray()
-
+        # The injected section is laid out up front so that it can be filled in place.  Growing it
+        # piecemeal means reallocating (and copying) the whole thing for every asset and trampoline.
+        bin_size = 0
         if self.__build_project() == True:
-            with open(self.obj_dir+self.project_name+".bin", "rb") as f:
-                datablob += f.read()
-                while (len(datablob) % 4) != 0:
-                    datablob += b'\x00'
+            bin_size = os.path.getsize(self.obj_dir+self.project_name+".bin")
+        veneers_offset = (bin_size + 3) & ~3
         
+        # One pass over each code checks its codetypes and gathers its trampolines
+        gecko_layout = []
+        inserts = []
         for gecko_code in self.gecko_codetable:
             status = "ENABLED" if gecko_code.is_enabled() else "DISABLED"
+            unsupported = []
+            code_inserts = []
             if gecko_code.is_enabled() == True:
                 for gecko_command in gecko_code:
                     if gecko_command.codetype not in SupportedGeckoCodetypes:
-                        status = "OMITTED"
+                        unsupported.append(gecko_command)
+                    elif gecko_command.codetype == GeckoCommand.Type.ASM_INSERT \
+                    or gecko_command.codetype == GeckoCommand.Type.ASM_INSERT_XOR:
+                        code_inserts.append(gecko_command)
+                if unsupported:
+                    status = "OMITTED"
             
             print("[GeckoCode]   {:12s} ${}".format(status, gecko_code.name))
             if status == "OMITTED":
                 print("Includes unsupported codetypes:")
-                for gecko_command in gecko_code:
-                    if gecko_command.codetype not in SupportedGeckoCodetypes:
-                        print(gecko_command)
+                for gecko_command in unsupported:
+                    print(gecko_command)
             
-            vaddress = self.base_addr + len(datablob)
-            geckoblob = bytearray()
+            gecko_layout.append((status, gecko_code))
+            if status == "ENABLED":
+                inserts.extend(code_inserts)
+        
+        # Trampolines are packed into cache lines, so the first one starts on a line of its own
+        trampoline_offsets, trampolines_size = pack_trampolines(inserts)
+        trampolines_align = CacheLineSize if trampolines_size else 1
+        
+        # Branch hooks that can't reach their target go through a veneer, one per distinct target,
+        # placed between the program and the trampolines.  Nothing is written until every hook is
+        # known to reach its veneer.
+        self.symbol_hooks.resolve(self.symbols)
+        far_branches = list(self.symbol_hooks.far_branches())
+        far_targets = sorted({target_addr for addr, target_addr in far_branches})
+        veneers = {target_addr : self.base_addr + veneers_offset + i*16 for i, target_addr in enumerate(far_targets)}
+        for addr, target_addr in far_branches:
+            veneer_target(addr, target_addr, veneers)
+        trampolines_offset = veneers_offset + len(veneers)*16
+        trampolines_offset += -(self.base_addr + trampolines_offset) % trampolines_align
+        self.__check_trampolines(inserts, trampoline_offsets, self.base_addr + trampolines_offset)
+        datablob_size = trampolines_offset + trampolines_size
+        
+        section_data = allocate_section_data(datablob_size)
+        datablob = section_data.getbuffer()
+        
+        if bin_size:
+            with open(self.obj_dir+self.project_name+".bin", "rb") as f:
+                f.readinto(datablob[:bin_size])
+        
+        for target_addr, veneer_addr in veneers.items():
+            offset = veneer_addr - self.base_addr
+            datablob[offset:offset+16] = assemble_far_branch(target_addr)
+            print("[Veneer]      {:08X} --> {:08X}".format(veneer_addr, target_addr))
+        
+        # Inserts come back out of the packer in the same order they went in
+        trampoline_offsets = iter(trampoline_offsets)
+        for status, gecko_code in gecko_layout:
             gecko_command_metadata = []
             
             for gecko_command in gecko_code:
                 if gecko_command.codetype == GeckoCommand.Type.ASM_INSERT \
                 or gecko_command.codetype == GeckoCommand.Type.ASM_INSERT_XOR:
-                    if status == "UNUSED" \
-                    or status == "OMITTED":
-                        gecko_command_metadata.append((0, len(gecko_command.value), status, gecko_command))
+                    offset = next(trampoline_offsets) if status == "ENABLED" else None
+                    if offset == None:
+                        # Disabled, omitted, or superseded by a later insert at the same address
+                        gecko_command_metadata.append((0, len(gecko_command.value), "UNUSED" if status == "ENABLED" else status, gecko_command))
                     else:
-                        dol.seek(gecko_command._address | 0x80000000)
-                        write_branch(dol, vaddress + len(geckoblob))
-                        gecko_command_metadata.append((vaddress + len(geckoblob), len(gecko_command.value), status, gecko_command))
-                        geckoblob += gecko_command.value[:-4]
-                        geckoblob += assemble_branch(vaddress + len(geckoblob), gecko_command._address + 4 | 0x80000000)
-            datablob += geckoblob
+                        offset += trampolines_offset
+                        hook_addr = gecko_command._address | 0x80000000
+                        dol.seek(hook_addr)
+                        write_branch(dol, self.base_addr + offset)
+                        gecko_command_metadata.append((self.base_addr + offset, len(gecko_command.value), status, gecko_command))
+                        body = memoryview(gecko_command.value)[:-4]
+                        datablob[offset:offset+len(body)] = body
+                        offset += len(body)
+                        datablob[offset:offset+4] = assemble_branch(self.base_addr + offset, hook_addr + 4)
             if gecko_command_metadata:
-                self.gecko_code_metadata.append((vaddress, len(geckoblob), status, gecko_code, gecko_command_metadata))
-        self.gecko_codetable.apply(dol)
+                used = [(cmd_vaddr, cmd_size) for cmd_vaddr, cmd_size, cmd_status, cmd in gecko_command_metadata if cmd_vaddr]
+                vaddress = min(used)[0] if used else 0
+                size = sum(cmd_size for cmd_vaddr, cmd_size in used)
+                self.gecko_code_metadata.append((vaddress, size, status, gecko_code, gecko_command_metadata))
+        datablob.release()
         
-        for hook in self.hooks:
-            hook.resolve(self.symbols)
-            hook.apply_dol(dol)
-            if self.verbose:
-                print(hook.dump_info())
+        # Every write the codes make is gathered, merged into runs, and copied into the sections
+        # in one go, rather than seeking and writing through the DolFile for each command.
+        gecko_codes = [gecko_code for status, gecko_code in gecko_layout if status == "ENABLED" and gecko_code.is_preapplicable()]
+        with SectionBuffers(dol) as buffers:
+            apply_runs(buffers, merge_writes(gecko_code_writes(gecko_codes)))
+        
+        # Symbol hooks are applied in batches between the other hooks, in the order they were all
+        # declared, so a later hook always overwrites an earlier one.
+        try:
+            start = 0
+            for hook, end in zip(self.hooks, self.hook_positions):
+                self.symbol_hooks.apply_dol(dol, veneers, start, end)
+                start = end
+                hook.resolve(self.symbols)
+                hook.apply_dol(dol)
+                if self.verbose:
+                    print(hook.dump_info())
+            self.symbol_hooks.apply_dol(dol, veneers, start)
+            if self.verbose and len(self.symbol_hooks):
+                print(self.symbol_hooks.dump_info())
+        finally:
+            self.file_mappings.close()
         
-        if len(datablob) > 0:
+        if datablob_size > 0:
             new_section: Section
             if len(dol.textSections) <= DolFile.MaxTextSections:
-                new_section = TextSection(self.base_addr, datablob)
+                new_section = TextSection(self.base_addr, section_data)
             elif len(dol.dataSections) <= DolFile.MaxDataSections:
-                new_section = DataSection(self.base_addr, datablob)
+                new_section = DataSection(self.base_addr, section_data)
             else:
                 raise RuntimeError("DOL is full!  Cannot allocate any new sections.")
             dol.append_section(new_section)
             
             if self.osarena_patcher:
-                self.osarena_patcher(dol, self.base_addr + len(datablob))
+                self.osarena_patcher(dol, self.base_addr + datablob_size)
         
-        with open(out_dol_path, "wb") as f:
-            dol.save(f)
-    
-    def build_gecko(self, gecko_path):
-        with open(gecko_path, "w") as f:
-            datablob = bytearray()
-            
-            if self.__build_project() == True:
-                with open(self.obj_dir+self.project_name+".bin", "rb") as bin:
-                    datablob += bin.read()
-            
-            f.write("[Gecko]\n")
-            # Everything gets shoved into a large Gecko Code named after the project
-            f.write("${}\n".format(self.project_name))
-            # Copy existing Gecko Codes
-            for gecko_code in self.gecko_codetable:
-                if gecko_code.is_enabled():
-                    f.write("* {}\n".format(gecko_code.name))
-                    f.write("{}\n".format(gecko_code.as_text()))
-                print("[GeckoCode]   {:12s} ${}".format("ENABLED" if gecko_code.is_enabled() else "DISABLED", gecko_code.name))
-            # Create Program Data megacode
-            if datablob:
-                gecko_command = WriteString(datablob, self.base_addr)
-                f.write("* Program Data\n")
-                f.write(gecko_command.as_text() + "\n")
-            # Create Hooks
-            f.write("* Hooks\n")
-            for hook in self.hooks:
+        # Rewriting an identical DOL needlessly bumps its mtime, which invalidates Dolphin's caches.
+        out_dol = BytesIO()
+        dol.save(out_dol)
+        if not write_if_changed(out_dol_path, out_dol.getbuffer()):
+            print("{} is unchanged, skipping write.".format(out_dol_path))
+    
+    # C2 codes can be anywhere in a function, where r12 and ctr may be live, so they can't go
+    # through a veneer.  Every one has to reach its trampoline, and be reached from it, directly.
+    def __check_trampolines(self, inserts, trampoline_offsets, trampolines_addr):
+        for gecko_command, offset in zip(inserts, trampoline_offsets):
+            if offset == None:
+                continue
+            addr = trampolines_addr + offset
+            hook_addr = gecko_command._address | 0x80000000
+            if not branch_in_range(hook_addr, addr) \
+            or not branch_in_range(addr + len(gecko_command.value) - 4, hook_addr + 4):
+                raise RuntimeError("The C2 code at {:08X} can't reach its trampoline at {:08X}!  "
+                                   "The base address must be within 32 MiB of every C2 code.".format(hook_addr, addr))
+    
+    def build_gecko(self, gecko_path, optimize = False, zero_threshold = None, zeroed = True, compress = False, budget = None):
+        datablob = bytearray()
+        
+        if self.__build_project() == True:
+            with open(self.obj_dir+self.project_name+".bin", "rb") as bin:
+                datablob += bin.read()
+        
+        # Everything gets shoved into a large Gecko Code named after the project, as a list of
+        # (comment, commands)
+        sections = []
+        # Copy existing Gecko Codes
+        for gecko_code in self.gecko_codetable:
+            if gecko_code.is_enabled():
+                sections.append((gecko_code.name, list(gecko_code)))
+            print("[GeckoCode]   {:12s} ${}".format("ENABLED" if gecko_code.is_enabled() else "DISABLED", gecko_code.name))
+        # Create Program Data megacode
+        program_data = []
+        if datablob and compress:
+            # Unpacked once at boot by a C0 code, instead of rewritten every frame
+            program_data = [compressed_program_data_code(self.base_addr, datablob)]
+            print("[Gecko]       Program Data: {} bytes, {} compressed".format(
+                  gecko_code_size([WriteString(bytes(datablob), self.base_addr)]), gecko_code_size(program_data)))
+        elif datablob:
+            program_data = program_data_commands(self.base_addr, datablob, zero_threshold, zeroed)
+            if zero_threshold != None:
+                print("[Gecko]       Program Data: {} bytes, {} after splitting at zero runs".format(
+                      gecko_code_size([WriteString(bytes(datablob), self.base_addr)]), gecko_code_size(program_data)))
+        # Create Hooks
+        hooks = []
+        try:
+            self.symbol_hooks.resolve(self.symbols)
+            start = 0
+            for hook, end in zip(self.hooks, self.hook_positions):
+                self.symbol_hooks.write_geckocommand(hooks, start, end)
+                start = end
                 hook.resolve(self.symbols)
-                hook.write_geckocommand(f)
+                hook.write_geckocommand(hooks)
                 if self.verbose:
                     print(hook.dump_info())
+            self.symbol_hooks.write_geckocommand(hooks, start)
+            if self.verbose and len(self.symbol_hooks):
+                print(self.symbol_hooks.dump_info())
+        finally:
+            self.file_mappings.close()
+        
+        if optimize:
+            # The handler runs the list every frame, so merge writes into as few codes as possible
+            if compress:
+                # The Program Data must be unpacked before any hooks write into it
+                gecko_commands = program_data + optimize_gecko_commands(hooks)
+            else:
+                gecko_commands = optimize_gecko_commands(program_data + hooks)
+            print("[Gecko]       Program Data and Hooks: {} bytes, {} after optimization".format(
+                  gecko_code_size(program_data + hooks), gecko_code_size(gecko_commands)))
+            sections.append(("Program Data and Hooks", gecko_commands))
+        else:
+            if program_data:
+                sections.append(("Program Data", program_data))
+            sections.append(("Hooks", hooks))
+        
+        # A .gct is written as a binary code table, anything else as a textual code list.  Both
+        # are streamed command by command.
+        binary = gecko_path.lower().endswith(".gct")
+        size = len(GCTMagic) + len(GCTTerminator)
+        with open(gecko_path, "wb" if binary else "w") as f:
+            if binary:
+                f.write(GCTMagic)
+            else:
+                f.write("[Gecko]\n")
+                f.write("${}\n".format(self.project_name))
+            for name, gecko_commands in sections:
+                if not binary:
+                    f.write("* {}\n".format(name))
+                for gecko_command in gecko_commands:
+                    size += write_gecko_binary(f, gecko_command) if binary else write_gecko_text(f, gecko_command)
+            if binary:
+                f.write(GCTTerminator)
+        
+        if budget == None:
+            print("[Gecko]       Code list: {} bytes".format(size))
+        else:
+            print("[Gecko]       Code list: {} of {} bytes ({:.1f}%)".format(size, budget, size * 100 / budget))
+            if size > budget:
+                print("Warning: Gecko code list is {} bytes over budget".format(size - budget))
     
     def save_map(self, map_path):
         with open(map_path, "w") as map:
@@ -561,7 +1003,7 @@ class Project(object):
                     for cmd_vaddr, cmd_size, cmd_status, gecko_command in gecko_command_metadata:
                         if gecko_command.codetype == GeckoCommand.Type.ASM_INSERT \
                         or gecko_command.codetype == GeckoCommand.Type.ASM_INSERT_XOR:
-                            if cmd_status == "OMITTED":
+                            if cmd_vaddr == 0:
                                 map.write("  UNUSED   {:06X} ........ {}${}\n".format(
                                     cmd_size, gecko_code.name, i))
                             else:
@@ -585,6 +1027,10 @@ class Project(object):
         try_remove(self.obj_dir+self.project_name+".o")
         try_remove(self.obj_dir+self.project_name+".bin")
         try_remove(self.obj_dir+self.project_name+".map")
+        # Caches of code lists that are no longer in the project
+        for cache_path in glob.glob(glob.escape(self.obj_dir) + "gecko_*.gcl"):
+            if cache_path not in self.gecko_cache_files:
+                try_remove(cache_path)
         self.obj_files.clear()
         self.symbols.clear()
         self.gecko_code_metadata.clear()
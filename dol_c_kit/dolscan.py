@@ -0,0 +1,354 @@
+import hashlib
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from itertools import compress
+
+# A pattern of instruction words, where each word is either 8 hex digits with "?" for wildcard
+# nibbles (48?????? matches any branch), or value/mask for bit-level masks (48000001/FC000003
+# matches any bl).
+class Signature(object):
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.values = array("I")
+        self.masks = array("I")
+        for token in pattern.split():
+            if "/" in token:
+                value, mask = token.split("/")
+                self.add_word(value, mask, token)
+            elif len(token) % 8 == 0:
+                for i in range(0, len(token), 8):
+                    word = token[i:i+8]
+                    self.add_word(word.replace("?", "0"), "".join("0" if c == "?" else "F" for c in word), token)
+            else:
+                raise RuntimeError("Invalid signature word \"{}\" in \"{}\"".format(token, pattern))
+        if not self.values:
+            raise RuntimeError("Empty signature \"{}\"".format(pattern))
+    
+    def add_word(self, value, mask, token):
+        try:
+            value = int(value, 16)
+            mask = int(mask, 16)
+        except ValueError:
+            raise RuntimeError("Invalid signature word \"{}\" in \"{}\"".format(token, self.pattern))
+        if value > 0xFFFFFFFF or mask > 0xFFFFFFFF:
+            raise RuntimeError("Invalid signature word \"{}\" in \"{}\"".format(token, self.pattern))
+        self.values.append(value & mask)
+        self.masks.append(mask)
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def __str__(self):
+        return self.pattern
+    
+    def matches(self, words, i):
+        for value, mask, word in zip(self.values, self.masks, words[i:i+len(self.values)]):
+            if word & mask != value:
+                return False
+        return True
+    
+    # The longest run of fully specified words, as (index, bytes)
+    def needle(self):
+        best = (0, 0)
+        start = None
+        for i, mask in enumerate(list(self.masks) + [0]):
+            if mask == 0xFFFFFFFF:
+                start = i if start == None else start
+            elif start != None:
+                best = max(best, (i - start, start))
+                start = None
+        length, start = best
+        if length == 0:
+            return None, None
+        return start, struct.pack(">{}I".format(length), *self.values[start:start+length])
+    
+    # A lookahead regex matching the signature byte by byte, for signatures without any fully
+    # specified word.  Partially masked bytes become character classes.
+    def regex(self):
+        parts = []
+        for value, mask in zip(self.values, self.masks):
+            for shift in (24, 16, 8, 0):
+                v = value >> shift & 0xFF
+                m = mask >> shift & 0xFF
+                if m == 0xFF:
+                    parts.append(re.escape(bytes([v])))
+                elif m == 0:
+                    parts.append(b".")
+                else:
+                    parts.append(b"[" + b"".join(re.escape(bytes([b])) for b in range(256) if b & m == v) + b"]")
+        return re.compile(b"(?=" + b"".join(parts) + b")", re.DOTALL)
+
+# Searches the text sections of a DolFile for signatures.
+class DolScanner(object):
+    # Anchors occurring more often than this are searched for one signature at a time instead
+    RareAnchor = 16
+    # Likewise for partially masked anchors occurring in more than one of this many words
+    CommonMaskedAnchor = 64
+    
+    def __init__(self, dol):
+        self.sections = []
+        for section in dol.textSections:
+            data = bytes(section.data.getbuffer())
+            data = data[:len(data) & ~3]
+            words = array("I", data)
+            if sys.byteorder == "little":
+                words.byteswap()
+            self.sections.append((section.address, data, words))
+    
+    # Addresses of every match of a signature
+    def find_all(self, signature):
+        if not isinstance(signature, Signature):
+            signature = Signature(signature)
+        k, needle = signature.needle()
+        regex = signature.regex() if needle == None else None
+        results = []
+        for address, data, words in self.sections:
+            last = len(words) - len(signature)
+            if regex != None:
+                candidates = (match.start() // 4 for match in regex.finditer(data) if match.start() % 4 == 0)
+            else:
+                candidates = []
+                pos = data.find(needle)
+                while pos != -1:
+                    if pos % 4 == 0 and k <= pos // 4 <= last + k:
+                        candidates.append(pos // 4 - k)
+                    pos = data.find(needle, pos + 1)
+            results.extend(address + i*4 for i in candidates if i <= last and signature.matches(words, i))
+        return results
+    
+    # Address of the only match of a signature, plus an offset
+    def find(self, signature, offset = 0):
+        results = self.find_all(signature)
+        if len(results) != 1:
+            raise RuntimeError("Signature \"{}\" matched {} times, expected once".format(signature, len(results)))
+        return results[0] + offset
+    
+    # Matches for many signatures at once.  Returns a list of address lists, in the same order as
+    # the signatures.  Identical signatures are only searched for once.  Each signature is anchored
+    # on its rarest word, fully specified or not.  Anchors are grouped by their masks, and each
+    # mask takes one pass over the text to count its anchors and one to locate them, however many
+    # signatures share it.  Only the few places they occur are checked for a full match.
+    def find_many(self, signatures):
+        signatures = [signature if isinstance(signature, Signature) else Signature(signature) for signature in signatures]
+        keys = [(signature.values.tobytes(), signature.masks.tobytes()) for signature in signatures]
+        distinct = {}
+        for key, signature in zip(keys, signatures):
+            distinct.setdefault(key, signature)
+        unique = list(distinct.values())
+        results = [[] for signature in unique]
+        
+        wanted = {}
+        for signature in unique:
+            for value, mask in zip(signature.values, signature.masks):
+                if mask:
+                    wanted.setdefault(mask, set()).add(value)
+        counts = {mask : Counter() for mask in wanted}
+        for address, data, words in self.sections:
+            for mask, values in wanted.items():
+                masked = map(mask.__and__, words) if mask != 0xFFFFFFFF else words
+                counts[mask].update(filter(values.__contains__, masked))
+        
+        # Anchors too common to check one by one are left to find_all, which finds fully specified
+        # runs with bytes.find, or everything else with a regex pass
+        common_masked = sum(len(words) for address, data, words in self.sections) // DolScanner.CommonMaskedAnchor
+        anchors = {}
+        common = []
+        for n, signature in enumerate(unique):
+            candidates = [(counts[mask][value], i) for i, (value, mask) in enumerate(zip(signature.values, signature.masks)) if mask]
+            if not candidates:
+                common.append(n)
+                continue
+            count, k = min(candidates)
+            if count > DolScanner.RareAnchor and signature.needle()[1] != None or count > common_masked:
+                common.append(n)
+            elif count > 0:
+                anchors.setdefault(signature.masks[k], {}).setdefault(signature.values[k], []).append((n, k))
+        
+        for address, data, words in self.sections:
+            for mask, mask_anchors in anchors.items():
+                masked = map(mask.__and__, words) if mask != 0xFFFFFFFF else words
+                for j in compress(range(len(words)), map(mask_anchors.__contains__, masked)):
+                    for n, k in mask_anchors[words[j] & mask]:
+                        i = j - k
+                        if i >= 0 and i + len(unique[n]) <= len(words) and unique[n].matches(words, i):
+                            results[n].append(address + i*4)
+        for n in common:
+            results[n] = self.find_all(unique[n])
+        
+        # Every copy of a signature gets its own list
+        index = {key : n for n, key in enumerate(distinct)}
+        return [list(results[index[key]]) for key in keys]
+
+# Opcodes of D-form instructions whose immediate is usually the low half of an address
+LowHalfOpcodes = {14, 24} | set(range(32, 56))
+# Paired single loads and stores, with 12-bit immediates
+PairedSingleOpcodes = {56, 57, 60, 61}
+
+# Opcodes of instructions writing rD: mulli, subfic, addic(.), addi(s), and integer loads
+WritesRDOpcodes = {7, 8, 12, 13, 14, 15, 32, 33, 34, 35, 40, 41, 42, 43}
+# Opcodes of rotates and logical immediates, which write rA instead
+WritesRAOpcodes = {20, 21, 23, 24, 25, 26, 27, 28, 29}
+# Opcodes of load and store with update, which also write rA
+UpdateOpcodes = {33, 35, 37, 39, 41, 43, 45, 49, 51, 53, 55, 57, 61}
+# Registers a call may change
+VolatileRegs = {0} | set(range(3, 13))
+
+# The GPRs an instruction may write.  Where it's not worth decoding, both rD and rA count.
+def written_registers(word):
+    opcd = word >> 26
+    rD = word >> 21 & 0x1F
+    rA = word >> 16 & 0x1F
+    if opcd == 31 or opcd == 4:
+        return (rD, rA)
+    if opcd == 46:
+        # lmw
+        return range(rD, 32)
+    if opcd in WritesRAOpcodes:
+        return (rA,)
+    regs = (rD,) if opcd in WritesRDOpcodes else ()
+    return regs + (rA,) if opcd in UpdateOpcodes else regs
+
+# Mask out everything in a function which changes when code or data moves around: branch
+# offsets, lis immediates, the @l halves paired with them, and small data area offsets.  A
+# register only holds an @h half until something else is written to it, or control flow
+# leaves the straight line of code.
+def mask_relocations(words):
+    masked = array("I", words)
+    hi_regs = set()
+    for i, word in enumerate(masked):
+        opcd = word >> 26
+        rD = word >> 21 & 0x1F
+        rA = word >> 16 & 0x1F
+        if opcd == 18:
+            masked[i] = word & 0xFC000003
+            if word & 1:
+                hi_regs -= VolatileRegs
+            else:
+                hi_regs.clear()
+            continue
+        if word == 0x4E800020 or word == 0x4E800420:
+            hi_regs.clear()
+            continue
+        if opcd == 15 and rA == 0:
+            masked[i] = word & 0xFFFF0000
+            hi_regs.add(rD)
+            continue
+        if opcd in LowHalfOpcodes and (rA in hi_regs or rA == 2 or rA == 13):
+            masked[i] = word & 0xFFFF0000
+        elif opcd in PairedSingleOpcodes and (rA in hi_regs or rA == 2 or rA == 13):
+            masked[i] = word & 0xFFFFF000
+        hi_regs.difference_update(written_registers(word))
+    return masked
+
+def function_fingerprint(words):
+    masked = mask_relocations(words)
+    if sys.byteorder == "little":
+        masked.byteswap()
+    return int.from_bytes(hashlib.blake2b(masked.tobytes(), digest_size = 8).digest(), "big")
+
+# Start, size and fingerprint of every function in a DOL's text sections
+class FunctionIndex(object):
+    Magic = b"DOLFIDX2"
+    
+    def __init__(self, starts, sizes, fingerprints):
+        self.starts = array("I", starts)
+        self.sizes = array("I", sizes)
+        self.fingerprints = array("Q", fingerprints)
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    # Index of the function containing an address, or None
+    def lookup(self, addr):
+        i = bisect_right(self.starts, addr) - 1
+        if i < 0 or addr >= self.starts[i] + self.sizes[i]:
+            return None
+        return i
+    
+    def save(self, filepath):
+        count = len(self)
+        with open(filepath, "wb") as f:
+            f.write(FunctionIndex.Magic + struct.pack(">I", count))
+            f.write(struct.pack(">{}I".format(count), *self.starts))
+            f.write(struct.pack(">{}I".format(count), *self.sizes))
+            f.write(struct.pack(">{}Q".format(count), *self.fingerprints))
+
+def load_function_index(filepath):
+    with open(filepath, "rb") as f:
+        data = f.read()
+    if data[:8] != FunctionIndex.Magic:
+        raise RuntimeError("\"{}\" is not a function index".format(filepath))
+    count, = struct.unpack_from(">I", data, 8)
+    starts = struct.unpack_from(">{}I".format(count), data, 12)
+    sizes = struct.unpack_from(">{}I".format(count), data, 12 + count*4)
+    fingerprints = struct.unpack_from(">{}Q".format(count), data, 12 + count*8)
+    return FunctionIndex(starts, sizes, fingerprints)
+
+# Split the text sections of a DOL into functions and fingerprint each one.  Function starts can
+# be given (e.g. from a symbol map); otherwise they're guessed from bl targets, and from
+# prologues or padding following a blr or bctr.
+def build_function_index(dol, starts = None):
+    scanner = DolScanner(dol)
+    bounds = set()
+    for address, data, words in scanner.sections:
+        bounds.add(address)
+        bounds.add(address + len(words)*4)
+    
+    if starts != None:
+        starts = set(starts)
+    else:
+        starts = set()
+        for address, data, words in scanner.sections:
+            starts.add(address)
+            for i, word in enumerate(words):
+                if word & 0xFC000003 == 0x48000001:
+                    starts.add(address + i*4 + ((word & 0x03FFFFFC) ^ 0x02000000) - 0x02000000)
+                elif word == 0x4E800020 or word == 0x4E800420:
+                    j = i + 1
+                    while j < len(words) and words[j] == 0:
+                        j += 1
+                    if j < len(words) and (j > i + 1 or words[j] >> 16 == 0x9421 or words[j] == 0x7C0802A6):
+                        starts.add(address + j*4)
+    
+    # Functions end at the next start or the end of their section
+    starts = sorted(start for start in starts if any(address <= start < address + len(words)*4 for address, data, words in scanner.sections))
+    ends = sorted(bounds | set(starts))
+    sections = sorted((address, address + len(words)*4, words) for address, data, words in scanner.sections)
+    
+    section_starts = [section[0] for section in sections]
+    
+    sizes = []
+    fingerprints = []
+    for start in starts:
+        end = ends[bisect_right(ends, start)]
+        address, section_end, words = sections[bisect_right(section_starts, start) - 1]
+        first = (start - address) // 4
+        last = (end - address) // 4
+        # Padding is not part of the function
+        while last > first + 1 and words[last-1] == 0:
+            last -= 1
+        sizes.append((last - first) * 4)
+        fingerprints.append(function_fingerprint(words[first:last]))
+    return FunctionIndex(starts, sizes, fingerprints)
+
+# Translate addresses from one revision of a DOL to another, by finding the function containing
+# each one and the function with the same fingerprint in the target.  Addresses in functions
+# which can't be matched unambiguously translate to None.
+def translate_addresses(addresses, source, target):
+    source_counts = Counter(source.fingerprints)
+    target_starts = {}
+    for start, fingerprint in zip(target.starts, target.fingerprints):
+        target_starts[fingerprint] = None if fingerprint in target_starts else start
+    
+    results = []
+    for addr in addresses:
+        i = source.lookup(addr)
+        if i == None or source_counts[source.fingerprints[i]] != 1 or target_starts.get(source.fingerprints[i]) == None:
+            results.append(None)
+        else:
+            results.append(target_starts[source.fingerprints[i]] + addr - source.starts[i])
+    return results
@@ -1,18 +1,33 @@
+import numbers
 import struct
+import sys
+import re
+from array import array
+from bisect import bisect_right
+from dolreader.exceptions import UnmappedAddressError
 
 def mask_field(val, bits, signed):
     if signed == True:
         # Lowest negative value
-        if val < -1 * 2**(bits-1):
+        if val < -(1 << (bits-1)):
             raise RuntimeError("{0} too large for {1}-bit signed field".format(val, bits))
         # Highest positive value
-        if val > 2**(bits-1) - 1:
+        if val > (1 << (bits-1)) - 1:
             raise RuntimeError("{0} too large for {1}-bit signed field".format(val, bits))
     else:
         # Highest unsigned value
-        if val > 2**bits - 1:
+        if val > (1 << bits) - 1:
             raise RuntimeError("{0} too large for {1}-bit unsigned field".format(val, bits))
-    return val & (2**bits - 1)
+    return val & ((1 << bits) - 1)
+
+# Range check a whole sequence at once.  Only the extremes can be out of range.
+def mask_fields(vals, bits, signed):
+    if not vals:
+        return []
+    mask_field(min(vals), bits, signed)
+    mask_field(max(vals), bits, signed)
+    mask = (1 << bits) - 1
+    return [val & mask for val in vals]
 
 def sign_extend(val, bits):
     sign_bit = 1 << (bits - 1)
@@ -41,7 +56,8 @@ def assemble_branch(addr, target_addr, LK=False, AA=False):
     out = 0
     # Calculate delta
     delta = target_addr - addr
-    assert delta % 4 == 0
+    if delta % 4:
+        raise RuntimeError("Branch from {:08X} to {:08X} is misaligned".format(addr, target_addr))
     # Mask and range check
     LI = mask_field(delta // 4, 24, True)
     # Set fields
@@ -93,7 +109,80 @@ def assemble_lis(rD, SIMM):
     return assemble_addis(rD, 0, SIMM)
 def assemble_nop():
     return assemble_ori(0, 0, 0)
+def assemble_mtctr(rS):
+    mask_field(rS, 5, False)
+    return struct.pack(">I", (31 << 26) | (rS << 21) | (9 << 16) | (467 << 1))
+def assemble_bctr():
+    return struct.pack(">I", 0x4E800420)
+# Veneer for targets out of reach of a relative branch.  Clobbers rD and ctr.
+def assemble_far_branch(target_addr, rD=12):
+    return assemble_lis(rD, hi(target_addr, True)) \
+         + assemble_ori(rD, rD, lo(target_addr, False)) \
+         + assemble_mtctr(rD) \
+         + assemble_bctr()
+
+def branch_in_range(addr, target_addr):
+    return -0x2000000 <= target_addr - addr <= 0x1FFFFFC
     
+# Assemble many instructions into one big-endian buffer.  Operands are sequences, or a single
+# value used for every instruction.
+def pack_words(words):
+    out = array("I", words)
+    if sys.byteorder == "little":
+        out.byteswap()
+    return out.tobytes()
+
+def operand_lists(*operands):
+    # Any integer type is a single value, numpy's included
+    operands = [val if isinstance(val, numbers.Integral) else list(val) for val in operands]
+    counts = {len(val) for val in operands if not isinstance(val, numbers.Integral)}
+    if len(counts) > 1:
+        raise RuntimeError("Operand sequences have different lengths: {}".format(sorted(counts)))
+    count = counts.pop() if counts else 1
+    return [[val] * count if isinstance(val, numbers.Integral) else val for val in operands]
+
+def assemble_branch_many(addrs, target_addrs, LK=False, AA=False):
+    addrs, target_addrs = operand_lists(addrs, target_addrs)
+    deltas = [target_addr - addr for addr, target_addr in zip(addrs, target_addrs)]
+    for addr, target_addr, delta in zip(addrs, target_addrs, deltas):
+        if delta % 4:
+            raise RuntimeError("Branch from {:08X} to {:08X} is misaligned".format(addr, target_addr))
+    LIs = mask_fields([delta // 4 for delta in deltas], 24, True)
+    base = (18 << 26) | (AA << 1) | (LK << 0)
+    return pack_words(base | (LI << 2) for LI in LIs)
+
+def assemble_integer_arithmetic_immediate_many(opcd, rD, rA, SIMM):
+    rD, rA, SIMM = operand_lists(rD, rA, SIMM)
+    rD = mask_fields(rD, 5, False)
+    rA = mask_fields(rA, 5, False)
+    SIMM = mask_fields(SIMM, 16, True)
+    return pack_words((opcd << 26) | (d << 21) | (a << 16) | i for d, a, i in zip(rD, rA, SIMM))
+
+def assemble_integer_logical_immediate_many(opcd, rA, rS, UIMM):
+    rA, rS, UIMM = operand_lists(rA, rS, UIMM)
+    rA = mask_fields(rA, 5, False)
+    rS = mask_fields(rS, 5, False)
+    UIMM = mask_fields(UIMM, 16, False)
+    return pack_words((opcd << 26) | (s << 21) | (a << 16) | i for a, s, i in zip(rA, rS, UIMM))
+
+def assemble_addi_many(rD, rA, SIMM):
+    return assemble_integer_arithmetic_immediate_many(14, rD, rA, SIMM)
+def assemble_addis_many(rD, rA, SIMM):
+    return assemble_integer_arithmetic_immediate_many(15, rD, rA, SIMM)
+def assemble_ori_many(rA, rS, UIMM):
+    return assemble_integer_logical_immediate_many(24, rA, rS, UIMM)
+def assemble_oris_many(rA, rS, UIMM):
+    return assemble_integer_logical_immediate_many(25, rA, rS, UIMM)
+# Simplified mnenonics
+def assemble_li_many(rD, SIMM):
+    return assemble_addi_many(rD, 0, SIMM)
+def assemble_lis_many(rD, SIMM):
+    return assemble_addis_many(rD, 0, SIMM)
+def assemble_nop_many(count):
+    return assemble_nop() * count
+def assemble_far_branch_many(target_addrs, rD=12):
+    return b''.join(assemble_far_branch(target_addr, rD) for target_addr in target_addrs)
+
 # Write instructions to DOL
 def write_branch(dol, target_addr, LK=False, AA=False):
     dol.write(assemble_branch(dol.tell(), target_addr, LK, AA))
@@ -112,3 +201,614 @@ def write_lis(dol, rD, SIMM):
     dol.write(assemble_lis(rD, SIMM))
 def write_nop(dol):
     dol.write(assemble_nop())
+def write_mtctr(dol, rS):
+    dol.write(assemble_mtctr(rS))
+def write_bctr(dol):
+    dol.write(assemble_bctr())
+def write_far_branch(dol, target_addr, rD=12):
+    dol.write(assemble_far_branch(target_addr, rD))
+
+# Write a whole run of instructions to DOL, starting at the current position
+def write_branch_many(dol, target_addrs, LK=False, AA=False):
+    target_addrs = list(target_addrs)
+    addr = dol.tell()
+    dol.write(assemble_branch_many(range(addr, addr + 4*len(target_addrs), 4), target_addrs, LK, AA))
+def write_addi_many(dol, rD, rA, SIMM):
+    dol.write(assemble_addi_many(rD, rA, SIMM))
+def write_addis_many(dol, rD, rA, SIMM):
+    dol.write(assemble_addis_many(rD, rA, SIMM))
+def write_ori_many(dol, rA, rS, UIMM):
+    dol.write(assemble_ori_many(rA, rS, UIMM))
+def write_oris_many(dol, rA, rS, UIMM):
+    dol.write(assemble_oris_many(rA, rS, UIMM))
+# Simplified mnenonics
+def write_li_many(dol, rD, SIMM):
+    dol.write(assemble_li_many(rD, SIMM))
+def write_lis_many(dol, rD, SIMM):
+    dol.write(assemble_lis_many(rD, SIMM))
+def write_nop_many(dol, count):
+    dol.write(assemble_nop_many(count))
+def write_far_branch_many(dol, target_addrs, rD=12):
+    dol.write(assemble_far_branch_many(target_addrs, rD))
+
+# Direct access to the section buffers of a DolFile, for writing many small patches without
+# going through DolFile's seek/write (which searches every section each time).
+class SectionBuffers(object):
+    def __init__(self, dol):
+        self.sections = sorted(dol.sections, key = lambda section: section.address)
+        self.addresses = [section.address for section in self.sections]
+        self.ends = [section.address + section.size for section in self.sections]
+        self.buffers = {}
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.release()
+    
+    # Returns the buffer and offset for a given address, or (None, 0) if it is unmapped.
+    def locate(self, addr, size):
+        i = bisect_right(self.addresses, addr) - 1
+        if i < 0 or addr >= self.ends[i]:
+            return None, 0
+        if addr + size > self.ends[i]:
+            raise UnmappedAddressError("Write goes over current section")
+        if i not in self.buffers:
+            self.buffers[i] = self.sections[i].data.getbuffer()
+        return self.buffers[i], addr - self.addresses[i]
+    
+    def release(self):
+        for buffer in self.buffers.values():
+            buffer.release()
+        self.buffers.clear()
+
+# Relocations
+# https://refspecs.linuxfoundation.org/elf/elfspec_ppc.pdf
+R_PPC_ADDR32 = 1
+R_PPC_ADDR24 = 2
+R_PPC_ADDR16 = 3
+R_PPC_ADDR16_LO = 4
+R_PPC_ADDR16_HI = 5
+R_PPC_ADDR16_HA = 6
+R_PPC_ADDR14 = 7
+R_PPC_REL24 = 10
+R_PPC_REL14 = 11
+R_PPC_REL32 = 26
+R_PPC_SDAREL16 = 32
+R_PPC_EMB_SDA2REL = 102
+R_PPC_EMB_SDA21 = 109
+# Paired-Singles load/store have a 12-bit displacement, which the ELF ABI has no relocations for.
+# These aren't ELF relocation types, hence no R_PPC_ prefix.  The numbers are made up, and are
+# only meaningful to dol_c_kit.
+PS12_LO = 0x1000
+PS12_HI = 0x1001
+PS12_HA = 0x1002
+PS12_SDAREL = 0x1003
+PS12_SDA2REL = 0x1004
+
+def sda_offset(S, base, name):
+    if base == None:
+        raise RuntimeError("{} relative relocations need {} to be set!".format(name, name))
+    return S - base
+
+# EMB_SDA21 picks the base register as well as the offset.  The symbol's section isn't known
+# here, so whichever small data area the symbol lands in is used, falling back to r0.
+def sda21(S, sda_base, sda2_base):
+    if sda_base != None and -0x8000 <= S - sda_base < 0x8000:
+        return (13 << 16) | ((S - sda_base) & 0xFFFF)
+    if sda2_base != None and -0x8000 <= S - sda2_base < 0x8000:
+        return (2 << 16) | ((S - sda2_base) & 0xFFFF)
+    return (0 << 16) | mask_field(S, 16, True)
+
+# Field layouts: (size of the patched unit, bit width, left shift, signed).  Fields with a shift
+# of 2 hold a word offset and must be word aligned.
+FieldWord32   = (4, 32, 0, False)
+FieldWord32S  = (4, 32, 0, True)
+FieldLI       = (4, 24, 2, True)
+FieldBD       = (4, 14, 2, True)
+FieldHalf16   = (2, 16, 0, True)
+FieldSDA21    = (4, 21, 0, False)
+FieldPS12     = (2, 12, 0, True)
+
+# r_type : (field, calculation(S, P, sda_base, sda2_base))
+RelocationTable = {
+    R_PPC_ADDR32       : (FieldWord32,  lambda S, P, sda, sda2: S & 0xFFFFFFFF),
+    R_PPC_ADDR24       : (FieldLI,      lambda S, P, sda, sda2: S),
+    R_PPC_ADDR16       : (FieldHalf16,  lambda S, P, sda, sda2: S),
+    R_PPC_ADDR16_LO    : (FieldHalf16,  lambda S, P, sda, sda2: lo(S, True)),
+    R_PPC_ADDR16_HI    : (FieldHalf16,  lambda S, P, sda, sda2: hi(S, True)),
+    R_PPC_ADDR16_HA    : (FieldHalf16,  lambda S, P, sda, sda2: hia(S, True)),
+    R_PPC_ADDR14       : (FieldBD,      lambda S, P, sda, sda2: S),
+    R_PPC_REL24        : (FieldLI,      lambda S, P, sda, sda2: S - P),
+    R_PPC_REL14        : (FieldBD,      lambda S, P, sda, sda2: S - P),
+    R_PPC_REL32        : (FieldWord32S, lambda S, P, sda, sda2: S - P),
+    R_PPC_SDAREL16     : (FieldHalf16,  lambda S, P, sda, sda2: sda_offset(S, sda, "_SDA_BASE_")),
+    R_PPC_EMB_SDA2REL  : (FieldHalf16,  lambda S, P, sda, sda2: sda_offset(S, sda2, "_SDA2_BASE_")),
+    R_PPC_EMB_SDA21    : (FieldSDA21,   lambda S, P, sda, sda2: sda21(S, sda, sda2)),
+    PS12_LO            : (FieldPS12,    lambda S, P, sda, sda2: lo(S, True)),
+    PS12_HI            : (FieldPS12,    lambda S, P, sda, sda2: hi(S, True)),
+    PS12_HA            : (FieldPS12,    lambda S, P, sda, sda2: hia(S, True)),
+    PS12_SDAREL        : (FieldPS12,    lambda S, P, sda, sda2: sda_offset(S, sda, "_SDA_BASE_")),
+    PS12_SDA2REL       : (FieldPS12,    lambda S, P, sda, sda2: sda_offset(S, sda2, "_SDA2_BASE_")),
+}
+
+# Returns the size of the patched unit, the mask of the bits being patched, and their new value.
+def encode_relocation(r_type, addr, value, sda_base = None, sda2_base = None):
+    (size, bits, shift, signed), calc = RelocationTable[r_type]
+    val = calc(value, addr, sda_base, sda2_base)
+    if shift:
+        if val % (1 << shift):
+            raise RuntimeError("Relocation {} at {:08X} is misaligned".format(r_type, addr))
+        val >>= shift
+    return size, ((1 << bits) - 1) << shift, mask_field(val, bits, signed) << shift
+
+# Apply a list of relocations to a DolFile.  Each relocation is a tuple of (r_type, addr, value)
+# where value is S + A, optionally followed by a template.  Without a template, bits outside the
+# field are kept from what is already in the DOL.  With one, they're replaced by the template.
+# Returns a list of whether or not each relocation landed in a mapped section.
+def apply_relocations(dol, relocations, sda_base = None, sda2_base = None):
+    relocations = list(relocations)
+    results = [False] * len(relocations)
+    with SectionBuffers(dol) as buffers:
+        for i in sorted(range(len(relocations)), key = lambda i: relocations[i][1]):
+            r_type, addr, value = relocations[i][:3]
+            template = relocations[i][3] if len(relocations[i]) > 3 else None
+            size, mask, field = encode_relocation(r_type, addr, value, sda_base, sda2_base)
+            buffer, offset = buffers.locate(addr, size)
+            if buffer == None:
+                continue
+            fmt = ">I" if size == 4 else ">H"
+            if template == None:
+                template = struct.unpack_from(fmt, buffer, offset)[0]
+            struct.pack_into(fmt, buffer, offset, (template & ~mask) | field)
+            results[i] = True
+    return results
+
+# In-process Gekko assembler, for short snippets which aren't worth a toolchain launch.
+class UndefinedSymbolError(RuntimeError):
+    pass
+
+# Operand kinds
+OperandGPR = 0
+OperandFPR = 1
+OperandCRF = 2
+OperandImm = 3
+OperandRel = 4
+OperandMem = 5
+OperandSPR = 6
+
+# Operand name : (kind, shift, bits, signed)
+AsmOperands = {
+    "rD"      : (OperandGPR, 21,  5, False),
+    "rS"      : (OperandGPR, 21,  5, False),
+    "rA"      : (OperandGPR, 16,  5, False),
+    "rB"      : (OperandGPR, 11,  5, False),
+    "frD"     : (OperandFPR, 21,  5, False),
+    "frS"     : (OperandFPR, 21,  5, False),
+    "frA"     : (OperandFPR, 16,  5, False),
+    "frB"     : (OperandFPR, 11,  5, False),
+    "frC"     : (OperandFPR,  6,  5, False),
+    "crfD"    : (OperandCRF, 23,  3, False),
+    "crfS"    : (OperandCRF, 18,  3, False),
+    "crf"     : (OperandCRF,  0,  3, False),   # Only used by simplified mnemonics
+    "crbD"    : (OperandImm, 21,  5, False),
+    "crbA"    : (OperandImm, 16,  5, False),
+    "crbB"    : (OperandImm, 11,  5, False),
+    "TO"      : (OperandImm, 21,  5, False),
+    "L"       : (OperandImm, 21,  1, False),
+    "SIMM"    : (OperandImm,  0, 16, True),
+    "UIMM"    : (OperandImm,  0, 16, False),
+    "SH"      : (OperandImm, 11,  5, False),
+    "MB"      : (OperandImm,  6,  5, False),
+    "ME"      : (OperandImm,  1,  5, False),
+    "n"       : (OperandImm,  0,  5, False),   # Only used by simplified mnemonics
+    "b"       : (OperandImm,  0,  5, False),   # Only used by simplified mnemonics
+    "BO"      : (OperandImm, 21,  5, False),
+    "BI"      : (OperandImm, 16,  5, False),
+    "CRM"     : (OperandImm, 12,  8, False),
+    "FM"      : (OperandImm, 17,  8, False),
+    "IMM"     : (OperandImm, 12,  4, False),
+    "W"       : (OperandImm, 15,  1, False),
+    "I"       : (OperandImm, 12,  3, False),
+    "Wx"      : (OperandImm, 10,  1, False),
+    "Ix"      : (OperandImm,  7,  3, False),
+    "LI"      : (OperandRel,  2, 24, True),
+    "BD"      : (OperandRel,  2, 14, True),
+    "spr"     : (OperandSPR, 11, 10, False),
+    "d(rA)"   : (OperandMem,  0, 16, True),
+    "d12(rA)" : (OperandMem,  0, 12, True),
+}
+
+AsmSPRs = {
+    "xer" : 1, "lr" : 8, "ctr" : 9, "dsisr" : 18, "dar" : 19, "dec" : 22, "sdr1" : 25, "srr0" : 26, "srr1" : 27,
+    "sprg0" : 272, "sprg1" : 273, "sprg2" : 274, "sprg3" : 275, "ear" : 282, "pvr" : 287,
+    "gqr0" : 912, "gqr1" : 913, "gqr2" : 914, "gqr3" : 915, "gqr4" : 916, "gqr5" : 917, "gqr6" : 918, "gqr7" : 919,
+    "hid2" : 920, "wpar" : 921, "dmau" : 922, "dmal" : 923, "hid0" : 1008, "hid1" : 1009, "iabr" : 1010,
+    "dabr" : 1013, "l2cr" : 1017, "ictc" : 1019,
+}
+
+# Names usable in expressions, mostly for BI operands like 4*cr1+eq
+AsmConstants = {
+    "lt" : 0, "gt" : 1, "eq" : 2, "so" : 3, "un" : 3,
+    "cr0" : 0, "cr1" : 1, "cr2" : 2, "cr3" : 3, "cr4" : 4, "cr5" : 5, "cr6" : 6, "cr7" : 7,
+}
+
+# Mnemonic : (base word, operand names)
+AsmInstructions = {}
+
+def asm_instruction(mnemonic, word, operands, Rc = False, OE = False):
+    AsmInstructions[mnemonic] = (word, operands)
+    if Rc:
+        AsmInstructions[mnemonic + "."] = (word | 0x1, operands)
+    if OE:
+        AsmInstructions[mnemonic + "o"] = (word | 0x400, operands)
+        AsmInstructions[mnemonic + "o."] = (word | 0x401, operands)
+
+def asm_opcode(opcd, XO = 0):
+    return (opcd << 26) | (XO << 1)
+
+# D-form
+for mnemonic, opcd in (("addi", 14), ("addis", 15), ("addic", 12), ("addic.", 13), ("mulli", 7), ("subfic", 8)):
+    asm_instruction(mnemonic, asm_opcode(opcd), ("rD", "rA", "SIMM"))
+for mnemonic, opcd in (("ori", 24), ("oris", 25), ("xori", 26), ("xoris", 27), ("andi.", 28), ("andis.", 29)):
+    asm_instruction(mnemonic, asm_opcode(opcd), ("rA", "rS", "UIMM"))
+for mnemonic, opcd in (("lwz", 32), ("lwzu", 33), ("lbz", 34), ("lbzu", 35), ("lhz", 40), ("lhzu", 41), ("lha", 42), ("lhau", 43), ("lmw", 46)):
+    asm_instruction(mnemonic, asm_opcode(opcd), ("rD", "d(rA)"))
+for mnemonic, opcd in (("stw", 36), ("stwu", 37), ("stb", 38), ("stbu", 39), ("sth", 44), ("sthu", 45), ("stmw", 47)):
+    asm_instruction(mnemonic, asm_opcode(opcd), ("rS", "d(rA)"))
+for mnemonic, opcd in (("lfs", 48), ("lfsu", 49), ("lfd", 50), ("lfdu", 51)):
+    asm_instruction(mnemonic, asm_opcode(opcd), ("frD", "d(rA)"))
+for mnemonic, opcd in (("stfs", 52), ("stfsu", 53), ("stfd", 54), ("stfdu", 55)):
+    asm_instruction(mnemonic, asm_opcode(opcd), ("frS", "d(rA)"))
+for mnemonic, opcd in (("psq_l", 56), ("psq_lu", 57), ("psq_st", 60), ("psq_stu", 61)):
+    asm_instruction(mnemonic, asm_opcode(opcd), ("frD", "d12(rA)", "W", "I"))
+asm_instruction("twi", asm_opcode(3), ("TO", "rA", "SIMM"))
+asm_instruction("cmpi", asm_opcode(11), ("crfD", "L", "rA", "SIMM"))
+asm_instruction("cmpli", asm_opcode(10), ("crfD", "L", "rA", "UIMM"))
+asm_instruction("rlwimi", asm_opcode(20), ("rA", "rS", "SH", "MB", "ME"), Rc = True)
+asm_instruction("rlwinm", asm_opcode(21), ("rA", "rS", "SH", "MB", "ME"), Rc = True)
+asm_instruction("rlwnm", asm_opcode(23), ("rA", "rS", "rB", "MB", "ME"), Rc = True)
+asm_instruction("sc", asm_opcode(17) | 0x2, ())
+
+# Branches
+for suffix, bits in (("", 0), ("l", 1), ("a", 2), ("la", 3)):
+    asm_instruction("b" + suffix, asm_opcode(18) | bits, ("LI",))
+    asm_instruction("bc" + suffix, asm_opcode(16) | bits, ("BO", "BI", "BD"))
+for suffix, bits in (("", 0), ("l", 1)):
+    asm_instruction("bclr" + suffix, asm_opcode(19, 16) | bits, ("BO", "BI"))
+    asm_instruction("bcctr" + suffix, asm_opcode(19, 528) | bits, ("BO", "BI"))
+
+# XL-form
+asm_instruction("mcrf", asm_opcode(19, 0), ("crfD", "crfS"))
+asm_instruction("rfi", asm_opcode(19, 50), ())
+asm_instruction("isync", asm_opcode(19, 150), ())
+for mnemonic, XO in (("crnor", 33), ("crandc", 129), ("crxor", 193), ("crnand", 225), ("crand", 257), ("creqv", 289), ("crorc", 417), ("cror", 449)):
+    asm_instruction(mnemonic, asm_opcode(19, XO), ("crbD", "crbA", "crbB"))
+
+# X-form and XO-form
+for mnemonic, XO in (("subfc", 8), ("addc", 10), ("subf", 40), ("subfe", 136), ("adde", 138), ("mullw", 235), ("add", 266), ("divwu", 459), ("divw", 491)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("rD", "rA", "rB"), Rc = True, OE = True)
+for mnemonic, XO in (("mulhwu", 11), ("mulhw", 75)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("rD", "rA", "rB"), Rc = True)
+for mnemonic, XO in (("neg", 104), ("subfze", 200), ("addze", 202), ("subfme", 232), ("addme", 234)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("rD", "rA"), Rc = True, OE = True)
+for mnemonic, XO in (("slw", 24), ("and", 28), ("andc", 60), ("nor", 124), ("eqv", 284), ("xor", 316), ("orc", 412), ("or", 444), ("nand", 476), ("srw", 536), ("sraw", 792)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("rA", "rS", "rB"), Rc = True)
+for mnemonic, XO in (("cntlzw", 26), ("extsh", 922), ("extsb", 954)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("rA", "rS"), Rc = True)
+asm_instruction("srawi", asm_opcode(31, 824), ("rA", "rS", "SH"), Rc = True)
+asm_instruction("cmp", asm_opcode(31, 0), ("crfD", "L", "rA", "rB"))
+asm_instruction("cmpl", asm_opcode(31, 32), ("crfD", "L", "rA", "rB"))
+asm_instruction("tw", asm_opcode(31, 4), ("TO", "rA", "rB"))
+asm_instruction("mcrxr", asm_opcode(31, 512), ("crfD",))
+asm_instruction("mfcr", asm_opcode(31, 19), ("rD",))
+asm_instruction("mfmsr", asm_opcode(31, 83), ("rD",))
+asm_instruction("mtmsr", asm_opcode(31, 146), ("rS",))
+asm_instruction("mtcrf", asm_opcode(31, 144), ("CRM", "rS"))
+asm_instruction("mfspr", asm_opcode(31, 339), ("rD", "spr"))
+asm_instruction("mtspr", asm_opcode(31, 467), ("spr", "rS"))
+asm_instruction("mftb", asm_opcode(31, 371) | (12 << 16) | (8 << 11), ("rD",))
+asm_instruction("mftbu", asm_opcode(31, 371) | (13 << 16) | (8 << 11), ("rD",))
+for mnemonic, XO in (("lwarx", 20), ("lwzx", 23), ("lwzux", 55), ("lbzx", 87), ("lbzux", 119), ("lhzx", 279), ("lhzux", 311), ("lhax", 343), ("lhaux", 375), ("lwbrx", 534), ("lhbrx", 790)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("rD", "rA", "rB"))
+for mnemonic, XO in (("stwx", 151), ("stwux", 183), ("stbx", 215), ("stbux", 247), ("sthx", 407), ("sthux", 439), ("stwbrx", 662), ("sthbrx", 918)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("rS", "rA", "rB"))
+asm_instruction("stwcx.", asm_opcode(31, 150) | 0x1, ("rS", "rA", "rB"))
+for mnemonic, XO in (("lfsx", 535), ("lfsux", 567), ("lfdx", 599), ("lfdux", 631)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("frD", "rA", "rB"))
+for mnemonic, XO in (("stfsx", 663), ("stfsux", 695), ("stfdx", 727), ("stfdux", 759), ("stfiwx", 983)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("frS", "rA", "rB"))
+for mnemonic, XO in (("dcbst", 54), ("dcbf", 86), ("dcbtst", 246), ("dcbt", 278), ("dcbi", 470), ("icbi", 982), ("dcbz", 1014)):
+    asm_instruction(mnemonic, asm_opcode(31, XO), ("rA", "rB"))
+asm_instruction("sync", asm_opcode(31, 598), ())
+asm_instruction("eieio", asm_opcode(31, 854), ())
+
+# Floating point
+for suffix, opcd in (("s", 59), ("", 63)):
+    for mnemonic, XO in (("fdiv", 18), ("fsub", 20), ("fadd", 21)):
+        asm_instruction(mnemonic + suffix, asm_opcode(opcd, XO), ("frD", "frA", "frB"), Rc = True)
+    asm_instruction("fmul" + suffix, asm_opcode(opcd, 25), ("frD", "frA", "frC"), Rc = True)
+    for mnemonic, XO in (("fmsub", 28), ("fmadd", 29), ("fnmsub", 30), ("fnmadd", 31)):
+        asm_instruction(mnemonic + suffix, asm_opcode(opcd, XO), ("frD", "frA", "frC", "frB"), Rc = True)
+asm_instruction("fres", asm_opcode(59, 24), ("frD", "frB"), Rc = True)
+asm_instruction("frsqrte", asm_opcode(63, 26), ("frD", "frB"), Rc = True)
+asm_instruction("fsel", asm_opcode(63, 23), ("frD", "frA", "frC", "frB"), Rc = True)
+for mnemonic, XO in (("frsp", 12), ("fctiw", 14), ("fctiwz", 15), ("fneg", 40), ("fmr", 72), ("fnabs", 136), ("fabs", 264)):
+    asm_instruction(mnemonic, asm_opcode(63, XO), ("frD", "frB"), Rc = True)
+asm_instruction("fcmpu", asm_opcode(63, 0), ("crfD", "frA", "frB"))
+asm_instruction("fcmpo", asm_opcode(63, 32), ("crfD", "frA", "frB"))
+asm_instruction("mcrfs", asm_opcode(63, 64), ("crfD", "crfS"))
+asm_instruction("mtfsb0", asm_opcode(63, 70), ("crbD",), Rc = True)
+asm_instruction("mtfsb1", asm_opcode(63, 38), ("crbD",), Rc = True)
+asm_instruction("mtfsfi", asm_opcode(63, 134), ("crfD", "IMM"), Rc = True)
+asm_instruction("mffs", asm_opcode(63, 583), ("frD",), Rc = True)
+asm_instruction("mtfsf", asm_opcode(63, 711), ("FM", "frB"), Rc = True)
+
+# Paired singles
+for mnemonic, XO in (("ps_div", 18), ("ps_sub", 20), ("ps_add", 21), ("ps_merge00", 528), ("ps_merge01", 560), ("ps_merge10", 592), ("ps_merge11", 624)):
+    asm_instruction(mnemonic, asm_opcode(4, XO), ("frD", "frA", "frB"), Rc = True)
+for mnemonic, XO in (("ps_mul", 25), ("ps_muls0", 12), ("ps_muls1", 13)):
+    asm_instruction(mnemonic, asm_opcode(4, XO), ("frD", "frA", "frC"), Rc = True)
+for mnemonic, XO in (("ps_sum0", 10), ("ps_sum1", 11), ("ps_madds0", 14), ("ps_madds1", 15), ("ps_sel", 23), ("ps_msub", 28), ("ps_madd", 29), ("ps_nmsub", 30), ("ps_nmadd", 31)):
+    asm_instruction(mnemonic, asm_opcode(4, XO), ("frD", "frA", "frC", "frB"), Rc = True)
+for mnemonic, XO in (("ps_res", 24), ("ps_rsqrte", 26), ("ps_neg", 40), ("ps_mr", 72), ("ps_nabs", 136), ("ps_abs", 264)):
+    asm_instruction(mnemonic, asm_opcode(4, XO), ("frD", "frB"), Rc = True)
+for mnemonic, XO in (("ps_cmpu0", 0), ("ps_cmpo0", 32), ("ps_cmpu1", 64), ("ps_cmpo1", 96)):
+    asm_instruction(mnemonic, asm_opcode(4, XO), ("crfD", "frA", "frB"))
+for mnemonic, XO in (("psq_lx", 6), ("psq_lux", 38)):
+    asm_instruction(mnemonic, asm_opcode(4, XO), ("frD", "rA", "rB", "Wx", "Ix"))
+for mnemonic, XO in (("psq_stx", 7), ("psq_stux", 39)):
+    asm_instruction(mnemonic, asm_opcode(4, XO), ("frS", "rA", "rB", "Wx", "Ix"))
+asm_instruction("dcbz_l", asm_opcode(4, 1014), ("rA", "rB"))
+
+# Simplified mnemonic : (instruction, operand names, operand expansion).  An operand name ending
+# in "?" may be left out, defaulting to 0.
+AsmAliases = {}
+
+def asm_alias(mnemonic, instruction, operands, expand, Rc = False):
+    AsmAliases[mnemonic] = (instruction, operands, expand)
+    if Rc:
+        AsmAliases[mnemonic + "."] = (instruction + ".", operands, expand)
+
+asm_alias("nop", "ori", (), lambda: (0, 0, 0))
+asm_alias("li", "addi", ("rD", "SIMM"), lambda rD, SIMM: (rD, 0, SIMM))
+asm_alias("lis", "addis", ("rD", "SIMM"), lambda rD, SIMM: (rD, 0, SIMM))
+asm_alias("la", "addi", ("rD", "d(rA)"), lambda rD, d, rA: (rD, rA, d))
+asm_alias("subi", "addi", ("rD", "rA", "SIMM"), lambda rD, rA, SIMM: (rD, rA, -SIMM))
+asm_alias("subis", "addis", ("rD", "rA", "SIMM"), lambda rD, rA, SIMM: (rD, rA, -SIMM))
+asm_alias("subic", "addic", ("rD", "rA", "SIMM"), lambda rD, rA, SIMM: (rD, rA, -SIMM))
+asm_alias("subic.", "addic.", ("rD", "rA", "SIMM"), lambda rD, rA, SIMM: (rD, rA, -SIMM))
+for suffix in ("", ".", "o", "o."):
+    asm_alias("sub" + suffix, "subf" + suffix, ("rD", "rA", "rB"), lambda rD, rA, rB: (rD, rB, rA))
+    asm_alias("subc" + suffix, "subfc" + suffix, ("rD", "rA", "rB"), lambda rD, rA, rB: (rD, rB, rA))
+asm_alias("mr", "or", ("rA", "rS"), lambda rA, rS: (rA, rS, rS), Rc = True)
+asm_alias("not", "nor", ("rA", "rS"), lambda rA, rS: (rA, rS, rS), Rc = True)
+asm_alias("slwi", "rlwinm", ("rA", "rS", "n"), lambda rA, rS, n: (rA, rS, n, 0, 31 - n), Rc = True)
+asm_alias("srwi", "rlwinm", ("rA", "rS", "n"), lambda rA, rS, n: (rA, rS, (32 - n) & 31, n, 31), Rc = True)
+asm_alias("clrlwi", "rlwinm", ("rA", "rS", "n"), lambda rA, rS, n: (rA, rS, 0, n, 31), Rc = True)
+asm_alias("clrrwi", "rlwinm", ("rA", "rS", "n"), lambda rA, rS, n: (rA, rS, 0, 0, 31 - n), Rc = True)
+asm_alias("rotlwi", "rlwinm", ("rA", "rS", "n"), lambda rA, rS, n: (rA, rS, n, 0, 31), Rc = True)
+asm_alias("rotrwi", "rlwinm", ("rA", "rS", "n"), lambda rA, rS, n: (rA, rS, (32 - n) & 31, 0, 31), Rc = True)
+asm_alias("extlwi", "rlwinm", ("rA", "rS", "n", "b"), lambda rA, rS, n, b: (rA, rS, b, 0, n - 1), Rc = True)
+asm_alias("extrwi", "rlwinm", ("rA", "rS", "n", "b"), lambda rA, rS, n, b: (rA, rS, (b + n) & 31, 32 - n, 31), Rc = True)
+asm_alias("rotlw", "rlwnm", ("rA", "rS", "rB"), lambda rA, rS, rB: (rA, rS, rB, 0, 31), Rc = True)
+asm_alias("cmpw", "cmp", ("crf?", "rA", "rB"), lambda crf, rA, rB: (crf, 0, rA, rB))
+asm_alias("cmplw", "cmpl", ("crf?", "rA", "rB"), lambda crf, rA, rB: (crf, 0, rA, rB))
+asm_alias("cmpwi", "cmpi", ("crf?", "rA", "SIMM"), lambda crf, rA, SIMM: (crf, 0, rA, SIMM))
+asm_alias("cmplwi", "cmpli", ("crf?", "rA", "UIMM"), lambda crf, rA, UIMM: (crf, 0, rA, UIMM))
+asm_alias("mtcr", "mtcrf", ("rS",), lambda rS: (0xFF, rS))
+asm_alias("trap", "tw", (), lambda: (31, 0, 0))
+asm_alias("crset", "creqv", ("crbD",), lambda crbD: (crbD, crbD, crbD))
+asm_alias("crclr", "crxor", ("crbD",), lambda crbD: (crbD, crbD, crbD))
+asm_alias("crmove", "cror", ("crbD", "crbA"), lambda crbD, crbA: (crbD, crbA, crbA))
+asm_alias("crnot", "crnor", ("crbD", "crbA"), lambda crbD, crbA: (crbD, crbA, crbA))
+for name, spr in AsmSPRs.items():
+    asm_alias("mf" + name, "mfspr", ("rD",), lambda rD, spr = spr: (rD, spr))
+    asm_alias("mt" + name, "mtspr", ("rS",), lambda rS, spr = spr: (spr, rS))
+for suffix in ("", "l"):
+    asm_alias("blr" + suffix, "bclr" + suffix, (), lambda: (20, 0))
+    asm_alias("bctr" + suffix, "bcctr" + suffix, (), lambda: (20, 0))
+    asm_alias("bdnz" + suffix, "bc" + suffix, ("BD",), lambda BD: (16, 0, BD))
+    asm_alias("bdz" + suffix, "bc" + suffix, ("BD",), lambda BD: (18, 0, BD))
+    asm_alias("bdnzlr" + suffix, "bclr" + suffix, (), lambda: (16, 0))
+    asm_alias("bdzlr" + suffix, "bclr" + suffix, (), lambda: (18, 0))
+# Condition : (BO, CR bit)
+for condition, (BO, bit) in {"lt" : (12, 0), "gt" : (12, 1), "eq" : (12, 2), "so" : (12, 3), "un" : (12, 3),
+                             "ge" : (4, 0), "nl" : (4, 0), "le" : (4, 1), "ng" : (4, 1), "ne" : (4, 2), "ns" : (4, 3), "nu" : (4, 3)}.items():
+    for suffix in ("", "l", "a", "la"):
+        asm_alias("b" + condition + suffix, "bc" + suffix, ("crf?", "BD"), lambda crf, BD, BO = BO, bit = bit: (BO, crf*4 + bit, BD))
+    for suffix, instruction in (("lr", "bclr"), ("lrl", "bclrl"), ("ctr", "bcctr"), ("ctrl", "bcctrl")):
+        asm_alias("b" + condition + suffix, instruction, ("crf?",), lambda crf, BO = BO, bit = bit: (BO, crf*4 + bit))
+
+AsmTokenPattern = re.compile(r"\s*(0[xX][0-9a-fA-F]+|0[bB][01]+|\d+|[A-Za-z_.$][\w.$]*|\S)")
+AsmLabelPattern = re.compile(r"\s*([A-Za-z_.$][\w.$]*)\s*:")
+AsmMemoryPattern = re.compile(r"^(.*)\(\s*(\S+?)\s*\)$")
+AsmModifierPattern = re.compile(r"^(.*?)\s*@(ha|h|l)$")
+
+# Evaluate an expression of numbers and names with + - * ~ and parentheses.
+def asm_evaluate(text, lookup):
+    tokens = AsmTokenPattern.findall(text)
+    pos = 0
+    
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+    
+    def take():
+        nonlocal pos
+        pos += 1
+        return tokens[pos-1]
+    
+    def unary():
+        token = take() if peek() != None else None
+        if token == "-":
+            return -unary()
+        if token == "+":
+            return unary()
+        if token == "~":
+            return ~unary()
+        if token == "(":
+            val = expression()
+            if peek() != ")":
+                raise RuntimeError("Missing \")\" in \"{}\"".format(text))
+            take()
+            return val
+        if token != None and token[0].isdigit():
+            return int(token, 0)
+        if token != None and (token[0].isalpha() or token[0] in "_.$"):
+            return lookup(token)
+        raise RuntimeError("Invalid expression \"{}\"".format(text))
+    
+    def term():
+        val = unary()
+        while peek() == "*":
+            take()
+            val *= unary()
+        return val
+    
+    def expression():
+        val = term()
+        while peek() in ("+", "-"):
+            if take() == "+":
+                val += term()
+            else:
+                val -= term()
+        return val
+    
+    val = expression()
+    if pos != len(tokens):
+        raise RuntimeError("Invalid expression \"{}\"".format(text))
+    return val
+
+def asm_register(text, prefix):
+    text = text.strip().lower()
+    if prefix == "r" and text in ("sp", "rtoc"):
+        return 1 if text == "sp" else 2
+    match = re.fullmatch(r"%?(?:{})?(\d+)".format(prefix), text)
+    if match == None:
+        raise RuntimeError("Expected a register, got \"{}\"".format(text))
+    return int(match.group(1))
+
+def asm_immediate(text, signed, lookup):
+    match = AsmModifierPattern.match(text.strip())
+    if match == None:
+        return asm_evaluate(text, lookup)
+    val = asm_evaluate(match.group(1), lookup)
+    if match.group(2) == "h":
+        return hi(val, signed)
+    if match.group(2) == "l":
+        return lo(val, signed)
+    return hia(val, signed)
+
+# Parse operand strings into a flat list of values.  Memory operands give two values, d and rA.
+def asm_operands(names, operands, lookup):
+    if names and names[0].endswith("?"):
+        names = (names[0][:-1],) + names[1:]
+        if len(operands) == len(names) - 1:
+            operands = ["0"] + operands
+    if len(operands) != len(names):
+        raise RuntimeError("Expected {} operands, got {}".format(len(names), len(operands)))
+    values = []
+    for name, operand in zip(names, operands):
+        kind, shift, bits, signed = AsmOperands[name]
+        if kind == OperandGPR:
+            values.append(asm_register(operand, "r"))
+        elif kind == OperandFPR:
+            values.append(asm_register(operand, "f"))
+        elif kind == OperandCRF:
+            values.append(asm_register(operand, "cr"))
+        elif kind == OperandSPR:
+            values.append(AsmSPRs[operand.lower()] if operand.lower() in AsmSPRs else asm_evaluate(operand, lookup))
+        elif kind == OperandMem:
+            match = AsmMemoryPattern.match(operand.strip())
+            if match == None:
+                raise RuntimeError("Expected d(rA), got \"{}\"".format(operand))
+            values.append(asm_immediate(match.group(1), signed, lookup) if match.group(1).strip() else 0)
+            values.append(asm_register(match.group(2), "r"))
+        else:
+            values.append(asm_immediate(operand, signed, lookup))
+    return values
+
+def asm_encode(word, names, values, addr):
+    values = iter(values)
+    for name in names:
+        kind, shift, bits, signed = AsmOperands[name]
+        val = next(values)
+        if kind == OperandRel:
+            # Absolute branches (AA set) take the target as is
+            if not word & 0x2:
+                val -= addr
+            if val % 4:
+                raise RuntimeError("Branch displacement {:X} is misaligned".format(val))
+            val >>= 2
+        elif kind == OperandSPR:
+            val = ((val & 0x1F) << 5) | (val >> 5)
+        elif name == "SIMM" and 0x8000 <= val <= 0xFFFF:
+            # Like GNU as, take unsigned halves too (lis r3, 0x8000)
+            val -= 0x10000
+        elif kind == OperandMem:
+            word |= mask_field(next(values), 5, False) << 16
+        word |= mask_field(val, bits, signed) << shift
+    return word
+
+def asm_statements(src):
+    for lineno, line in enumerate(src.splitlines(), 1):
+        for statement in line.split("#")[0].split(";"):
+            labels = []
+            match = AsmLabelPattern.match(statement)
+            while match:
+                labels.append(match.group(1))
+                statement = statement[match.end():]
+                match = AsmLabelPattern.match(statement)
+            fields = statement.split(None, 1)
+            if not fields:
+                yield lineno, labels, "", []
+                continue
+            operands = [operand.strip() for operand in fields[1].split(",")] if len(fields) > 1 else []
+            yield lineno, labels, fields[0].lower(), operands
+
+# Assemble source text for the given address.  Labels are local to the snippet, and any other
+# name is looked up in symbols (a dict of name : value, or a project's ELF symbol table).
+def assemble_asm(src, addr = 0, symbols = None):
+    statements = []
+    labels = {}
+    offset = 0
+    for lineno, line_labels, mnemonic, operands in asm_statements(src):
+        for label in line_labels:
+            if label in labels:
+                raise RuntimeError("line {}: Label \"{}\" is already defined".format(lineno, label))
+            labels[label] = addr + offset
+        if not mnemonic:
+            continue
+        statements.append((lineno, addr + offset, mnemonic, operands))
+        offset += 4 * len(operands) if mnemonic == ".long" else 4
+    
+    words = []
+    for lineno, pc, mnemonic, operands in statements:
+        def lookup(name):
+            if name == ".":
+                return pc
+            if name in labels:
+                return labels[name]
+            if name in AsmConstants:
+                return AsmConstants[name]
+            if symbols == None or name not in symbols:
+                raise UndefinedSymbolError("line {}: Undefined symbol \"{}\"".format(lineno, name))
+            # Project symbol tables hold ELF symbols rather than plain values
+            return symbols[name] if isinstance(symbols[name], int) else symbols[name]['st_value']
+        try:
+            if mnemonic == ".long":
+                words.extend(asm_evaluate(operand, lookup) & 0xFFFFFFFF for operand in operands)
+            elif mnemonic in AsmAliases:
+                instruction, names, expand = AsmAliases[mnemonic]
+                word, instruction_names = AsmInstructions[instruction]
+                words.append(asm_encode(word, instruction_names, expand(*asm_operands(names, operands, lookup)), pc))
+            elif mnemonic in AsmInstructions:
+                word, names = AsmInstructions[mnemonic]
+                words.append(asm_encode(word, names, asm_operands(names, operands, lookup), pc))
+            else:
+                raise RuntimeError("Unknown instruction \"{}\"".format(mnemonic))
+        except UndefinedSymbolError:
+            raise
+        except RuntimeError as e:
+            raise RuntimeError("line {}: {}".format(lineno, e))
+    return pack_words(words)
@@ -0,0 +1,568 @@
+import re
+import struct
+from bisect import bisect_right
+from io import BytesIO
+from itertools import chain
+
+from dol_c_kit import assemble_branch, assemble_asm
+
+from geckolibs.gct import GeckoCodeTable
+from geckolibs.geckocode import GeckoCode, GeckoCommand, Write8, Write16, Write32, WriteString, WriteSerial, WriteBranch, AsmExecute
+
+
+# The data written by each kind of plain write command
+GeckoWriteData = {
+    Write8 : lambda gecko_command: bytes((gecko_command.value,)) * (gecko_command._repeat + 1),
+    Write16 : lambda gecko_command: gecko_command.value.to_bytes(2, "big") * (gecko_command._repeat + 1),
+    Write32 : lambda gecko_command: gecko_command.value.to_bytes(4, "big"),
+    WriteString : lambda gecko_command: gecko_command.value,
+    WriteBranch : lambda gecko_command: assemble_branch(gecko_command._address | 0x80000000, gecko_command.value | 0x80000000, gecko_command._isLink),
+}
+
+# The memory written by a plain (base address) write command, as (addr, bytes), or None if the
+# command does anything else.  Commands are told apart by class, as codetype is slow to look up.
+def gecko_command_write(gecko_command):
+    write_data = GeckoWriteData.get(type(gecko_command))
+    if write_data == None or gecko_command._isPointer:
+        return None
+    return gecko_command._address | 0x80000000, write_data(gecko_command)
+
+# Every write made by a plain command, as a list of (addr, bytes).  Serial writes are expanded
+# all at once, and into a single write when their elements are contiguous.
+def gecko_command_writes(gecko_command):
+    if type(gecko_command) != WriteSerial:
+        write = gecko_command_write(gecko_command)
+        return [] if write == None else [write]
+    if gecko_command._isPointer or gecko_command._valueSize > 2:
+        return []
+    size = 1 << gecko_command._valueSize
+    mask = (1 << size*8) - 1
+    count = gecko_command._repeat + 1
+    addr = gecko_command._address | 0x80000000
+    step = gecko_command._addressInc
+    values = [(gecko_command.value + gecko_command.valueInc*i) & mask for i in range(count)]
+    data = struct.pack(">{}{}".format(count, "BHI"[gecko_command._valueSize]), *values)
+    if step == size:
+        return [(addr, data)]
+    return [(addr + step*i, data[i*size:(i+1)*size]) for i in range(count)]
+
+# Every write made by the given codes, in the order the code handler would make them
+def gecko_code_writes(gecko_codes):
+    writes = []
+    for gecko_code in gecko_codes:
+        for gecko_command in gecko_code:
+            writes.extend(gecko_command_writes(gecko_command))
+    return writes
+
+# Copy merged runs into a DOL's SectionBuffers.  Parts of a run outside of every section are
+# skipped.  Returns the number of bytes written.
+def apply_runs(buffers, runs):
+    written = 0
+    for addr, data in runs:
+        i = max(bisect_right(buffers.addresses, addr) - 1, 0)
+        end = addr + len(data)
+        while i < len(buffers.addresses) and buffers.addresses[i] < end:
+            start = max(addr, buffers.addresses[i])
+            stop = min(end, buffers.ends[i])
+            if start < stop:
+                buffer, offset = buffers.locate(start, stop - start)
+                buffer[offset:offset+stop-start] = data[start-addr:stop-addr]
+                written += stop - start
+            i += 1
+    return written
+
+# Merge writes into runs of contiguous memory.  Where writes overlap, later ones win, just like
+# they would when the handler runs them in order.
+def merge_writes(writes):
+    addrs = [addr for addr, data in writes]
+    order = sorted(range(len(writes)), key = addrs.__getitem__)
+    groups = []
+    for i in order:
+        addr, data = writes[i]
+        if groups and addr <= groups[-1][1]:
+            groups[-1][1] = max(groups[-1][1], addr + len(data))
+            groups[-1][2].append(i)
+        else:
+            groups.append([addr, addr + len(data), [i]])
+    
+    runs = []
+    for start, end, members in groups:
+        run = bytearray(end - start)
+        for i in sorted(members):
+            addr, data = writes[i]
+            run[addr-start:addr-start+len(data)] = data
+        runs.append((start, run))
+    return runs
+
+# Gekko cache lines are 32 bytes
+CacheLineSize = 32
+
+# Lay out the trampolines of C2/F2 commands.  Each insert overwrites the hook branch of any earlier
+# one at the same address, so only the last insert at each address gets a trampoline.  The rest
+# are packed to span as few cache lines as their sizes allow: the largest start on a fresh line,
+# and smaller ones fill the gaps left at the ends of lines, first fit.  Returns the offset of
+# every insert's trampoline (None for the dropped ones) and the total size.
+def pack_trampolines(inserts):
+    last = {}
+    for i, gecko_command in enumerate(inserts):
+        last[gecko_command._address] = i
+    
+    offsets = [None] * len(inserts)
+    gaps = []
+    size = 0
+    end = 0
+    for i in sorted(last.values(), key = lambda i: (-len(inserts[i].value), i)):
+        length = len(inserts[i].value)
+        for gap in gaps:
+            if gap[1] >= length:
+                offsets[i] = gap[0]
+                gap[0] += length
+                gap[1] -= length
+                break
+        else:
+            offsets[i] = size
+            size += length
+            if size % CacheLineSize:
+                gaps.append([size, -size % CacheLineSize])
+                size += -size % CacheLineSize
+        end = max(end, offsets[i] + length)
+    return offsets, end
+
+def gecko_code_size(gecko_commands):
+    return sum(len(chunk) for gecko_command in gecko_commands for chunk in gecko_command_chunks(gecko_command))
+
+# Split data at runs of zeros at least threshold bytes long.  Returns (offset, length, zero)
+# for every piece, in order.
+def split_zero_runs(data, threshold):
+    pieces = []
+    pos = 0
+    for match in re.finditer(b"\\x00{%d,}" % threshold, data):
+        if match.start() > pos:
+            pieces.append((pos, match.start() - pos, False))
+        pieces.append((match.start(), match.end() - match.start(), True))
+        pos = match.end()
+    if pos < len(data):
+        pieces.append((pos, len(data) - pos, False))
+    return pieces
+
+# Every way of encoding a run that applies, as lists of commands.  The cheapest one is used.
+def encode_run(addr, data):
+    data = bytes(data)
+    n = len(data)
+    options = []
+    if n == 4 and addr % 4 == 0:
+        options.append([Write32(data, addr)])
+    if n == 2 and addr % 2 == 0:
+        options.append([Write16(data, addr)])
+    if n == 1:
+        options.append([Write8(data, addr)])
+    # Fills of a repeated byte or halfword
+    if n > 1 and data.count(data[0]) == n:
+        options.append([Write8(data[0], addr + i, min(n - i, 0x10000) - 1) for i in range(0, n, 0x10000)])
+    if n > 2 and n % 2 == 0 and addr % 2 == 0 and data == data[:2] * (n // 2):
+        options.append([Write16(data[:2], addr + i*2, min(n//2 - i, 0x10000) - 1) for i in range(0, n//2, 0x10000)])
+    # Words in an arithmetic progression, like pointer tables with a fixed stride
+    if n > 4 and n % 4 == 0 and addr % 4 == 0:
+        words = [int.from_bytes(data[i:i+4], "big") for i in range(0, n, 4)]
+        step = (words[1] - words[0]) & 0xFFFFFFFF
+        if all((words[i+1] - words[i]) & 0xFFFFFFFF == step for i in range(len(words) - 1)):
+            options.append([WriteSerial(words[i], addr + i*4, min(len(words) - i, 0x1000) - 1, valueSize = 2, addrInc = 4,
+                                        valueInc = step) for i in range(0, len(words), 0x1000)])
+    options.append([WriteString(data, addr)])
+    return min(options, key = gecko_code_size)
+
+# Zero runs longer than this are cheaper as their own fill than inside a string write
+ZeroRunSplit = 24
+
+# Sort all plain writes, merge adjacent ones, and encode every run with the cheapest codetype.
+# Other commands are kept as they are, and writes are never moved across them.
+def optimize_gecko_commands(gecko_commands):
+    optimized = []
+    writes = []
+    for gecko_command in chain(gecko_commands, [None]):
+        command_writes = gecko_command_writes(gecko_command) if gecko_command != None else []
+        if command_writes:
+            writes.extend(command_writes)
+            continue
+        for addr, data in merge_writes(writes):
+            for offset, length, zero in split_zero_runs(data, ZeroRunSplit):
+                optimized.extend(encode_run(addr + offset, data[offset:offset+length]))
+        writes = []
+        if gecko_command != None:
+            optimized.append(gecko_command)
+    return optimized
+
+# Program Data as writes, split at zero runs at least threshold bytes long.  If the memory is
+# known to be zeroed already the zero runs are left out, otherwise they're filled.
+def program_data_commands(addr, data, threshold = None, zeroed = True):
+    if threshold == None:
+        return [WriteString(bytes(data), addr)]
+    gecko_commands = []
+    for offset, length, zero in split_zero_runs(data, threshold):
+        if not zero:
+            gecko_commands.append(WriteString(bytes(data[offset:offset+length]), addr + offset))
+        elif not zeroed:
+            gecko_commands.extend(encode_run(addr + offset, bytes(length)))
+    return gecko_commands
+
+GCTMagic = b"\x00\xD0\xC0\xDE\x00\xD0\xC0\xDE"
+GCTTerminator = b"\xF0\x00\x00\x00\x00\x00\x00\x00"
+# Long payloads are written this many bytes at a time
+GeckoChunkSize = 0x10000
+
+# The raw bytes of a command in pieces of whole lines.  String writes and C0 codes can be
+# megabytes long, so they're sliced from their data instead of copied by as_bytes.
+def gecko_command_chunks(gecko_command):
+    if gecko_command.codetype == GeckoCommand.Type.WRITE_STR:
+        codetype = 0x16 if gecko_command.is_po_type() else 0x06
+        yield ((codetype << 24 | gecko_command._address) << 32 | len(gecko_command.value)).to_bytes(8, "big")
+    elif gecko_command.codetype == GeckoCommand.Type.ASM_EXECUTE:
+        yield (0xC0 << 56 | (len(gecko_command.value) + 7) // 8).to_bytes(8, "big")
+    else:
+        yield gecko_command.as_bytes()
+        return
+    data = memoryview(gecko_command.value)
+    for i in range(0, len(data), GeckoChunkSize):
+        chunk = data[i:i+GeckoChunkSize]
+        yield chunk if len(chunk) % 8 == 0 else bytes(chunk) + bytes(-len(chunk) % 8)
+
+# Write a command to a binary GCT, returning the number of bytes written
+def write_gecko_binary(f, gecko_command):
+    size = 0
+    for chunk in gecko_command_chunks(gecko_command):
+        f.write(chunk)
+        size += len(chunk)
+    return size
+
+# Write a command to a textual code list, one line at a time.  Returns the binary size.
+def write_gecko_text(f, gecko_command):
+    size = 0
+    for chunk in gecko_command_chunks(gecko_command):
+        words = struct.unpack(">{}I".format(len(chunk) // 4), chunk)
+        f.write("%08X %08X\n" * (len(words) // 2) % words)
+        size += len(chunk)
+    return size
+
+# Yaz0 limits: 4KB window, matches of 3 to 0x111 bytes
+Yaz0Window = 0x1000
+Yaz0MaxMatch = 0x111
+# Positions tried per match, newest first.  More compress better, but slower.
+Yaz0Chain = 32
+
+def yaz0_compress(data):
+    data = bytes(data)
+    size = len(data)
+    out = bytearray(b"Yaz0" + size.to_bytes(4, "big") + bytes(8))
+    chains = {}
+    pos = 0
+    while pos < size:
+        code_pos = len(out)
+        code = 0
+        out.append(0)
+        for bit in range(8):
+            if pos >= size:
+                break
+            best_length = 0
+            best_dist = 0
+            limit = min(Yaz0MaxMatch, size - pos)
+            for cand in reversed(chains.get(data[pos:pos+3], ())[-Yaz0Chain:]):
+                if pos - cand > Yaz0Window:
+                    break
+                if data[cand+best_length:cand+best_length+1] != data[pos+best_length:pos+best_length+1]:
+                    continue
+                length = 0
+                while length < limit and data[cand+length] == data[pos+length]:
+                    length += 1
+                if length > best_length:
+                    best_length = length
+                    best_dist = pos - cand
+                    if length == limit:
+                        break
+            if best_length < 3:
+                code |= 0x80 >> bit
+                out.append(data[pos])
+                best_length = 1
+            elif best_length < 0x12:
+                out += (((best_length - 2) << 12) | (best_dist - 1)).to_bytes(2, "big")
+            else:
+                out += (best_dist - 1).to_bytes(2, "big")
+                out.append(best_length - 0x12)
+            for i in range(pos, pos + best_length):
+                chains.setdefault(data[i:i+3], []).append(i)
+            pos += best_length
+        out[code_pos] = code
+    return bytes(out)
+
+def yaz0_decompress(data):
+    if data[:4] != b"Yaz0":
+        raise RuntimeError("Not Yaz0 compressed data")
+    size = int.from_bytes(data[4:8], "big")
+    out = bytearray()
+    pos = 16
+    while len(out) < size:
+        code = data[pos]
+        pos += 1
+        for bit in range(8):
+            if len(out) >= size:
+                break
+            if code & (0x80 >> bit):
+                out.append(data[pos])
+                pos += 1
+                continue
+            dist = ((data[pos] & 0xF) << 8 | data[pos+1]) + 1
+            length = data[pos] >> 4
+            pos += 2
+            if length == 0:
+                length = data[pos] + 0x12
+                pos += 1
+            else:
+                length += 2
+            for i in range(length):
+                out.append(out[-dist])
+    return bytes(out)
+
+# Decompresses the Yaz0 data following it (without the header) to [base, end), flushes the
+# caches, and then overwrites its own first instruction with a blr so it only runs once.
+Yaz0Stub = """
+start:
+    mflr r12
+    bl anchor
+anchor:
+    mflr r11
+    mtlr r12
+    addi r4, r11, data - anchor
+    lis r3, base@ha
+    addi r3, r3, base@l
+    lis r5, end@ha
+    addi r5, r5, end@l
+    mr r10, r3
+group:
+    cmplw r3, r5
+    bge done
+    lbz r6, 0(r4)
+    addi r4, r4, 1
+    li r7, 8
+    mtctr r7
+bit:
+    cmplw r3, r5
+    bge done
+    rlwinm. r0, r6, 0, 24, 24
+    slwi r6, r6, 1
+    beq backref
+    lbz r0, 0(r4)
+    addi r4, r4, 1
+    stb r0, 0(r3)
+    addi r3, r3, 1
+    bdnz bit
+    b group
+backref:
+    lbz r7, 0(r4)
+    lbz r8, 1(r4)
+    addi r4, r4, 2
+    rlwinm r9, r7, 8, 20, 23
+    or r9, r9, r8
+    addi r9, r9, 1
+    srwi. r7, r7, 4
+    addi r7, r7, 2
+    bne copy_start
+    lbz r7, 0(r4)
+    addi r4, r4, 1
+    addi r7, r7, 0x12
+copy_start:
+    sub r9, r3, r9
+copy:
+    lbz r0, 0(r9)
+    addi r9, r9, 1
+    stb r0, 0(r3)
+    addi r3, r3, 1
+    subic. r7, r7, 1
+    bne copy
+    bdnz bit
+    b group
+done:
+    clrrwi r10, r10, 5
+flush:
+    dcbst 0, r10
+    sync
+    icbi 0, r10
+    addi r10, r10, 32
+    cmplw r10, r5
+    blt flush
+    sync
+    isync
+    lis r0, 0x4E80
+    ori r0, r0, 0x0020
+    addi r9, r11, start - anchor
+    stw r0, 0(r9)
+    dcbst 0, r9
+    sync
+    icbi 0, r9
+    isync
+    blr
+data:
+"""
+
+# Program Data as a C0 code which unpacks a Yaz0 compressed copy to addr once.  Registers r0
+# and r3-r12 are free to use in C0 codes.
+def compressed_program_data_code(addr, data):
+    stub = assemble_asm(Yaz0Stub, 0, {"base" : addr, "end" : addr + len(data)})
+    return AsmExecute(stub + yaz0_compress(data)[16:])
+
+GeckoLinePattern = re.compile(r"([0-9A-Fa-f]{8})\s+([0-9A-Fa-f]{8})")
+
+# One code of a code list, kept as raw bytes until a build needs its commands
+class GeckoCodeEntry(object):
+    def __init__(self, name, author, desc, data, enabled = True, preapplicable = True):
+        self.name = name
+        self.author = author
+        self.desc = desc
+        self.data = data
+        self.enabled = enabled
+        self.preapplicable = preapplicable
+    
+    # Disabled codes are never applied or copied, so they don't get any commands
+    def materialize(self):
+        gecko_code = GeckoCode(self.name, self.author, self.desc, enabled = self.enabled, preapplicable = self.preapplicable)
+        if self.enabled:
+            f = BytesIO(self.data)
+            while f.tell() < len(self.data):
+                gecko_command = GeckoCommand.bytes_to_geckocommand(f)
+                gecko_code.add_child(gecko_command)
+                if gecko_command.codetype == GeckoCommand.Type.EXIT:
+                    break
+        return gecko_code
+
+# Read a code list, telling its type from its first line like GeckoCodeTable.detect_codelist_type.
+# Dolphin style lists are read here, one line at a time.  Ocarina style lists (which start with a
+# game ID) and raw lists of code lines are read by GeckoCodeTable.from_text.
+def read_gecko_text(f):
+    lines = iter(f)
+    head = []
+    for line in lines:
+        head.append(line)
+        if line.strip():
+            break
+    first = head[-1].strip() if head else ""
+    if not first:
+        return []
+    if first.startswith("["):
+        entries = read_dolphin_gecko_text(chain(head, lines))
+    else:
+        try:
+            gecko_codetable = GeckoCodeTable.from_text("".join(head) + "".join(lines))
+        except ValueError as e:
+            raise RuntimeError("\"{}\" is not a valid code list ({})".format(getattr(f, "name", "Code list"), e))
+        entries = [GeckoCodeEntry(gecko_code.name, gecko_code.author, gecko_code.desc or "", gecko_code.as_bytes(),
+                                  gecko_code.is_enabled(), gecko_code.is_preapplicable()) for gecko_code in gecko_codetable]
+    if not entries:
+        raise RuntimeError("\"{}\" has no Gecko codes in it".format(getattr(f, "name", "Code list")))
+    return entries
+
+# Codes listed under [Gecko_Enabled] are enabled; if there is no such section, every code is.
+def read_dolphin_gecko_text(lines):
+    entries = []
+    enabled_names = None
+    section = "[Gecko]"
+    entry = None
+    data = bytearray()
+    desc = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith("[") and line.endswith("]") and not line.lower().endswith(GeckoCodeTable.VolatileToken):
+            section = line
+            if section == "[Gecko_Enabled]" and enabled_names == None:
+                enabled_names = set()
+            continue
+        if section == "[Gecko_Enabled]":
+            if line.startswith("$"):
+                enabled_names.add(line[1:].strip())
+            continue
+        if section != "[Gecko]":
+            continue
+        if line.startswith("$"):
+            if entry != None:
+                entry.data = bytes(data)
+                entry.desc = "\n".join(desc)
+                entries.append(entry)
+            data = bytearray()
+            desc = []
+            line = line[1:]
+            preapplicable = True
+            if line.lower().endswith(GeckoCodeTable.VolatileToken):
+                preapplicable = False
+                line = line[:-len(GeckoCodeTable.VolatileToken)].strip()
+            author = None
+            n = line[::-1].find("[") + 1
+            if n != 0 and line.endswith("]"):
+                author = line[-n+1:-1].strip()
+                line = line[:-n]
+            entry = GeckoCodeEntry(line.strip(), author, "", b"", preapplicable = preapplicable)
+        elif line.startswith("*"):
+            desc.append(line[1:])
+        elif entry != None:
+            match = GeckoLinePattern.fullmatch(line)
+            if match != None:
+                data += bytes.fromhex(match.group(1) + match.group(2))
+    if entry != None:
+        entry.data = bytes(data)
+        entry.desc = "\n".join(desc)
+        entries.append(entry)
+    if enabled_names != None:
+        for entry in entries:
+            entry.enabled = entry.name in enabled_names
+    return entries
+
+# A binary GCT holds one nameless code
+def read_gecko_gct(f, name):
+    data = f.read()
+    if data[:8] != GCTMagic:
+        raise RuntimeError("\"{}\" is not a Gecko Code Table".format(name))
+    data = data[8:]
+    if data[-8:] == GCTTerminator:
+        data = data[:-8]
+    return [GeckoCodeEntry(name, None, "", data)]
+
+GeckoCacheMagic = b"DOLGCL02"
+
+# The digest is of the code list the entries were read from, so a cache can be checked against it
+def save_gecko_entries(filepath, entries, digest = None):
+    with open(filepath, "wb") as f:
+        f.write(GeckoCacheMagic + bytes.fromhex(digest if digest != None else "00"*32) + struct.pack(">I", len(entries)))
+        for entry in entries:
+            strings = [(text if text != None else "").encode("utf-8") for text in (entry.name, entry.author, entry.desc)]
+            flags = int(entry.enabled) | int(entry.preapplicable) << 1 | int(entry.author != None) << 2
+            f.write(struct.pack(">BHHII", flags, len(strings[0]), len(strings[1]), len(strings[2]), len(entry.data)))
+            f.write(b"".join(strings))
+            f.write(entry.data)
+
+# Returns None if the cache is of a different code list
+def load_gecko_entries(filepath, digest = None):
+    with open(filepath, "rb") as f:
+        data = f.read()
+    if data[:8] != GeckoCacheMagic:
+        raise RuntimeError("\"{}\" is not a Gecko code list cache".format(filepath))
+    if digest != None and data[8:40] != bytes.fromhex(digest):
+        return None
+    try:
+        return parse_gecko_entries(data)
+    except (struct.error, UnicodeDecodeError):
+        raise RuntimeError("\"{}\" is not a Gecko code list cache".format(filepath))
+
+def parse_gecko_entries(data):
+    count, = struct.unpack_from(">I", data, 40)
+    pos = 44
+    entries = []
+    for i in range(count):
+        flags, name_size, author_size, desc_size, data_size = struct.unpack_from(">BHHII", data, pos)
+        pos += 13
+        name = data[pos:pos+name_size].decode("utf-8")
+        pos += name_size
+        author = data[pos:pos+author_size].decode("utf-8") if flags & 4 else None
+        pos += author_size
+        desc = data[pos:pos+desc_size].decode("utf-8")
+        pos += desc_size
+        entries.append(GeckoCodeEntry(name, author, desc, data[pos:pos+data_size], bool(flags & 1), bool(flags & 2)))
+        pos += data_size
+    if pos != len(data):
+        raise struct.error("Trailing data")
+    return entries
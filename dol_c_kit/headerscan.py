@@ -0,0 +1,694 @@
+import hashlib
+import json
+import re
+
+from dol_c_kit.mangle import MangleError, PrototypeCursor, Signature, format_signature, normalise_prototype
+
+# Reads declarations out of C++ headers, so a linker script can be made from headers and a list
+# of addresses instead of typing out every prototype.  Only a practical subset of C++ is
+# understood: namespaces, classes, structs, enums, typedefs, functions, and global and static
+# member variables.  The preprocessor isn't run, so macros are left as they are, and both sides
+# of an #if are read.
+
+# Whitespace, comments and preprocessor lines are skipped.  Everything else is a string, an
+# identifier, a number, or one character of punctuation.
+token_pattern = re.compile(r"""
+    ^[ \t]*\#(?:\\\r?\n|[^\n])* | [ \t\r\n\f\v]+ | //[^\n]* | /\*.*?\*/
+  | ( "(?:\\.|[^"\\\n])*" | '(?:\\.|[^'\\\n])*' | :: | \.\.\. | && | [A-Za-z_$][A-Za-z0-9_$]* | [0-9][A-Za-z0-9_.']* | \S )
+""", re.M | re.S | re.X)
+
+# Thrown away wherever they are in a declaration
+specifiers = {
+    "static", "virtual", "inline", "extern", "explicit", "constexpr", "mutable", "register",
+    "__inline", "__inline__", "__forceinline", "thread_local", "typename",
+    "struct", "class", "union", "enum",
+}
+# Spelled the way the mangler wants them, in any order they're written in
+integer_words = {"signed", "unsigned", "short", "long", "int", "char", "double", "float"}
+type_keywords = integer_words | {
+    "void", "bool", "wchar_t", "char8_t", "char16_t", "char32_t", "auto", "const", "volatile",
+    "__int64", "__int128", "__float80", "__float128",
+}
+# Attributes which take an argument list, all of which is thrown away
+attributes = {"__attribute__", "__declspec", "alignas", "__asm", "asm"}
+access_specifiers = {"public", "private", "protected"}
+# Operators which are unary with one operand, and binary with two
+unary_operators = {"operator +", "operator -", "operator *", "operator &"}
+# Where a function body can start, rather than a brace initializer
+body_openers = {")", "const", "override", "final", "noexcept", "volatile"}
+
+def tokenize(text):
+    return [token for token in token_pattern.findall(text) if token]
+
+def is_identifier(token):
+    return token[:1].isalpha() or token[:1] == "_" or token[:1] == "$"
+
+# "long unsigned" and friends, as the mangler spells them
+def integer_type(words):
+    if "char" in words:
+        base = "char"
+        if "signed" in words:
+            return ["signed", "char"]
+    elif "double" in words:
+        base = "long double" if "long" in words else "double"
+    elif "float" in words:
+        base = "float"
+    elif "short" in words:
+        base = "short"
+    else:
+        base = ["int", "long int", "long long int"][min(words.count("long"), 2)]
+    if "unsigned" in words:
+        base = "unsigned " + base
+    return base.split()
+
+# The index of the bracket closing the one at tokens[i]
+def find_close(tokens, i):
+    opener = tokens[i]
+    closer = {"(" : ")", "[" : "]", "{" : "}", "<" : ">"}[opener]
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j] == opener:
+            depth += 1
+        elif tokens[j] == closer:
+            depth -= 1
+            if depth == 0:
+                return j
+    return len(tokens) - 1
+
+# Split tokens at the commas which aren't inside brackets
+def split_commas(tokens):
+    parts = [[]]
+    depth = 0
+    for token in tokens:
+        if token in "([{<":
+            depth += 1
+        elif token in ")]}>":
+            depth -= 1
+        elif token == "," and depth == 0:
+            parts.append([])
+            continue
+        parts[-1].append(token)
+    return parts
+
+def strip_attributes(tokens):
+    result = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in attributes and tokens[i+1:i+2] == ["("]:
+            i = find_close(tokens, i + 1) + 1
+            continue
+        if token == "[" and tokens[i+1:i+2] == ["["]:
+            i = find_close(tokens, i) + 1
+            continue
+        result.append(token)
+        i += 1
+    return result
+
+# A type as the mangler wants it: specifiers dropped, integer types spelled out.  Names are
+# resolved later, since that needs every header.
+def normalise_type(tokens):
+    result = []
+    words = []
+    for token in tokens:
+        if token in integer_words:
+            words.append(token)
+            continue
+        if words:
+            result.extend(integer_type(words))
+            words = []
+        if token == "volatile":
+            raise MangleError("volatile types aren't supported")
+        if token not in specifiers:
+            result.append(token)
+    if words:
+        result.extend(integer_type(words))
+    return result
+
+# A function parameter's type, without its name or default value
+def parse_parameter(tokens):
+    tokens = split_at(tokens, "=")
+    if "(" in tokens:
+        raise MangleError("function pointer parameters aren't supported")
+    if "[" in tokens:
+        # Arrays are pointers, as parameters
+        if tokens.count("[") > 1:
+            raise MangleError("multidimensional array parameters aren't supported")
+        tokens = tokens[:tokens.index("[")]
+        if len(tokens) > 1 and is_identifier(tokens[-1]) and tokens[-1] not in type_keywords:
+            tokens = tokens[:-1]
+        tokens = tokens + ["*"]
+    elif len(tokens) > 1 and is_identifier(tokens[-1]) and tokens[-1] not in type_keywords and tokens[-2] != "::" \
+    and any(token != "const" and (is_identifier(token) or token == ">") for token in tokens[:-1]):
+        tokens = tokens[:-1]
+    return normalise_type(tokens)
+
+# The tokens before the first of a token outside of brackets
+def split_at(tokens, stop):
+    depth = 0
+    for i, token in enumerate(tokens):
+        if token in "([{<":
+            depth += 1
+        elif token in ")]}>":
+            depth -= 1
+        elif token == stop and depth == 0:
+            return tokens[:i]
+    return tokens
+
+# What one header declares, before any names in it are resolved.  This only depends on the text
+# of the header, so it's what is cached.
+#   classes      : qualified names of classes, structs, unions and enums
+#   typedefs     : [qualified name, scope, type tokens], or None for the type if it can't be mangled
+#   declarations : [scope, extern "C", name, parameter types or None for variables, const, error]
+class HeaderParser(object):
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.pos = 0
+        # (kind, names) for each enclosing namespace, class, and extern block
+        self.scopes = []
+        self.classes = []
+        self.typedefs = []
+        self.declarations = []
+    
+    def scope(self):
+        return [name for kind, names in self.scopes for name in names]
+    
+    def extern_c(self):
+        for kind, names in reversed(self.scopes):
+            if kind == "C" or kind == "C++":
+                return kind == "C"
+        return False
+    
+    # Declarations in anonymous namespaces and anonymous structs don't get symbols
+    def hidden(self):
+        return any(kind == "anonymous" for kind, names in self.scopes)
+    
+    def in_class(self):
+        return bool(self.scopes) and self.scopes[-1][0] == "class"
+    
+    def scan(self):
+        tokens = self.tokens
+        while self.pos < len(tokens):
+            token = tokens[self.pos]
+            following = tokens[self.pos+1] if self.pos + 1 < len(tokens) else ""
+            if token == ";":
+                self.pos += 1
+            elif token == "}":
+                self.pos += 1
+                if self.scopes:
+                    kind, names = self.scopes.pop()
+                    if kind == "class" or kind == "struct":
+                        # Variables declared after the body aren't supported
+                        self.read_statement()
+            elif token == "namespace":
+                self.scan_namespace()
+            elif token == "extern" and following[:1] == "\"":
+                if tokens[self.pos+2:self.pos+3] == ["{"]:
+                    self.scopes.append(("C" if following == "\"C\"" else "C++", []))
+                    self.pos += 3
+                else:
+                    self.pos += 2
+                    self.scan_declaration(self.read_statement(), following == "\"C\"")
+            elif token == "template":
+                self.pos += 1
+                if tokens[self.pos:self.pos+1] == ["<"]:
+                    self.pos = find_close(tokens, self.pos) + 1
+                self.read_statement()
+            elif token in access_specifiers and following == ":":
+                self.pos += 2
+            elif token == "typedef":
+                self.scan_typedef(self.read_statement()[1:])
+            elif token == "using":
+                statement = self.read_statement()
+                if len(statement) > 3 and statement[2] == "=":
+                    self.add_typedef(statement[1], statement[3:])
+            elif token in ("class", "struct", "union") and self.scan_class():
+                pass
+            elif token == "enum" and self.scan_enum():
+                pass
+            elif token == "friend" or token == "static_assert":
+                self.read_statement()
+            else:
+                self.scan_declaration(self.read_statement(), self.extern_c())
+        return self
+    
+    # The tokens up to the end of a declaration.  Function bodies and brace initializers are
+    # skipped over, and aren't included.
+    def read_statement(self):
+        tokens = self.tokens
+        start = self.pos
+        depth = 0
+        while self.pos < len(tokens):
+            token = tokens[self.pos]
+            if token == "(" or token == "[":
+                depth += 1
+            elif token == ")" or token == "]":
+                depth -= 1
+            elif depth == 0:
+                if token == ";":
+                    self.pos += 1
+                    return tokens[start:self.pos-1]
+                if token == "}":
+                    # The end of a scope, which the caller handles
+                    return tokens[start:self.pos]
+                if token == "{":
+                    statement = tokens[start:self.pos]
+                    self.pos = find_close(tokens, self.pos) + 1
+                    if "(" in statement and statement[-1] in body_openers:
+                        return statement
+                    continue
+            self.pos += 1
+        return tokens[start:]
+    
+    def scan_namespace(self):
+        tokens = self.tokens
+        self.pos += 1
+        names = []
+        while self.pos < len(tokens) and tokens[self.pos] not in ("{", ";", "="):
+            if is_identifier(tokens[self.pos]) and tokens[self.pos] != "inline":
+                names.append(tokens[self.pos])
+            self.pos += 1
+        if tokens[self.pos:self.pos+1] == ["{"]:
+            self.pos += 1
+            self.scopes.append(("namespace", names) if names else ("anonymous", []))
+        else:
+            # Namespace aliases
+            self.read_statement()
+    
+    # A class definition or forward declaration.  Returns False for anything else starting with
+    # "class", like "struct Foo* foo();", which is left to be read as a declaration.
+    def scan_class(self):
+        tokens = self.tokens
+        i = self.pos + 1
+        name = []
+        while i < len(tokens):
+            token = tokens[i]
+            if token in ("{", ":", ";"):
+                break
+            if token in attributes and tokens[i+1:i+2] == ["("]:
+                i = find_close(tokens, i + 1) + 1
+                continue
+            if token == "::":
+                name.append(tokens[i+1])
+                i += 2
+                continue
+            if not is_identifier(token):
+                return False
+            if token != "final":
+                # Export macros come before the name
+                name = [token]
+            i += 1
+        if i == len(tokens):
+            return False
+        
+        if name:
+            self.classes.append("::".join(self.scope() + name))
+        if tokens[i] == ";":
+            self.pos = i + 1
+            return True
+        # Skip the base classes
+        while i < len(tokens) and tokens[i] != "{":
+            if tokens[i] == ";":
+                self.pos = i + 1
+                return True
+            i += 1
+        self.pos = i + 1
+        self.scopes.append(("class", name) if name else ("anonymous", []))
+        return True
+    
+    def scan_enum(self):
+        tokens = self.tokens
+        i = self.pos + 1
+        if tokens[i:i+1] == ["class"] or tokens[i:i+1] == ["struct"]:
+            i += 1
+        if i < len(tokens) and is_identifier(tokens[i]) and tokens[i+1:i+2] in (["{"], [":"], [";"]):
+            self.classes.append("::".join(self.scope() + [tokens[i]]))
+        elif tokens[i:i+1] != ["{"]:
+            return False
+        # The body and anything declared after it
+        self.read_statement()
+        return True
+    
+    def add_typedef(self, name, tokens):
+        if self.hidden():
+            return
+        try:
+            tokens = normalise_type(strip_attributes(tokens))
+            if "(" in tokens or "[" in tokens:
+                tokens = None
+        except MangleError:
+            tokens = None
+        self.typedefs.append(["::".join(self.scope() + [name]), self.scope(), tokens])
+    
+    def scan_typedef(self, tokens):
+        tokens = strip_attributes(tokens)
+        if not tokens:
+            return
+        
+        # typedef struct Tag { ... } Name, *PName;
+        if tokens[0] in ("struct", "class", "union", "enum") and "{" in tokens:
+            brace = tokens.index("{")
+            tag = tokens[brace-1] if brace > 1 and is_identifier(tokens[brace-1]) else None
+            declarators = split_commas(tokens[find_close(tokens, brace)+1:])
+            if tag != None:
+                self.classes.append("::".join(self.scope() + [tag]))
+            for declarator in declarators:
+                if not declarator or not is_identifier(declarator[-1]):
+                    continue
+                if tag == None and len(declarator) == 1:
+                    # An anonymous struct is named after its typedef
+                    tag = declarator[0]
+                    self.classes.append("::".join(self.scope() + [tag]))
+                else:
+                    self.add_typedef(declarator[-1], [tag] + declarator[:-1])
+            return
+        
+        # typedef void (*Name)(int);
+        if "(" in tokens:
+            i = tokens.index("(")
+            if tokens[i+1:i+2] in (["*"], ["&"]):
+                names = [token for token in tokens[i+2:find_close(tokens, i)] if is_identifier(token)]
+            else:
+                names = [tokens[i-1]] if i > 0 else []
+            if names:
+                self.add_typedef(names[-1], ["("])
+            return
+        
+        # typedef unsigned long u32, *pu32;
+        declarators = split_commas(tokens)
+        base = None
+        for declarator in declarators:
+            array = "[" in declarator
+            if array:
+                declarator = declarator[:declarator.index("[")]
+            if not declarator or not is_identifier(declarator[-1]):
+                continue
+            if base == None:
+                # Everything in the first one up to the pointers is the base type
+                first = declarator[:-1]
+                cut = len(first)
+                while cut > 0 and first[cut-1] in ("*", "&", "const"):
+                    cut -= 1
+                base = first[:cut]
+            else:
+                first = base + declarator[:-1]
+            self.add_typedef(declarator[-1], ["["] if array else first)
+    
+    def scan_declaration(self, tokens, extern_c):
+        tokens = strip_attributes(tokens)
+        if not tokens or "template" in tokens or self.hidden():
+            return
+        static = "static" in tokens
+        # Only const variables in namespaces which aren't extern have internal linkage
+        internal = not self.in_class() and "extern" not in tokens
+        
+        # Find the parameter list, which is after the name.  "operator ()" has one of its own.
+        operator = tokens.index("operator") if "operator" in tokens else None
+        equals = tokens.index("=") if "=" in tokens else len(tokens)
+        if operator != None:
+            if tokens[operator+1:operator+3] == ["(", ")"]:
+                open = operator + 3
+            else:
+                open = tokens.index("(", operator) if "(" in tokens[operator:] else None
+        else:
+            open = tokens.index("(") if "(" in tokens[:equals] else None
+        
+        if open != None and tokens[open+1:open+2] not in (["*"], ["&"], ["^"]):
+            self.scan_function(tokens, open, operator, extern_c)
+            return
+        
+        # Variables.  Members which aren't static are part of the object, not symbols.
+        if self.in_class() and not static:
+            return
+        declarators = split_commas(tokens)
+        base_const = "constexpr" in tokens
+        for n, declarator in enumerate(declarators):
+            if open != None and n == 0:
+                # Function pointer; the name is inside the brackets
+                names = [token for token in declarator[open:find_close(declarator, open)] if is_identifier(token) and token != "const"]
+                if names:
+                    self.add_declaration(extern_c, [names[-1]], None, False)
+                continue
+            end = len(declarator)
+            for stop in ("[", "=", "(", ":"):
+                if stop in declarator[:end]:
+                    end = declarator.index(stop)
+            names = declarator[:end]
+            name = []
+            while names and is_identifier(names[-1]) and names[-1] not in type_keywords:
+                name.insert(0, names.pop())
+                if names[-1:] != ["::"]:
+                    break
+                names.pop()
+            if not name:
+                continue
+            if n == 0:
+                pointers = [i for i, token in enumerate(names) if token in ("*", "&")]
+                base_const = base_const or "const" in (names[:pointers[0]] if pointers else names)
+            if "*" in names:
+                const = names[-1:] == ["const"]
+            else:
+                const = base_const
+            self.add_declaration(extern_c, name, None, const and internal)
+    
+    def scan_function(self, tokens, open, operator, extern_c):
+        close = find_close(tokens, open)
+        qualifiers = tokens[close+1:]
+        if qualifiers[-2:] == ["=", "delete"]:
+            return
+        const = "const" in split_at(qualifiers, "=")
+        error = None
+        
+        # The name, and whatever it's qualified by
+        if operator != None:
+            symbol = tokens[operator+1:open]
+            if tokens[open-2:open] == ["(", ")"] and open == operator + 3:
+                symbol = ["(", ")"]
+            if symbol and all(is_identifier(token) for token in symbol) and symbol[0] not in ("new", "delete", "co_await"):
+                error = "conversion operators aren't supported"
+            name = ["operator " + "".join(symbol).replace("new[", "new [").replace("delete[", "delete [")]
+            start = operator
+        else:
+            start = open - 1
+            if start < 0 or not is_identifier(tokens[start]):
+                return
+            name = [tokens[start]]
+            if tokens[start-1:start] == ["~"]:
+                start -= 1
+                name = ["$$dtor"]
+        while start >= 2 and tokens[start-1] == "::" and is_identifier(tokens[start-2]):
+            name.insert(0, tokens[start-2])
+            start -= 2
+        if name[-1] != "$$dtor" and len(name) == 1 and self.in_class() and name[0] == self.scopes[-1][1][-1] \
+        or len(name) > 1 and name[-1] == name[-2]:
+            name[-1] = "$$ctor"
+        
+        parameters = []
+        if not extern_c:
+            try:
+                for parameter in split_commas(tokens[open+1:close]):
+                    if parameter:
+                        parameters.append(parse_parameter(strip_attributes(parameter)))
+                if "volatile" in qualifiers:
+                    raise MangleError("volatile methods aren't supported")
+            except MangleError as e:
+                error = str(e)
+        # Members have one operand already, the object
+        if name[-1] in unary_operators and len(parameters) == (0 if self.in_class() or len(name) > 1 else 1):
+            name[-1] += " $$unary"
+        self.add_declaration(extern_c, name, parameters, const, error)
+    
+    def add_declaration(self, extern_c, name, parameters, const, error = None):
+        self.declarations.append([self.scope(), extern_c, name, parameters, const, error])
+    
+    def result(self):
+        return {
+            "classes" : self.classes,
+            "typedefs" : self.typedefs,
+            "declarations" : self.declarations,
+        }
+
+def scan_header(text):
+    return HeaderParser(text).scan().result()
+
+# Everything declared by a set of headers, to look up the prototypes of names in.  Scanning a
+# header is the slow part, so each one is kept in a cache file (if given) by the digest of its
+# text, and only headers that have changed since the cache was saved are scanned again.
+class HeaderIndex(object):
+    # Bump this whenever a change to the scanner changes its output
+    Version = 2
+    
+    def __init__(self, cache_path = None):
+        self.cache_path = cache_path
+        self.cache = {}
+        self.scans = {}
+        self.headers = []
+        self.declarations = None
+        if cache_path != None:
+            self.load(cache_path)
+    
+    # Headers which aren't C++ at all can be added as extern "C"
+    def add_header(self, filepath, extern_c = False):
+        try:
+            with open(filepath, "rb") as f:
+                data = f.read()
+        except OSError:
+            print("Warning: \"{:s}\" could not be opened!".format(repr(filepath)[+1:-1]))
+            return
+        digest = hashlib.sha256(data).hexdigest()
+        if digest not in self.scans:
+            scan = self.cache.get(digest)
+            if scan == None:
+                # Comments can be in any encoding; latin-1 never fails to decode
+                scan = scan_header(data.decode("latin-1"))
+            self.scans[digest] = scan
+        self.headers.append((digest, extern_c))
+        self.declarations = None
+    
+    def add_headers(self, filepaths, extern_c = False):
+        for filepath in filepaths:
+            self.add_header(filepath, extern_c)
+    
+    # Missing or outdated cache files are ignored, since every header in them can be scanned again
+    def load(self, filepath):
+        try:
+            with open(filepath, "r") as f:
+                cache = json.load(f)
+            if cache["version"] != HeaderIndex.Version:
+                return
+            self.cache.update(cache["headers"])
+        except OSError:
+            pass
+        except (ValueError, KeyError, TypeError):
+            print("Warning: \"{:s}\" is not a valid header cache!".format(repr(filepath)[+1:-1]))
+    
+    # Only the headers in this index are saved, so ones that have been changed or removed drop out
+    def save(self, filepath = None):
+        if filepath == None:
+            filepath = self.cache_path
+        cache = {
+            "version" : HeaderIndex.Version,
+            "headers" : self.scans,
+        }
+        try:
+            with open(filepath, "w") as f:
+                json.dump(cache, f, separators = (",", ":"))
+        except OSError:
+            print("Warning: \"{:s}\" could not be opened!".format(repr(filepath)[+1:-1]))
+    
+    # Gather every header's declarations by name
+    def build(self):
+        self.classes = set()
+        self.typedefs = {}
+        self.resolved = {}
+        self.declarations = {}
+        for digest, extern_c in self.headers:
+            scan = self.scans[digest]
+            self.classes.update(scan["classes"])
+            for name, scope, tokens in scan["typedefs"]:
+                self.typedefs[name] = (scope, tokens)
+            for scope, c, name, parameters, const, error in scan["declarations"]:
+                c = c or extern_c
+                # C symbols are just their name
+                key = name[-1] if c else "::".join(scope + name)
+                self.declarations.setdefault(key, []).append((scope, c, name, parameters, const, error))
+    
+    # A name as it's used from inside a scope, fully qualified, with typedefs replaced by their types
+    def resolve_name(self, parts, scope):
+        for i in range(len(scope), -1, -1):
+            name = "::".join(scope[:i] + parts)
+            if name in self.typedefs:
+                if name not in self.resolved:
+                    # Guards against typedefs which refer to themselves
+                    self.resolved[name] = parts
+                    typedef_scope, tokens = self.typedefs[name]
+                    if tokens == None:
+                        self.resolved[name] = None
+                    else:
+                        self.resolved[name] = self.resolve_type(tokens, typedef_scope)
+                if self.resolved[name] == None:
+                    raise MangleError("\"{}\" is a function pointer or array type, which isn't supported".format(name))
+                return self.resolved[name]
+            if name in self.classes:
+                return [name]
+        return ["::".join(parts)]
+    
+    def resolve_type(self, tokens, scope):
+        result = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if is_identifier(token) and token not in type_keywords:
+                parts = [token]
+                while tokens[i+1:i+2] == ["::"] and i + 2 < len(tokens):
+                    parts.append(tokens[i+2])
+                    i += 2
+                if result[-1:] == ["::"] and (len(result) == 1 or not is_identifier(result[-2])):
+                    # ::Name is in the global scope
+                    result.pop()
+                    result.extend(self.resolve_name(parts, []))
+                else:
+                    result.extend(self.resolve_name(parts, scope))
+            else:
+                result.append(token)
+            i += 1
+        return result
+    
+    # The prototype for a declaration, or its symbol if it's a C declaration
+    def prototype(self, declaration):
+        scope, extern_c, name, parameters, const, error = declaration
+        if error != None:
+            raise MangleError(error)
+        if extern_c:
+            return name[-1]
+        qualified = "::".join(scope + name)
+        if parameters == None:
+            return "auto const " + qualified if const else qualified
+        # Parameters can use names from the class, even when the function is defined outside of it
+        scope = scope + name[:-1]
+        args = ", ".join(" ".join(self.resolve_type(parameter, scope)) for parameter in parameters)
+        return "{}({}){}".format(qualified, args, " const" if const else "")
+    
+    # The same prototype, however it's spelled
+    def canonical(self, prototype):
+        try:
+            return format_signature(Signature(PrototypeCursor(normalise_prototype(prototype))))
+        except (MangleError, IndexError):
+            return None
+    
+    # The prototype of a name, and whether it's a C symbol (which isn't mangled).  A name with
+    # parameters, like "Foo::bar(int)", picks out one function of an overloaded name.  It picks a
+    # const method too, unless there's one that isn't const.
+    def lookup(self, name):
+        if self.declarations == None:
+            self.build()
+        
+        if "(" in name:
+            parser = HeaderParser(name + ";")
+            parser.scan()
+            if len(parser.declarations) != 1 or parser.declarations[0][3] == None:
+                raise MangleError("\"{}\" is not a valid name".format(name))
+            wanted = parser.declarations[0]
+            candidates = self.declarations.get("::".join(wanted[2]), [])
+            wanted = self.prototype(wanted)
+            wanted, wanted_const = self.canonical(wanted), self.canonical(wanted + " const")
+            prototypes = set()
+            const_prototypes = set()
+            for declaration in candidates:
+                prototype = self.prototype(declaration)
+                canonical = self.canonical(prototype)
+                # C functions can't be overloaded, and their parameters aren't kept
+                if canonical == wanted or declaration[1]:
+                    prototypes.add((prototype, declaration[1]))
+                elif canonical == wanted_const:
+                    const_prototypes.add((prototype, declaration[1]))
+            prototypes = prototypes or const_prototypes
+        else:
+            candidates = self.declarations.get(name, [])
+            prototypes = {(self.prototype(declaration), declaration[1]) for declaration in candidates}
+        
+        if not prototypes:
+            raise MangleError("\"{}\" isn't declared in any header".format(name))
+        if len(prototypes) > 1:
+            raise MangleError("\"{}\" is overloaded, so its parameters are needed too".format(name))
+        return prototypes.pop()
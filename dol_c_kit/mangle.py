@@ -1,3 +1,9 @@
+import re
+import json
+from sys import intern
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from enum import Enum
 
 # Massive thank you to these two documents:
@@ -7,699 +13,191 @@ from enum import Enum
 
 # Helpful classes
 
-class MutableString(list):
+# A prototype being parsed.  The string is never modified; tokens are consumed by moving a cursor
+# along it, which keeps parsing linear in the length of the prototype.
+class PrototypeCursor(object):
     def __init__(self, string):
-        for char in string:
-            self.append(char)
+        self.string = string
+        self.pos = 0
+    
+    def __bool__(self):
+        return self.pos < len(self.string)
     
     def __str__(self):
-        return "".join(char for char in self)
+        return self.string[self.pos:]
     
-    def pop_front(self, num):
-        ret = ""
-        for i in range(num):
-            ret += self.pop(0)
-        return ret
+    # The next character, or "" at the end
+    def peek(self):
+        return self.string[self.pos:self.pos+1]
     
-    def pop_back(self, num):
-        ret = ""
-        for i in range(num):
-            ret += self.pop()
+    def pop_front(self, num):
+        ret = self.string[self.pos:self.pos+num]
+        self.pos += num
         return ret
     
     def startswith(self, string):
-        return str(self).startswith(string)
-    
-    def rfind(self, string):
-        return str(self).rfind(string)
-
-class MangleError(Exception):
-    pass
-
-# Simple Token class
-
-class SyntaxToken(str):
-    def __init__(self, string):
-        self = string
-    
-    def itanium_mangle(self, compressibles):
-        return "{}{}".format(len(self), self)
-    
-    def macintosh_mangle(self):
-        return "{}{}".format(len(self), self)
-
-# Special Tokens
-
-class SpecialTokenCtor(object):
-    def __init__(self, num = 1):
-        self.num = num
-    def __str__(self):
-        return "$$ctor{}".format(self.num)
-    def __repr__(self):
-        return "\'$$ctor{}\'".format(self.num)
-    def itanium_mangle(self, compressibles):
-        return "C{}".format(self.num)
-    def macintosh_mangle(self):
-        if self.num == 1:
-            return "__ct"
-        raise MangleError("Macintosh ABI doesn't have numbered ctors")
-
-class SpecialTokenDtor(object):
-    def __init__(self, num = 1):
-        self.num = num
-    def __str__(self):
-        return "$$dtor{}".format(self.num)
-    def __repr__(self):
-        return "\'$$dtor{}\'".format(self.num)
-    def itanium_mangle(self, compressibles):
-        return "D{}".format(self.num)
-    def macintosh_mangle(self):
-        if self.num == 1:
-            return "__dt"
-        raise MangleError("Macintosh ABI doesn't have numbered dtors")
-
-class SpecialTokenVTable(object):
-    def __str__(self):
-        return "$$vtable"
-    def __repr__(self):
-        return "\'$$vtable\'"
-    def itanium_mangle(self, compressibles):
-        return "TV"
-    def macintosh_mangle(self):
-        return "__vt"
-
-class SpecialTokenRTTI(object):
-    def __str__(self):
-        return "$$rtti"
-    def __repr__(self):
-        return "\'$$rtti\'"
-    def itanium_mangle(self, compressibles):
-        return "TI"
-    def macintosh_mangle(self):
-        return "__RTTI"
-
-class SpecialTokenVTTStructure(object): # Itanium exclusive?
-    def __str__(self):
-        return "$$vtt_structure"
-    def __repr__(self):
-        return "\'$$vtt_structure\'"
-    def itanium_mangle(self, compressibles):
-        return "TT"
-    def macintosh_mangle(self):
-        raise MangleError("Macintosh ABI doesn't have VTT Structure")
-
-class SpecialTokenRTTIName(object): # Itanium exclusive?
-    def __str__(self):
-        return "$$rtti_name"
-    def __repr__(self):
-        return "\'$$rtti_name\'"
-    def itanium_mangle(self, compressibles):
-        return "TS"
-    def macintosh_mangle(self):
-        raise MangleError("Macintosh ABI doesn't have RTTI Name")
-
-class SpecialTokenUnary(object):   # This one is extra special.  It should never be mangled, only provide context and be removed.
-    def __str__(self):
-        return "$$unary"
-    def __repr__(self):
-        return "\'$$unary\'"
-
-# Special Tokens (operator overrides)
-
-class SpecialOperatorNew(object):
-    def __str__(self):
-        return "operator new"
-    def __repr__(self):
-        return "\'operator new\'"
-    def itanium_mangle(self, compressibles):
-        return "nw"
-    def macintosh_mangle(self):
-        return "__nw"
-
-class SpecialOperatorNewArray(object):
-    def __str__(self):
-        return "operator new[]"
-    def __repr__(self):
-        return "\'operator new[]\'"
-    def itanium_mangle(self, compressibles):
-        return "na"
-    def macintosh_mangle(self):
-        return "__nwa"
-
-class SpecialOperatorDelete(object):
-    def __str__(self):
-        return "operator delete"
-    def __repr__(self):
-        return "\'operator delete\'"
-    def itanium_mangle(self, compressibles):
-        return "dl"
-    def macintosh_mangle(self):
-        return "__dl"
-
-class SpecialOperatorDeleteArray(object):
-    def __str__(self):
-        return "operator delete[]"
-    def __repr__(self):
-        return "\'operator delete[]\'"
-    def itanium_mangle(self, compressibles):
-        return "da"
-    def macintosh_mangle(self):
-        return "__dla"
-
-class SpecialOperatorCoAwait(object):
-    def __str__(self):
-        return "operator co_await"
-    def __repr__(self):
-        return "\'operator co_await\'"
-    def itanium_mangle(self, compressibles):
-        return "aw"
-    def macintosh_mangle(self):
-        raise MangleError("Macintosh ABI doesn't have co_await")
-
-class SpecialOperatorPromotion(object):   # unary
-    def __str__(self):
-        return "operator + (unary)"
-    def __repr__(self):
-        return "\'operator + (unary)\'"
-    def itanium_mangle(self, compressibles):
-        return "ps"
-    def macintosh_mangle(self):
-        raise "__pl"   # Identical to OperatorAdd
-
-class SpecialOperatorNegation(object):   # unary
-    def __str__(self):
-        return "operator - (unary)"
-    def __repr__(self):
-        return "\'operator - (unary)\'"
-    def itanium_mangle(self, compressibles):
-        return "ng"
-    def macintosh_mangle(self):
-        raise "__mi"   # Identical to OperatorSubtract
-
-class SpecialOperatorReference(object):   # unary
-    def __str__(self):
-        return "operator & (unary)"
-    def __repr__(self):
-        return "\'operator & (unary)\'"
-    def itanium_mangle(self, compressibles):
-        return "ad"   # address of
-    def macintosh_mangle(self):
-        raise "__ad"
-
-class SpecialOperatorDereference(object):   # unary
-    def __str__(self):
-        return "operator * (unary)"
-    def __repr__(self):
-        return "\'operator * (unary)\'"
-    def itanium_mangle(self, compressibles):
-        return "de"
-    def macintosh_mangle(self):
-        return "__ml"   # Identical to OperatorMultiply
-
-class SpecialOperatorBitwiseNOT(object):
-    def __str__(self):
-        return "operator ~"
-    def __repr__(self):
-        return "\'operator ~\'"
-    def itanium_mangle(self, compressibles):
-        return "co"
-    def macintosh_mangle(self):
-        return "__co"
-
-class SpecialOperatorAdd(object):
-    def __str__(self):
-        return "operator +"
-    def __repr__(self):
-        return "\'operator +\'"
-    def itanium_mangle(self, compressibles):
-        return "pl"
-    def macintosh_mangle(self):
-        raise "__pl"
-
-class SpecialOperatorSubtract(object):
-    def __str__(self):
-        return "operator -"
-    def __repr__(self):
-        return "\'operator -\'"
-    def itanium_mangle(self, compressibles):
-        return "mi"
-    def macintosh_mangle(self):
-        raise "__mi"
-
-class SpecialOperatorMultiply(object):
-    def __str__(self):
-        return "operator *"
-    def __repr__(self):
-        return "\'operator *\'"
-    def itanium_mangle(self, compressibles):
-        return "ml"
-    def macintosh_mangle(self):
-        return "__ml"
-
-class SpecialOperatorDivide(object):
-    def __str__(self):
-        return "operator /"
-    def __repr__(self):
-        return "\'operator /\'"
-    def itanium_mangle(self, compressibles):
-        return "dv"
-    def macintosh_mangle(self):
-        return "__dv"
-
-class SpecialOperatorModulo(object):
-    def __str__(self):
-        return "operator %"
-    def __repr__(self):
-        return "\'operator %\'"
-    def itanium_mangle(self, compressibles):
-        return "rm"   # remainder
-    def macintosh_mangle(self):
-        return "__md"
-
-class SpecialOperatorBitwiseAND(object):
-    def __str__(self):
-        return "operator &"
-    def __repr__(self):
-        return "\'operator &\'"
-    def itanium_mangle(self, compressibles):
-        return "an"
-    def macintosh_mangle(self):
-        raise "__ad"   # Identical to OperatorReference
-
-class SpecialOperatorBitwiseOR(object):
-    def __str__(self):
-        return "operator |"
-    def __repr__(self):
-        return "\'operator |\'"
-    def itanium_mangle(self, compressibles):
-        return "or"
-    def macintosh_mangle(self):
-        return "__or"
-
-class SpecialOperatorBitwiseXOR(object):
-    def __str__(self):
-        return "operator ^"
-    def __repr__(self):
-        return "\'operator ^\'"
-    def itanium_mangle(self, compressibles):
-        return "eo"   # exclusive or
-    def macintosh_mangle(self):
-        return "__er"
-
-class SpecialOperatorAssign(object):
-    def __str__(self):
-        return "operator ="
-    def __repr__(self):
-        return "\'operator =\'"
-    def itanium_mangle(self, compressibles):
-        return "aS"
-    def macintosh_mangle(self):
-        return "__as"
-
-class SpecialOperatorAssignAdd(object):
-    def __str__(self):
-        return "operator +="
-    def __repr__(self):
-        return "\'operator +=\'"
-    def itanium_mangle(self, compressibles):
-        return "pL"
-    def macintosh_mangle(self):
-        return "__apl"
-
-class SpecialOperatorAssignSubtract(object):
-    def __str__(self):
-        return "operator -="
-    def __repr__(self):
-        return "\'operator -=\'"
-    def itanium_mangle(self, compressibles):
-        return "mI"
-    def macintosh_mangle(self):
-        return "__ami"
-
-class SpecialOperatorAssignMultiply(object):
-    def __str__(self):
-        return "operator *="
-    def __repr__(self):
-        return "\'operator *=\'"
-    def itanium_mangle(self, compressibles):
-        return "mL"
-    def macintosh_mangle(self):
-        return "__amu"
-
-class SpecialOperatorAssignDivide(object):
-    def __str__(self):
-        return "operator /="
-    def __repr__(self):
-        return "\'operator /=\'"
-    def itanium_mangle(self, compressibles):
-        return "dV"
-    def macintosh_mangle(self):
-        return "__adv"
-
-class SpecialOperatorAssignModulo(object):
-    def __str__(self):
-        return "operator &="
-    def __repr__(self):
-        return "\'operator &=\'"
-    def itanium_mangle(self, compressibles):
-        return "rM"   # remainder
-    def macintosh_mangle(self):
-        return "__amd"
-
-class SpecialOperatorAssignBitwiseAND(object):
-    def __str__(self):
-        return "operator &="
-    def __repr__(self):
-        return "\'operator &=\'"
-    def itanium_mangle(self, compressibles):
-        return "aN"
-    def macintosh_mangle(self):
-        return "__aad"
-
-class SpecialOperatorAssignBitwiseOR(object):
-    def __str__(self):
-        return "operator |="
-    def __repr__(self):
-        return "\'operator |=\'"
-    def itanium_mangle(self, compressibles):
-        return "oR"
-    def macintosh_mangle(self):
-        return "__aor"
-
-class SpecialOperatorAssignBitwiseXOR(object):
-    def __str__(self):
-        return "operator ^="
-    def __repr__(self):
-        return "\'operator ^=\'"
-    def itanium_mangle(self, compressibles):
-        return "eO"   # exclusive or
-    def macintosh_mangle(self):
-        return "__aer"
-
-class SpecialOperatorLeftShift(object):
-    def __str__(self):
-        return "operator <<"
-    def __repr__(self):
-        return "\'operator <<\'"
-    def itanium_mangle(self, compressibles):
-        return "ls"
-    def macintosh_mangle(self):
-        return "__ls"
-
-class SpecialOperatorRightShift(object):
-    def __str__(self):
-        return "operator >>"
-    def __repr__(self):
-        return "\'operator >>\'"
-    def itanium_mangle(self, compressibles):
-        return "rs"
-    def macintosh_mangle(self):
-        return "__rs"
-
-class SpecialOperatorAssignLeftShift(object):
-    def __str__(self):
-        return "operator <<="
-    def __repr__(self):
-        return "\'operator <<=\'"
-    def itanium_mangle(self, compressibles):
-        return "lS"
-    def macintosh_mangle(self):
-        return "__als"
-
-class SpecialOperatorAssignRightShift(object):
-    def __str__(self):
-        return "operator >>="
-    def __repr__(self):
-        return "\'operator >>=\'"
-    def itanium_mangle(self, compressibles):
-        return "rS"
-    def macintosh_mangle(self):
-        return "__ars"
-
-class SpecialOperatorEqual(object):
-    def __str__(self):
-        return "operator =="
-    def __repr__(self):
-        return "\'operator ==\'"
-    def itanium_mangle(self, compressibles):
-        return "eq"
-    def macintosh_mangle(self):
-        return "__eq"
-
-class SpecialOperatorNotEqual(object):
-    def __str__(self):
-        return "operator !="
-    def __repr__(self):
-        return "\'operator !=\'"
-    def itanium_mangle(self, compressibles):
-        return "ne"
-    def macintosh_mangle(self):
-        return "__ne"
-
-class SpecialOperatorLesserThan(object):
-    def __str__(self):
-        return "operator <"
-    def __repr__(self):
-        return "\'operator <\'"
-    def itanium_mangle(self, compressibles):
-        return "lt"
-    def macintosh_mangle(self):
-        return "__lt"
-
-class SpecialOperatorGreaterThan(object):
-    def __str__(self):
-        return "operator >"
-    def __repr__(self):
-        return "\'operator >\'"
-    def itanium_mangle(self, compressibles):
-        return "gt"
-    def macintosh_mangle(self):
-        return "__gt"
-
-class SpecialOperatorLesserThanOrEqual(object):
-    def __str__(self):
-        return "operator <="
-    def __repr__(self):
-        return "\'operator <=\'"
-    def itanium_mangle(self, compressibles):
-        return "le"
-    def macintosh_mangle(self):
-        return "__le"
-
-class SpecialOperatorGreaterThanOrEqual(object):
-    def __str__(self):
-        return "operator >="
-    def __repr__(self):
-        return "\'operator >=\'"
-    def itanium_mangle(self, compressibles):
-        return "ge"
-    def macintosh_mangle(self):
-        return "__ge"
-
-class SpecialOperatorSpaceShip(object):
-    def __str__(self):
-        return "operator <=>"
-    def __repr__(self):
-        return "\'operator <=>\'"
-    def itanium_mangle(self, compressibles):
-        return "ss"
-    def macintosh_mangle(self):
-        raise MangleError("Macintosh ABI doesn't have <=>")
-
-class SpecialOperatorLogicalNOT(object):
-    def __str__(self):
-        return "operator !"
-    def __repr__(self):
-        return "\'operator !\'"
-    def itanium_mangle(self, compressibles):
-        return "nt"
-    def macintosh_mangle(self):
-        return "__nt"
-
-class SpecialOperatorLogicalAND(object):
-    def __str__(self):
-        return "operator &&"
-    def __repr__(self):
-        return "\'operator &&\'"
-    def itanium_mangle(self, compressibles):
-        return "aa"
-    def macintosh_mangle(self):
-        return "__aa"
-
-class SpecialOperatorLogicalOR(object):
-    def __str__(self):
-        return "operator ||"
-    def __repr__(self):
-        return "\'operator ||\'"
-    def itanium_mangle(self, compressibles):
-        return "oo"
-    def macintosh_mangle(self):
-        return "__oo"
-
-class SpecialOperatorIncrement(object):
-    def __str__(self):
-        return "operator ++"
-    def __repr__(self):
-        return "\'operator ++\'"
-    def itanium_mangle(self, compressibles):
-        return "pp"
-    def macintosh_mangle(self):
-        return "__pp"
-
-class SpecialOperatorDecrement(object):
-    def __str__(self):
-        return "operator --"
-    def __repr__(self):
-        return "\'operator --\'"
-    def itanium_mangle(self, compressibles):
-        return "mm"
-    def macintosh_mangle(self):
-        return "__mm"
-
-class SpecialOperatorArraySubscript(object):
-    def __str__(self):
-        return "operator []"
-    def __repr__(self):
-        return "\'operator []\'"
-    def itanium_mangle(self, compressibles):
-        return "ix"
-    def macintosh_mangle(self):
-        return "__vc"
-
-# There are a few more operator overrides but I genuinely don't understand them.  I'm sorry.
-
-# Built-in types
-
-class BuiltinVoid(object):
-    def __str__(self):
-        return "void"
-    def __repr__(self):
-        return "\'void\'"
-    def itanium_mangle(self, compressibles):
-        return "v"
-    def macintosh_mangle(self):
-        return "v"
+        return self.string.startswith(string, self.pos)
+    
+    def skip_whitespace(self):
+        while self.string[self.pos:self.pos+1] in whitespace:
+            self.pos += 1
+    
+    # A run of identifier characters, which may be empty.  '$' is for special tokens.
+    def pop_word(self):
+        match = word_pattern.match(self.string, self.pos)
+        self.pos = match.end()
+        return match.group()
+    
+    # Skip whitespace, then take the next operator or run of identifier characters.  Brackets and
+    # commas are left for the caller, which gets "" for them.
+    def pop_token(self):
+        match = token_pattern.match(self.string, self.pos)
+        self.pos = match.end()
+        return match.group(1)
 
-class BuiltinBool(object):
-    def __str__(self):
-        return "bool"
-    def __repr__(self):
-        return "\'bool\'"
-    def itanium_mangle(self, compressibles):
-        return "b"
-    def macintosh_mangle(self):
-        return "b"
+class MangleError(Exception):
+    pass
 
-class BuiltinChar(object):
-    def __str__(self):
-        return "char"
-    def __repr__(self):
-        return "\'char\'"
-    def itanium_mangle(self, compressibles):
-        return "c"
-    def macintosh_mangle(self):
-        return "c"
+# Simple Token class
 
-class BuiltinShort(object):
-    def __str__(self):
-        return "short"
-    def __repr__(self):
-        return "\'short\'"
+class SyntaxToken(str):
+    builtin = False
+    
     def itanium_mangle(self, compressibles):
-        return "s"
+        return "{}{}".format(len(self), self)
+    
     def macintosh_mangle(self):
-        return "s"
+        return "{}{}".format(len(self), self)
 
-class BuiltinInt(object):
+# Stateless Tokens
+
+# A token with nothing of its own to mangle, like a built-in type or an operator.  Each one is
+# created once, below, and shared by every expression that uses it.  A symbol of None means the
+# ABI doesn't have it, and mangling raises error instead.  Types with two names substitute for
+# each other, so they share a key.
+class Token(object):
+    def __init__(self, text, itanium, macintosh, error = None, builtin = False, key = None):
+        self.text = text
+        self.itanium = itanium
+        self.macintosh = macintosh
+        self.error = error
+        self.builtin = builtin
+        self.key = intern(key if key != None else text)
+    
     def __str__(self):
-        return "int"
+        return self.text
     def __repr__(self):
-        return "\'int\'"
+        return "\'{}\'".format(self.text)
+    def substitution_key(self):
+        return self.key
+    
     def itanium_mangle(self, compressibles):
-        return "i"
+        if self.itanium == None:
+            raise MangleError(self.error)
+        return self.itanium
+    
     def macintosh_mangle(self):
-        return "i"
+        if self.macintosh == None:
+            raise MangleError(self.error)
+        return self.macintosh
 
-class Builtin__int64(object):
-    def __str__(self):
-        return "__int64"
-    def __repr__(self):
-        return "\'__int64\'"
-    def itanium_mangle(self, compressibles):
-        return "x"
-    def macintosh_mangle(self):
-        raise MangleError("Macintosh ABI doesn't have __int64")
+# Special Tokens
 
-class Builtin__int128(object):
-    def __str__(self):
-        return "__int128"
-    def __repr__(self):
-        return "\'__int128\'"
-    def itanium_mangle(self, compressibles):
-        return "n"
-    def macintosh_mangle(self):
-        raise MangleError("Macintosh ABI doesn't have __int128")
+SpecialTokenCtor1        = Token("$$ctor1",         "C1", "__ct")
+SpecialTokenCtor2        = Token("$$ctor2",         "C2", None,     "Macintosh ABI doesn't have numbered ctors")
+SpecialTokenCtor3        = Token("$$ctor3",         "C3", None,     "Macintosh ABI doesn't have numbered ctors")
+SpecialTokenDtor0        = Token("$$dtor0",         "D0", None,     "Macintosh ABI doesn't have numbered dtors")
+SpecialTokenDtor1        = Token("$$dtor1",         "D1", "__dt")
+SpecialTokenDtor2        = Token("$$dtor2",         "D2", None,     "Macintosh ABI doesn't have numbered dtors")
+SpecialTokenVTable       = Token("$$vtable",        "TV", "__vt")
+SpecialTokenRTTI         = Token("$$rtti",          "TI", "__RTTI")
+SpecialTokenVTTStructure = Token("$$vtt_structure", "TT", None,     "Macintosh ABI doesn't have VTT Structure")   # Itanium exclusive?
+SpecialTokenRTTIName     = Token("$$rtti_name",     "TS", None,     "Macintosh ABI doesn't have RTTI Name")   # Itanium exclusive?
+# This one is extra special.  It should never be mangled, only provide context and be removed.
+SpecialTokenUnary        = Token("$$unary",         None, None,     "Special Token \"$$unary\" can't be used for this!")
 
-class BuiltinFloat(object):
-    def __str__(self):
-        return "float"
-    def __repr__(self):
-        return "\'float\'"
-    def itanium_mangle(self, compressibles):
-        return "f"
-    def macintosh_mangle(self):
-        return "f"
+# Special Tokens (operator overrides)
 
-class BuiltinDouble(object):
-    def __str__(self):
-        return "double"
-    def __repr__(self):
-        return "\'double\'"
-    def itanium_mangle(self, compressibles):
-        return "d"
-    def macintosh_mangle(self):
-        return "d"
+SpecialOperatorNew                = Token("operator new",       "nw", "__nw")
+SpecialOperatorNewArray           = Token("operator new[]",     "na", "__nwa")
+SpecialOperatorDelete             = Token("operator delete",    "dl", "__dl")
+SpecialOperatorDeleteArray        = Token("operator delete[]",  "da", "__dla")
+SpecialOperatorCoAwait            = Token("operator co_await",  "aw", None,    "Macintosh ABI doesn't have co_await")
+SpecialOperatorPromotion          = Token("operator + (unary)", "ps", "__pl")   # Identical to OperatorAdd
+SpecialOperatorNegation           = Token("operator - (unary)", "ng", "__mi")   # Identical to OperatorSubtract
+SpecialOperatorReference          = Token("operator & (unary)", "ad", "__ad")
+SpecialOperatorDereference        = Token("operator * (unary)", "de", "__ml")
+SpecialOperatorBitwiseNOT         = Token("operator ~",         "co", "__co")
+SpecialOperatorAdd                = Token("operator +",         "pl", "__pl")
+SpecialOperatorSubtract           = Token("operator -",         "mi", "__mi")
+SpecialOperatorMultiply           = Token("operator *",         "ml", "__ml")
+SpecialOperatorDivide             = Token("operator /",         "dv", "__dv")
+SpecialOperatorModulo             = Token("operator %",         "rm", "__md")
+SpecialOperatorBitwiseAND         = Token("operator &",         "an", "__ad")   # Identical to OperatorReference
+SpecialOperatorBitwiseOR          = Token("operator |",         "or", "__or")
+SpecialOperatorBitwiseXOR         = Token("operator ^",         "eo", "__er")
+SpecialOperatorAssign             = Token("operator =",         "aS", "__as")
+SpecialOperatorAssignAdd          = Token("operator +=",        "pL", "__apl")
+SpecialOperatorAssignSubtract     = Token("operator -=",        "mI", "__ami")
+SpecialOperatorAssignMultiply     = Token("operator *=",        "mL", "__amu")
+SpecialOperatorAssignDivide       = Token("operator /=",        "dV", "__adv")
+SpecialOperatorAssignModulo       = Token("operator %=",        "rM", "__amd")
+SpecialOperatorAssignBitwiseAND   = Token("operator &=",        "aN", "__aad")
+SpecialOperatorAssignBitwiseOR    = Token("operator |=",        "oR", "__aor")
+SpecialOperatorAssignBitwiseXOR   = Token("operator ^=",        "eO", "__aer")
+SpecialOperatorLeftShift          = Token("operator <<",        "ls", "__ls")
+SpecialOperatorRightShift         = Token("operator >>",        "rs", "__rs")
+SpecialOperatorAssignLeftShift    = Token("operator <<=",       "lS", "__als")
+SpecialOperatorAssignRightShift   = Token("operator >>=",       "rS", "__ars")
+SpecialOperatorEqual              = Token("operator ==",        "eq", "__eq")
+SpecialOperatorNotEqual           = Token("operator !=",        "ne", "__ne")
+SpecialOperatorLesserThan         = Token("operator <",         "lt", "__lt")
+SpecialOperatorGreaterThan        = Token("operator >",         "gt", "__gt")
+SpecialOperatorLesserThanOrEqual  = Token("operator <=",        "le", "__le")
+SpecialOperatorGreaterThanOrEqual = Token("operator >=",        "ge", "__ge")
+SpecialOperatorSpaceShip          = Token("operator <=>",       "ss", None,    "Macintosh ABI doesn't have <=>")
+SpecialOperatorLogicalNOT         = Token("operator !",         "nt", "__nt")
+SpecialOperatorLogicalAND         = Token("operator &&",        "aa", "__aa")
+SpecialOperatorLogicalOR          = Token("operator ||",        "oo", "__oo")
+SpecialOperatorIncrement          = Token("operator ++",        "pp", "__pp")
+SpecialOperatorDecrement          = Token("operator --",        "mm", "__mm")
+SpecialOperatorArraySubscript     = Token("operator []",        "ix", "__vc")
 
-class Builtin__float80(object):
-    def __str__(self):
-        return "__float80"
-    def __repr__(self):
-        return "\'__float80\'"
-    def itanium_mangle(self, compressibles):
-        return "e"
-    def macintosh_mangle(self):
-        raise MangleError("Macintosh ABI doesn't have __float80")
+# There are a few more operator overrides but I genuinely don't understand them.  I'm sorry.
 
-class Builtin__float128(object):
-    def __str__(self):
-        return "__float128"
-    def __repr__(self):
-        return "\'__float128\'"
-    def itanium_mangle(self, compressibles):
-        return "g"
-    def macintosh_mangle(self):
-        raise MangleError("Macintosh ABI doesn't have __float128")
+# Built-in types
 
-class BuiltinEllipses(object):
-    def __str__(self):
-        return "..."
-    def __repr__(self):
-        return "\'...\'"
-    def itanium_mangle(self, compressibles):
-        return "z"
-    def macintosh_mangle(self):
-        return "e"
+BuiltinVoid       = Token("void",       "v", "v",  builtin = True)
+BuiltinBool       = Token("bool",       "b", "b",  builtin = True)
+BuiltinChar       = Token("char",       "c", "c",  builtin = True)
+BuiltinWChar      = Token("wchar_t",    "w", "w",  builtin = True)
+BuiltinShort      = Token("short",      "s", "s",  builtin = True)
+BuiltinInt        = Token("int",        "i", "i",  builtin = True)
+Builtin__int64    = Token("__int64",    "x", None, "Macintosh ABI doesn't have __int64",    builtin = True, key = "long long int")
+Builtin__int128   = Token("__int128",   "n", None, "Macintosh ABI doesn't have __int128",   builtin = True)
+BuiltinFloat      = Token("float",      "f", "f",  builtin = True)
+BuiltinDouble     = Token("double",     "d", "d",  builtin = True)
+Builtin__float80  = Token("__float80",  "e", None, "Macintosh ABI doesn't have __float80",  builtin = True, key = "long double")
+Builtin__float128 = Token("__float128", "g", None, "Macintosh ABI doesn't have __float128", builtin = True)
+BuiltinEllipses   = Token("...",        "z", "e",  builtin = True)
 
 # Decorator Classes
 
 class OperatorUnsigned(object):
+    builtin = True
+    
     def __init__(self):
         self.rhand = None
+        self.key = None
     
     def __str__(self):
         return "unsigned {}".format(self.rhand)
     def __repr__(self):
         return "\'unsigned\' {}".format(repr(self.rhand))
+    def substitution_key(self):
+        if self.key == None:
+            self.key = intern("unsigned {}".format(substitution_key(self.rhand)))
+        return self.key
     
     def itanium_mangle(self, compressibles):
         rhand_symbol = self.rhand.itanium_mangle(compressibles)
@@ -728,13 +226,24 @@ class OperatorUnsigned(object):
         raise MangleError("Type {} is incompatible with unsigned decorator!".format(rhand_symbol))
 
 class OperatorSigned(object):
+    builtin = True
+    
     def __init__(self):
         self.rhand = None
+        self.key = None
     
     def __str__(self):
         return "signed {}".format(self.rhand)
     def __repr__(self):
         return "\'signed\' {}".format(repr(self.rhand))
+    def substitution_key(self):
+        if self.key == None:
+            # Only signed char is a different type
+            if self.rhand is BuiltinChar:
+                self.key = intern("signed char")
+            else:
+                self.key = substitution_key(self.rhand)
+        return self.key
     
     def itanium_mangle(self, compressibles):
         rhand_symbol = self.rhand.itanium_mangle(compressibles)
@@ -755,7 +264,7 @@ class OperatorSigned(object):
     def macintosh_mangle(self):
         rhand_symbol = self.rhand.macintosh_mangle()
         if rhand_symbol == "c":   # char
-            return "c"
+            return "Sc"
         if rhand_symbol == "s":   # short
             return "s"
         if rhand_symbol == "i":   # int
@@ -767,13 +276,20 @@ class OperatorSigned(object):
         raise MangleError("Type {} is incompatible with signed decorator!".format(rhand_symbol))
 
 class OperatorLong(object):
+    builtin = True
+    
     def __init__(self):
         self.rhand = None
+        self.key = None
     
     def __str__(self):
         return "long {}".format(self.rhand)
     def __repr__(self):
         return "\'long\' {}".format(repr(self.rhand))
+    def substitution_key(self):
+        if self.key == None:
+            self.key = intern("long {}".format(substitution_key(self.rhand)))
+        return self.key
     
     def itanium_mangle(self, compressibles):
         rhand_symbol = self.rhand.itanium_mangle(compressibles)
@@ -796,21 +312,28 @@ class OperatorLong(object):
         raise MangleError("Type {} is incompatible with long decorator!".format(rhand_symbol))
 
 class OperatorConst(object):
+    builtin = False
+    
     def __init__(self):
         self.lhand = None
+        self.key = None
     
     def __str__(self):
         return "{} const".format(self.lhand)
     def __repr__(self):
         return "{} \'const\'".format(repr(self.lhand))
+    def substitution_key(self):
+        if self.key == None:
+            self.key = intern("{} const".format(substitution_key(self.lhand)))
+        return self.key
     
     def itanium_mangle(self, compressibles):
-        key = str(self.lhand)
+        key = substitution_key(self.lhand)
         if key in compressibles:
             lhand_symbol = compressibles[key]
         else:
             lhand_symbol = self.lhand.itanium_mangle(compressibles)
-            if type(self.lhand) not in builtin_types:
+            if not self.lhand.builtin:
                 compressibles.register(key)
         
         # Constness does not matter until indirection happens
@@ -822,22 +345,29 @@ class OperatorConst(object):
         return lhand_symbol
 
 class OperatorPointer(object):
+    builtin = False
+    
     def __init__(self):
         self.lhand = None
+        self.key = None
     
     def __str__(self):
         return "{} *".format(self.lhand)
     def __repr__(self):
         return "{} \'*\'".format(repr(self.lhand))
+    def substitution_key(self):
+        if self.key == None:
+            self.key = intern("{} *".format(substitution_key(self.lhand)))
+        return self.key
     
     def itanium_mangle(self, compressibles):
-        key = str(self.lhand)
+        key = substitution_key(self.lhand)
         if key in compressibles:
-            lhand_symbol = compressibles[key]
-        else:
-            lhand_symbol = self.lhand.itanium_mangle(compressibles)
-            if type(self.lhand) not in builtin_types:
-                compressibles.register(key)
+            # A substituted const type already has its K
+            return "P" + compressibles[key]
+        lhand_symbol = self.lhand.itanium_mangle(compressibles)
+        if not self.lhand.builtin:
+            compressibles.register(key)
         
         if type(self.lhand) == OperatorConst:
             return "PK{}".format(lhand_symbol)
@@ -852,22 +382,29 @@ class OperatorPointer(object):
             return "P{}".format(lhand_symbol)
 
 class OperatorReference(object):
+    builtin = False
+    
     def __init__(self):
         self.lhand = None
+        self.key = None
     
     def __str__(self):
         return "{} &".format(self.lhand)
     def __repr__(self):
         return "{} \'&\'".format(repr(self.lhand))
+    def substitution_key(self):
+        if self.key == None:
+            self.key = intern("{} &".format(substitution_key(self.lhand)))
+        return self.key
     
     def itanium_mangle(self, compressibles):
-        key = str(self.lhand)
+        key = substitution_key(self.lhand)
         if key in compressibles:
-            lhand_symbol = compressibles[key]
-        else:
-            lhand_symbol = self.lhand.itanium_mangle(compressibles)
-            if type(self.lhand) not in builtin_types:
-                compressibles.register(key)
+            # A substituted const type already has its K
+            return "R" + compressibles[key]
+        lhand_symbol = self.lhand.itanium_mangle(compressibles)
+        if not self.lhand.builtin:
+            compressibles.register(key)
         
         if type(self.lhand) == OperatorConst:
             return "RK{}".format(lhand_symbol)
@@ -882,22 +419,29 @@ class OperatorReference(object):
             return "R{}".format(lhand_symbol)
 
 class OperatorRValueReference(object):
+    builtin = False
+    
     def __init__(self):
         self.lhand = None
+        self.key = None
     
     def __str__(self):
         return "{} &&".format(self.lhand)
     def __repr__(self):
         return "{} \'&&\'".format(repr(self.lhand))
+    def substitution_key(self):
+        if self.key == None:
+            self.key = intern("{} &&".format(substitution_key(self.lhand)))
+        return self.key
     
     def itanium_mangle(self, compressibles):
-        key = str(self.lhand)
+        key = substitution_key(self.lhand)
         if key in compressibles:
-            lhand_symbol = compressibles[key]
-        else:
-            lhand_symbol = self.lhand.itanium_mangle(compressibles)
-            if type(self.lhand) not in builtin_types:
-                compressibles.register(key)
+            # A substituted const type already has its K
+            return "O" + compressibles[key]
+        lhand_symbol = self.lhand.itanium_mangle(compressibles)
+        if not self.lhand.builtin:
+            compressibles.register(key)
         
         if type(self.lhand) == OperatorConst:
             return "OK{}".format(lhand_symbol)
@@ -910,38 +454,56 @@ class OperatorRValueReference(object):
 # Complex Classes
 
 class OperatorNamespace(object):
+    builtin = False
+    
     def __init__(self):
         self.lhand = None
         self.rhand = None
+        self.key = None
     
     def __str__(self):
         return "{} :: {}".format(self.lhand, self.rhand)
     def __repr__(self):
         return "{} \'::\' {}".format(repr(self.lhand), repr(self.rhand))
+    def substitution_key(self):
+        if self.key == None:
+            self.key = intern("{} :: {}".format(substitution_key(self.lhand), substitution_key(self.rhand)))
+        return self.key
     
     def itanium_mangle(self, compressibles):
         if self.lhand == "std":
+            if type(self.rhand) == OperatorTemplateArgs:
+                return self.itanium_mangle_ns(compressibles)
             return "St" + self.rhand.itanium_mangle(compressibles)
-        if type(self.rhand) == SpecialTokenVTable \
-        or type(self.rhand) == SpecialTokenRTTI \
-        or type(self.rhand) == SpecialTokenVTTStructure \
-        or type(self.rhand) == SpecialTokenRTTIName:
+        if self.rhand in special_name_tokens:
             return self.rhand.itanium_mangle(compressibles) + self.lhand.itanium_mangle(compressibles) # I hate this dirty hack
         return "N" + self.itanium_mangle_ns(compressibles) + "E"
     
     def itanium_mangle_ns(self, compressibles):
-        key = str(self.lhand)
+        # The name of a template in a scope is qualified by that scope.  Whoever holds the whole
+        # thing registers it, after its arguments.
+        if type(self.rhand) == OperatorTemplateArgs:
+            name = make_namespace(self.lhand, self.rhand.lhand)
+            key = name.substitution_key()
+            if key in compressibles:
+                name_symbol = compressibles[key]
+            else:
+                name_symbol = name.itanium_mangle_ns(compressibles)
+                compressibles.register(key)
+            return name_symbol + self.rhand.itanium_mangle_args(compressibles)
+        
+        key = substitution_key(self.lhand)
         if key in compressibles:
             return compressibles[key] + self.rhand.itanium_mangle(compressibles)
         else:
             if type(self.lhand) == OperatorNamespace:
                 lhand_symbol = self.lhand.itanium_mangle_ns(compressibles)
-                if type(self.lhand) not in builtin_types:
+                if not self.lhand.builtin:
                     compressibles.register(key)
                 rhand_symbol = self.rhand.itanium_mangle(compressibles)
             else:
                 lhand_symbol = self.lhand.itanium_mangle(compressibles)
-                if type(self.lhand) not in builtin_types:
+                if not self.lhand.builtin:
                     compressibles.register(key)
                 rhand_symbol = self.rhand.itanium_mangle(compressibles)
             return lhand_symbol + rhand_symbol
@@ -961,22 +523,27 @@ class OperatorNamespace(object):
         return lhand_symbol + rhand_symbol, layers + 1
 
 class OperatorTemplateArgs(list):
-    def __init__(self, mutstring):
+    builtin = False
+    
+    def __init__(self, mutstring = None):
         self.lhand = None
+        self.key = None
+        if mutstring == None:
+            return
         
-        mutstring.pop(0)
-        while mutstring:
-            char = mutstring[0]
-            if char in whitespace:
-                mutstring.pop(0)
-                continue
+        mutstring.pop_front(1)
+        while True:
+            mutstring.skip_whitespace()
+            char = mutstring.peek()
+            if char == "":
+                break
             if char == ',':
-                mutstring.pop(0)
+                mutstring.pop_front(1)
                 continue
             if char == ')':
                 raise MangleError("\')\' was unexpected at this time.")
             if char == '>':
-                mutstring.pop(0)
+                mutstring.pop_front(1)
                 if not self:
                     raise MangleError("TODO: what is the behavior for empty template arguments?")
                 return
@@ -985,37 +552,48 @@ class OperatorTemplateArgs(list):
     
     def __str__(self):
         return "{} < {} >".format(self.lhand, ", ".join(str(iter) for iter in self))
+    def substitution_key(self):
+        if self.key == None:
+            self.key = intern("{} < {} >".format(substitution_key(self.lhand), ", ".join(substitution_key(iter) for iter in self)))
+        return self.key
     def __hash__(self):
         return hash((tuple(self), self.lhand))
     
     def itanium_mangle(self, compressibles):
         # Lefthand mangles first
-        key = str(self.lhand)
+        key = substitution_key(self.lhand)
         if key in compressibles:
             lhand_symbol = compressibles[key]
         else:
             lhand_symbol = self.lhand.itanium_mangle(compressibles)
-            if type(self.lhand) not in builtin_types:
+            if not self.lhand.builtin:
                 compressibles.register(key)
         
         # Arguments mangle second
+        args = self.itanium_mangle_args(compressibles)
+        
+        # Finally, the entire thing mangles third
+        key = self.substitution_key()
+        if key in compressibles:
+            return compressibles[key]
+        compressibles.register(key)
+        
+        return "{}{}".format(lhand_symbol, args)
+    
+    def itanium_mangle_args(self, compressibles):
         args = ""
         for iter in self:
-            key = str(iter)
+            key = substitution_key(iter)
             if key in compressibles:
                 args += compressibles[key]
             else:
+                # Unlike a parameter, a const argument makes a different type
+                if type(iter) == OperatorConst:
+                    args += "K"
                 args += iter.itanium_mangle(compressibles)
-                if type(iter) not in builtin_types:
+                if not iter.builtin:
                     compressibles.register(key)
-        
-        # Finally, the entire thing mangles third
-        key = str(self)
-        if key in compressibles:
-            return compressibles[key]
-        compressibles.register(key)
-        
-        return "{}I{}E".format(lhand_symbol, args)
+        return "I{}E".format(args)
     
     def macintosh_mangle(self):
         lhand_symbol = str(self.lhand)
@@ -1024,20 +602,25 @@ class OperatorTemplateArgs(list):
         return "{}{}".format(len(symbol), symbol)
 
 class OperatorFunctionArgs(list):
-    def __init__(self, mutstring):
-        mutstring.pop(0)
-        while mutstring:
-            char = mutstring[0]
-            if char in whitespace:
-                mutstring.pop(0)
-                continue
+    builtin = False
+    
+    def __init__(self, mutstring = None):
+        self.key = None
+        if mutstring == None:
+            return
+        mutstring.pop_front(1)
+        while True:
+            mutstring.skip_whitespace()
+            char = mutstring.peek()
+            if char == "":
+                break
             if char == ',':
-                mutstring.pop(0)
+                mutstring.pop_front(1)
                 continue
             if char == ')':
-                mutstring.pop(0)
+                mutstring.pop_front(1)
                 if not self:
-                    self.append(BuiltinVoid())
+                    self.append(BuiltinVoid)
                 return
             if char == '>':
                 raise MangleError("\'>\' was unexpected at this time.")
@@ -1046,16 +629,23 @@ class OperatorFunctionArgs(list):
     
     def __str__(self):
         return "( {} )".format(", ".join(str(iter) for iter in self))
+    def substitution_key(self):
+        if self.key == None:
+            self.key = intern("( {} )".format(", ".join(substitution_key(iter) for iter in self)))
+        return self.key
     
     def itanium_mangle(self, compressibles):
         args = ""
         for iter in self:
-            key = str(iter)
+            # Top level const isn't part of a parameter's type, and isn't a substitution either
+            if type(iter) == OperatorConst:
+                iter = iter.lhand
+            key = substitution_key(iter)
             if key in compressibles:
                 args += compressibles[key]
             else:
                 args += iter.itanium_mangle(compressibles)
-                if type(iter) not in builtin_types:
+                if not iter.builtin:
                     compressibles.register(key)
         return args
     
@@ -1064,153 +654,66 @@ class OperatorFunctionArgs(list):
 
 class Expression(list):
     def __init__(self, mutstring = None):
-        while mutstring:
-            if mutstring[0] in whitespace:
-                mutstring.pop(0)
-                continue
-            
-            # Operators (and ellipses because idk how else to parse them)
-            if mutstring.startswith("*"):
-                mutstring.pop_front(1)
-                self.append(OperatorPointer())
-                continue
-            if mutstring.startswith("&&"):
-                mutstring.pop_front(2)
-                self.append(OperatorRValueReference())
-                continue
-            if mutstring.startswith("&"):
-                mutstring.pop_front(1)
-                self.append(OperatorReference())
-                continue
-            if mutstring.startswith("::"):
-                mutstring.pop_front(2)
-                self.append(OperatorNamespace())
+        if mutstring == None:
+            return
+        while True:
+            # Operators, keywords, built-in types, and special tokens are all looked up by their text
+            curr_string = mutstring.pop_token()
+            token = expression_tokens.get(curr_string)
+            if token != None:
+                self.append(token)
                 continue
-            if mutstring.startswith("..."):
-                mutstring.pop_front(3)
-                self.append(BuiltinEllipses())
+            decorator = expression_decorators.get(curr_string)
+            if decorator != None:
+                self.append(decorator())
                 continue
             
             # Argument Lists
-            char = mutstring[0]
-            if char == '(':
-                self.append(OperatorFunctionArgs(mutstring))
-                continue
-            if char == '<':
-                self.append(OperatorTemplateArgs(mutstring))
-                continue
-            if char == ")" \
-            or char == ">" \
-            or char == ",":
-                break
-            
-            # Get a string
-            curr_string = ""
-            while mutstring:
-                if mutstring[0] not in alphanumeric and mutstring[0] != '$':   # '$' is for special tokens
+            if not curr_string:
+                char = mutstring.peek()
+                if char == '(':
+                    self.append(OperatorFunctionArgs(mutstring))
+                    continue
+                if char == '<':
+                    self.append(OperatorTemplateArgs(mutstring))
+                    continue
+                if char == ")" \
+                or char == ">" \
+                or char == "," \
+                or char == "":
                     break
-                curr_string += mutstring.pop(0)
-            
-            # const, unsigned, signed, long
-            # plus, built-in types and a redundant ellipses check
-            if \
-            ( self.append(OperatorConst())    ,) if curr_string == "const"      else \
-            ( self.append(OperatorUnsigned()) ,) if curr_string == "unsigned"   else \
-            ( self.append(OperatorSigned())   ,) if curr_string == "signed"     else \
-            ( self.append(OperatorLong())     ,) if curr_string == "long"       else \
-            ( self.append(BuiltinVoid())      ,) if curr_string == "void"       else \
-            ( self.append(BuiltinBool())      ,) if curr_string == "bool"       else \
-            ( self.append(BuiltinChar())      ,) if curr_string == "char"       else \
-            ( self.append(BuiltinShort())     ,) if curr_string == "short"      else \
-            ( self.append(BuiltinInt())       ,) if curr_string == "int"        else \
-            ( self.append(Builtin__int64())   ,) if curr_string == "__int64"    else \
-            ( self.append(Builtin__int128())  ,) if curr_string == "__int128"   else \
-            ( self.append(BuiltinFloat())     ,) if curr_string == "float"      else \
-            ( self.append(BuiltinDouble())    ,) if curr_string == "double"     else \
-            ( self.append(Builtin__float80()) ,) if curr_string == "__float80"  else \
-            ( self.append(Builtin__float128()),) if curr_string == "__float128" else \
-            ( self.append(BuiltinEllipses())  ,) if curr_string == "..."        else ():
-                continue
-            
-            # SpecialTokens
-            if \
-            ( self.append(SpecialTokenUnary())       ,) if curr_string == "$$unary"         else \
-            ( self.append(SpecialTokenCtor())        ,) if curr_string == "$$ctor"          else \
-            ( self.append(SpecialTokenCtor(1))       ,) if curr_string == "$$ctor1"         else \
-            ( self.append(SpecialTokenCtor(2))       ,) if curr_string == "$$ctor2"         else \
-            ( self.append(SpecialTokenCtor(3))       ,) if curr_string == "$$ctor3"         else \
-            ( self.append(SpecialTokenDtor())        ,) if curr_string == "$$dtor"          else \
-            ( self.append(SpecialTokenDtor(0))       ,) if curr_string == "$$dtor0"         else \
-            ( self.append(SpecialTokenDtor(1))       ,) if curr_string == "$$dtor1"         else \
-            ( self.append(SpecialTokenDtor(2))       ,) if curr_string == "$$dtor2"         else \
-            ( self.append(SpecialTokenVTable())      ,) if curr_string == "$$vtable"        else \
-            ( self.append(SpecialTokenRTTI())        ,) if curr_string == "$$rtti"          else \
-            ( self.append(SpecialTokenVTTStructure()),) if curr_string == "$$vtt_structure" else \
-            ( self.append(SpecialTokenRTTIName())    ,) if curr_string == "$$rtti_name"     else ():
-                continue
             
             # Operator overrides (are complicated)
             if curr_string == "operator":
-                while mutstring[0] in whitespace:
-                    mutstring.pop(0)
+                mutstring.skip_whitespace()
                 
-                # Non-alphanumeric operators.  Also, this is a grotesque use of the ternary operator, tuples, and line continuations.
-                if \
-                ( mutstring.pop_front(3), self.append(SpecialOperatorAssignLeftShift())    ) if mutstring.startswith("<<=") else \
-                ( mutstring.pop_front(3), self.append(SpecialOperatorAssignRightShift())   ) if mutstring.startswith(">>=") else \
-                ( mutstring.pop_front(3), self.append(SpecialOperatorSpaceShip())          ) if mutstring.startswith("<=>") else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorAssignAdd())          ) if mutstring.startswith("+=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorAssignSubtract())     ) if mutstring.startswith("-=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorAssignMultiply())     ) if mutstring.startswith("*=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorAssignDivide())       ) if mutstring.startswith("/=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorAssignModulo())       ) if mutstring.startswith("%=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorAssignBitwiseAND())   ) if mutstring.startswith("&=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorAssignBitwiseOR())    ) if mutstring.startswith("|=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorAssignBitwiseXOR())   ) if mutstring.startswith("^=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorLeftShift())          ) if mutstring.startswith("<<")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorRightShift())         ) if mutstring.startswith(">>")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorEqual())              ) if mutstring.startswith("==")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorNotEqual())           ) if mutstring.startswith("!=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorLesserThanOrEqual())  ) if mutstring.startswith("<=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorGreaterThanOrEqual()) ) if mutstring.startswith(">=")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorLogicalAND())         ) if mutstring.startswith("&&")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorLogicalOR())          ) if mutstring.startswith("||")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorIncrement())          ) if mutstring.startswith("++")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorDecrement())          ) if mutstring.startswith("--")  else \
-                ( mutstring.pop_front(2), self.append(SpecialOperatorArraySubscript())     ) if mutstring.startswith("[]")  else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorBitwiseNOT())         ) if mutstring.startswith("~")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorAdd())                ) if mutstring.startswith("+")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorSubtract())           ) if mutstring.startswith("-")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorMultiply())           ) if mutstring.startswith("*")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorDivide())             ) if mutstring.startswith("/")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorModulo())             ) if mutstring.startswith("%")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorBitwiseAND())         ) if mutstring.startswith("&")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorBitwiseOR())          ) if mutstring.startswith("|")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorBitwiseXOR())         ) if mutstring.startswith("^")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorAssign())             ) if mutstring.startswith("=")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorLesserThan())         ) if mutstring.startswith("<")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorGreaterThan())        ) if mutstring.startswith(">")   else \
-                ( mutstring.pop_front(1), self.append(SpecialOperatorLogicalNOT())         ) if mutstring.startswith("!")   else ():
+                # Non-alphanumeric operators, longest first
+                match = operator_pattern.match(mutstring.string, mutstring.pos)
+                if match:
+                    mutstring.pos = match.end()
+                    self.append(operator_tokens[match.group()])
                     continue
                 
                 # new, delete, new[], delete[], and co_await
-                curr_string = ""
-                while mutstring:
-                    if mutstring[0] not in alphanumeric and mutstring[0] != '$':   # '$' is for special tokens
-                        break
-                    curr_string += mutstring.pop(0)
+                curr_string = mutstring.pop_word()
                 if curr_string == "new":
-                    while mutstring[0] in whitespace:
-                        mutstring.pop(0)
-                    ( mutstring.pop_front(2), self.append(SpecialOperatorNewArray()) ) if mutstring.startswith("[]") else self.append(SpecialOperatorNew())
+                    mutstring.skip_whitespace()
+                    if mutstring.startswith("[]"):
+                        mutstring.pop_front(2)
+                        self.append(SpecialOperatorNewArray)
+                    else:
+                        self.append(SpecialOperatorNew)
                     continue
                 if curr_string == "delete":
-                    while mutstring[0] in whitespace:
-                        mutstring.pop(0)
-                    ( mutstring.pop_front(2), self.append(SpecialOperatorDeleteArray()) ) if mutstring.startswith("[]") else self.append(SpecialOperatorDelete())
+                    mutstring.skip_whitespace()
+                    if mutstring.startswith("[]"):
+                        mutstring.pop_front(2)
+                        self.append(SpecialOperatorDeleteArray)
+                    else:
+                        self.append(SpecialOperatorDelete)
                     continue
                 if curr_string == "co_await":
-                    self.append(SpecialOperatorCoAwait())
+                    self.append(SpecialOperatorCoAwait)
                     continue
                 # uh oh
                 raise MangleError("Special operator parsing failed!")
@@ -1228,9 +731,13 @@ class Expression(list):
             if type(iter) == OperatorTemplateArgs:
                 iter.lhand = self.pop(i-1)
                 continue
-            if type(iter) == SpecialOperatorArraySubscript:
-                iter.lhand = self.pop(i-1)
-                continue
+            # Before namespaces take the operator, so class members can be unary too
+            if iter is SpecialTokenUnary:
+                if i > 0 and type(self[i-1]) == Token and self[i-1] in unary_operators:
+                    self[i-1] = unary_operators[self[i-1]]
+                    self.pop(i)
+                    continue
+                raise MangleError("Special Token \"$$unary\" can't be used for this!")
             i += 1
             continue
         i = 0
@@ -1240,46 +747,22 @@ class Expression(list):
                 iter.rhand = self.pop(i+1)
                 iter.lhand = self.pop(i-1)
                 continue
-            if type(iter) == SpecialTokenUnary:
-                if type(self[i-1]) == SpecialOperatorAdd:
-                    self[i-1] = SpecialOperatorPromotion()
-                    self.pop(i)
-                    continue
-                if type(self[i-1]) == SpecialOperatorSubtract:
-                    self[i-1] = SpecialOperatorNegation()
-                    self.pop(i)
-                    continue
-                if type(self[i-1]) == SpecialOperatorBitwiseAND:
-                    self[i-1] = SpecialOperatorReference()
-                    self.pop(i)
-                    continue
-                if type(self[i-1]) == SpecialOperatorMultiply:
-                    self[i-1] = SpecialOperatorDereference()
-                    self.pop(i)
-                    continue
-                raise MangleError("Special Token \"$$unary\" can't be used for this!")
             i += 1
             continue
+        # "unsigned", "long long", and so on are ints unless a type follows them
         i = len(self) - 1
         while i >= 0:
             iter = self[i]
-            if type(iter) == OperatorLong:
-                iter.rhand = self.pop(i+1)
-            if type(iter) == OperatorUnsigned:
-                iter.rhand = self.pop(i+1)
-            if type(iter) == OperatorSigned:
-                iter.rhand = self.pop(i+1)
+            if type(iter) in integer_decorators:
+                if i+1 < len(self) and (type(self[i+1]) in integer_decorators or type(self[i+1]) == Token and self[i+1].builtin):
+                    iter.rhand = self.pop(i+1)
+                else:
+                    iter.rhand = BuiltinInt
             i -= 1
         i = 0
         while i < len(self):
             iter = self[i]
-            if type(iter) == OperatorPointer:
-                iter.lhand = self.pop(i-1)
-                continue
-            if type(iter) == OperatorReference:
-                iter.lhand = self.pop(i-1)
-                continue
-            if type(iter) == OperatorRValueReference:
+            if type(iter) in indirection_decorators:
                 iter.lhand = self.pop(i-1)
                 continue
             if type(iter) == OperatorConst:
@@ -1316,7 +799,10 @@ class Signature(Expression):
             # Special function signature (ctors and dtors)
             if type(self[1]) == OperatorFunctionArgs \
             or type(self[1]) == OperatorConst and type(self[1].lhand) == OperatorFunctionArgs:
-                name = self[0].itanium_mangle(compressibles)
+                if type(self[1]) == OperatorConst:
+                    name = "NK" + const_method_name(self[0]).itanium_mangle_ns(compressibles) + "E"
+                else:
+                    name = self[0].itanium_mangle(compressibles)
                 args = self[1].itanium_mangle(compressibles)
                 return "_Z" + name + args
             # Global variable signature
@@ -1333,7 +819,7 @@ class Signature(Expression):
                 return "_Z" + name + args
             # Const class methods
             if type(self[2]) == OperatorConst and type(self[2].lhand) == OperatorFunctionArgs:
-                name = "NK" + self[1].itanium_mangle_ns(compressibles) + "E"   # This will always be a namespace, unless it is invalid C++.
+                name = "NK" + const_method_name(self[1]).itanium_mangle_ns(compressibles) + "E"
                 args = self[2].itanium_mangle(compressibles)
                 return "_Z" + name + args
         raise MangleError("Too much stuff!")
@@ -1348,6 +834,8 @@ class Signature(Expression):
                     name = "{}__{}".format(self[0].rhand, self[0].lhand.macintosh_mangle())
                 else:
                     name = "{}__{}".format(self[0].rhand.macintosh_mangle(), self[0].lhand.macintosh_mangle())
+            elif type(self[0]) == SyntaxToken:
+                name = "{}".format(self[0])
             else:
                 name = self[0].macintosh_mangle()
             return name
@@ -1355,6 +843,8 @@ class Signature(Expression):
             # Special function signature (ctors and dtors)
             if type(self[1]) == OperatorFunctionArgs \
             or type(self[1]) == OperatorConst and type(self[1].lhand) == OperatorFunctionArgs:
+                if type(self[1]) == OperatorConst:
+                    const_method_name(self[0])
                 if type(self[0]) == OperatorNamespace:
                     if type(self[0].rhand) == SyntaxToken:
                         name = "{}__{}".format(self[0].rhand, self[0].lhand.macintosh_mangle())
@@ -1365,6 +855,8 @@ class Signature(Expression):
                         name = "{}__".format(self[0])
                     else:
                         name = "{}__".format(self[0].macintosh_mangle())
+                if type(self[1]) == OperatorConst:
+                    name += "C"
                 args = "F{}".format(self[1].macintosh_mangle())
                 return name + args
             # Global variable signature
@@ -1397,7 +889,7 @@ class Signature(Expression):
                 return name + args
             # Const class methods
             if type(self[2]) == OperatorConst and type(self[2].lhand) == OperatorFunctionArgs:
-                # This will always be a namespace, unless it is invalid C++.
+                const_method_name(self[1])
                 if type(self[1].rhand) == SyntaxToken:
                     name = "{}__{}C".format(self[1].rhand, self[1].lhand.macintosh_mangle())
                 else:
@@ -1406,33 +898,132 @@ class Signature(Expression):
                 return name + args
         raise MangleError("Too much stuff!")
 
+# Only class methods can be const, so their names are always in a namespace
+def const_method_name(node):
+    if type(node) != OperatorNamespace:
+        raise MangleError("\'{}\' can't be const, it isn't a class method".format(node))
+    return node
+
 
 # Some stuff
 
-alphanumeric = ('a','b','c','d','e','f','g','h','i','j','k','l','m','n','o','p','q','r','s','t','u','v','w','x','y','z','A','B','C','D','E','F','G','H','I','J','K','L','M','N','O','P','Q','R','S','T','U','V','W','X','Y','Z','1','2','3','4','5','6','7','8','9','0','_',)
+# Itanium substitutions are looked up by the str() of each node, and rendering that over again
+# for every lookup made deeply nested names quadratic.  Decorators and argument lists render
+# their key once, from the keys of their children, and keep it interned.  Tokens carry theirs,
+# and a SyntaxToken is its own.  Keys are only valid once parsing is finished.
+def substitution_key(node):
+    if hasattr(node, "substitution_key"):
+        return node.substitution_key()
+    return str(node)
+
+word_pattern = re.compile(r"[A-Za-z0-9_$]*")
+token_pattern = re.compile(r" *(\*|&&|&|::|\.\.\.|[A-Za-z0-9_$]*)")
 whitespace = (' ', '    ',)
-builtin_types = (
-    BuiltinVoid,
-    BuiltinBool,
-    BuiltinChar,
-    BuiltinShort,
-    BuiltinInt,
-    Builtin__int64,
-    Builtin__int128,
-    BuiltinFloat,
-    BuiltinDouble,
-    Builtin__float80,
-    Builtin__float128,
-    BuiltinEllipses,
-    OperatorUnsigned,
-    OperatorSigned,
-    OperatorLong,
-)
 indirection_decorators = (
     OperatorPointer,
     OperatorReference,
     OperatorRValueReference,
 )
+integer_decorators = (
+    OperatorUnsigned,
+    OperatorSigned,
+    OperatorLong,
+)
+# Decorators that vtable and rtti names are mangled in front of
+special_name_tokens = (
+    SpecialTokenVTable,
+    SpecialTokenRTTI,
+    SpecialTokenVTTStructure,
+    SpecialTokenRTTIName,
+)
+
+# Tokens which are the same everywhere they appear
+expression_tokens = {
+    "..."             : BuiltinEllipses,
+    "void"            : BuiltinVoid,
+    "bool"            : BuiltinBool,
+    "char"            : BuiltinChar,
+    "wchar_t"         : BuiltinWChar,
+    "short"           : BuiltinShort,
+    "int"             : BuiltinInt,
+    "__int64"         : Builtin__int64,
+    "__int128"        : Builtin__int128,
+    "float"           : BuiltinFloat,
+    "double"          : BuiltinDouble,
+    "__float80"       : Builtin__float80,
+    "__float128"      : Builtin__float128,
+    "$$unary"         : SpecialTokenUnary,
+    "$$ctor"          : SpecialTokenCtor1,
+    "$$ctor1"         : SpecialTokenCtor1,
+    "$$ctor2"         : SpecialTokenCtor2,
+    "$$ctor3"         : SpecialTokenCtor3,
+    "$$dtor"          : SpecialTokenDtor1,
+    "$$dtor0"         : SpecialTokenDtor0,
+    "$$dtor1"         : SpecialTokenDtor1,
+    "$$dtor2"         : SpecialTokenDtor2,
+    "$$vtable"        : SpecialTokenVTable,
+    "$$rtti"          : SpecialTokenRTTI,
+    "$$vtt_structure" : SpecialTokenVTTStructure,
+    "$$rtti_name"     : SpecialTokenRTTIName,
+}
+# Tokens which take an operand, so each use needs its own
+expression_decorators = {
+    "*"        : OperatorPointer,
+    "&&"       : OperatorRValueReference,
+    "&"        : OperatorReference,
+    "::"       : OperatorNamespace,
+    "const"    : OperatorConst,
+    "unsigned" : OperatorUnsigned,
+    "signed"   : OperatorSigned,
+    "long"     : OperatorLong,
+}
+# Non-alphanumeric operator overrides
+operator_tokens = {
+    "<<=" : SpecialOperatorAssignLeftShift,
+    ">>=" : SpecialOperatorAssignRightShift,
+    "<=>" : SpecialOperatorSpaceShip,
+    "+="  : SpecialOperatorAssignAdd,
+    "-="  : SpecialOperatorAssignSubtract,
+    "*="  : SpecialOperatorAssignMultiply,
+    "/="  : SpecialOperatorAssignDivide,
+    "%="  : SpecialOperatorAssignModulo,
+    "&="  : SpecialOperatorAssignBitwiseAND,
+    "|="  : SpecialOperatorAssignBitwiseOR,
+    "^="  : SpecialOperatorAssignBitwiseXOR,
+    "<<"  : SpecialOperatorLeftShift,
+    ">>"  : SpecialOperatorRightShift,
+    "=="  : SpecialOperatorEqual,
+    "!="  : SpecialOperatorNotEqual,
+    "<="  : SpecialOperatorLesserThanOrEqual,
+    ">="  : SpecialOperatorGreaterThanOrEqual,
+    "&&"  : SpecialOperatorLogicalAND,
+    "||"  : SpecialOperatorLogicalOR,
+    "++"  : SpecialOperatorIncrement,
+    "--"  : SpecialOperatorDecrement,
+    "[]"  : SpecialOperatorArraySubscript,
+    "~"   : SpecialOperatorBitwiseNOT,
+    "+"   : SpecialOperatorAdd,
+    "-"   : SpecialOperatorSubtract,
+    "*"   : SpecialOperatorMultiply,
+    "/"   : SpecialOperatorDivide,
+    "%"   : SpecialOperatorModulo,
+    "&"   : SpecialOperatorBitwiseAND,
+    "|"   : SpecialOperatorBitwiseOR,
+    "^"   : SpecialOperatorBitwiseXOR,
+    "="   : SpecialOperatorAssign,
+    "<"   : SpecialOperatorLesserThan,
+    ">"   : SpecialOperatorGreaterThan,
+    "!"   : SpecialOperatorLogicalNOT,
+}
+# Longer operators are tried first, so "<<=" isn't taken for "<"
+operator_pattern = re.compile("|".join(re.escape(operator) for operator in sorted(operator_tokens, key = len, reverse = True)))
+# What "$$unary" turns an operator into
+unary_operators = {
+    SpecialOperatorAdd        : SpecialOperatorPromotion,
+    SpecialOperatorSubtract   : SpecialOperatorNegation,
+    SpecialOperatorBitwiseAND : SpecialOperatorReference,
+    SpecialOperatorMultiply   : SpecialOperatorDereference,
+}
 
 class ItaniumSymbolDictionary(dict):
     def __init__(self):
@@ -1511,34 +1102,741 @@ class ItaniumSymbolDictionary(dict):
                 val = "S" + val + "_"
             self[key] = val
 
+# Demangling
+
+# The demanglers build the same trees the prototype parser does, out of the same nodes, so the
+# prototype they print mangles back to the symbol they were given.
+
+def make_namespace(lhand, rhand):
+    node = OperatorNamespace()
+    node.lhand = lhand
+    node.rhand = rhand
+    return node
+
+def make_decorator(decorator, lhand):
+    node = decorator()
+    node.lhand = lhand
+    return node
+
+# Nodes shared by every symbol demangled, which are never modified after this
+def parse_node(prototype):
+    return Expression(PrototypeCursor(prototype))[0]
+
+number_pattern = re.compile(r"[0-9]+")
+itanium_substitution_pattern = re.compile(r"S([0-9A-Z]*)_")
+itanium_preset_keys = frozenset(ItaniumSymbolDictionary())
+# St, Sa, Ss, Di, Dn, ...
+itanium_abbreviations = {symbol : parse_node(key) for key, symbol in ItaniumSymbolDictionary().items()}
+itanium_std = itanium_abbreviations["St"]
+itanium_builtin_types = {code : parse_node(prototype) for code, prototype in (
+    ("v", "void"),
+    ("b", "bool"),
+    ("c", "char"),
+    ("a", "signed char"),
+    ("h", "unsigned char"),
+    ("w", "wchar_t"),
+    ("s", "short"),
+    ("t", "unsigned short"),
+    ("i", "int"),
+    ("j", "unsigned int"),
+    ("l", "long int"),
+    ("m", "unsigned long int"),
+    ("x", "long long int"),
+    ("y", "unsigned long long int"),
+    ("n", "__int128"),
+    ("o", "unsigned __int128"),
+    ("f", "float"),
+    ("d", "double"),
+    ("e", "long double"),
+    ("g", "__float128"),
+    ("z", "..."),
+)}
+itanium_indirections = {
+    "P" : OperatorPointer,
+    "R" : OperatorReference,
+    "O" : OperatorRValueReference,
+    "K" : OperatorConst,
+}
+macintosh_builtin_types = {code : parse_node(prototype) for code, prototype in (
+    ("v",  "void"),
+    ("b",  "bool"),
+    ("c",  "char"),
+    ("Sc", "signed char"),
+    ("Uc", "unsigned char"),
+    ("w",  "wchar_t"),
+    ("s",  "short"),
+    ("Us", "unsigned short"),
+    ("i",  "int"),
+    ("Ui", "unsigned int"),
+    ("l",  "long int"),
+    ("Ul", "unsigned long int"),
+    ("x",  "long long int"),
+    ("Ux", "unsigned long long int"),
+    ("f",  "float"),
+    ("d",  "double"),
+    ("r",  "long double"),
+    ("e",  "..."),
+)}
+macintosh_indirections = {
+    "P" : OperatorPointer,
+    "R" : OperatorReference,
+    "C" : OperatorConst,
+}
+# Ctors, dtors, vtables and operators, by their symbol.  Where the Macintosh ABI spells a unary
+# operator the same as a binary one, the binary one wins; both mangle the same.
+name_tokens = list(operator_tokens.values()) + list(unary_operators.values()) + [
+    SpecialOperatorNew,
+    SpecialOperatorNewArray,
+    SpecialOperatorDelete,
+    SpecialOperatorDeleteArray,
+    SpecialOperatorCoAwait,
+    SpecialTokenCtor1,
+    SpecialTokenCtor2,
+    SpecialTokenCtor3,
+    SpecialTokenDtor0,
+    SpecialTokenDtor1,
+    SpecialTokenDtor2,
+]
+itanium_name_tokens = {}
+macintosh_name_tokens = {}
+for token in name_tokens + list(special_name_tokens):
+    if token not in special_name_tokens:
+        itanium_name_tokens.setdefault(token.itanium, token)
+    if token.macintosh != None:
+        macintosh_name_tokens.setdefault(token.macintosh, token)
+itanium_special_names = {token.itanium : token for token in special_name_tokens}
+# How unary operators are written in a prototype
+unary_prototypes = {unary : "{} $$unary".format(binary) for binary, unary in unary_operators.items()}
+
+class ItaniumDemangler(object):
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.pos = 0
+        # Substitution candidates in the order the mangler registers them, which is what S_, S0_,
+        # S1_, ... count.  The keys stop anything being registered twice, like the mangler.
+        self.substitutions = []
+        self.keys = set(itanium_preset_keys)
+    
+    def peek(self):
+        return self.symbol[self.pos:self.pos+1]
+    
+    def unexpected(self):
+        if self.pos >= len(self.symbol):
+            return MangleError("\"{}\" ended unexpectedly".format(self.symbol))
+        return MangleError("Unexpected \"{}\" in \"{}\"".format(self.symbol[self.pos:], self.symbol))
+    
+    def register(self, node):
+        if not node.builtin:
+            key = substitution_key(node)
+            if key not in self.keys:
+                self.keys.add(key)
+                self.substitutions.append(node)
+    
+    def demangle(self):
+        signature = Signature()
+        if not self.symbol.startswith("_Z"):
+            # Not mangled (C, or assembly)
+            signature.append(SyntaxToken(self.symbol))
+            return signature
+        self.pos = 2
+        
+        if self.peek() == "T":
+            # vtable, rtti, etc.
+            token = itanium_special_names.get(self.symbol[self.pos:self.pos+2])
+            if token == None:
+                raise self.unexpected()
+            self.pos += 2
+            signature.append(make_namespace(self.parse_name()[0], token))
+        elif self.peek() == "L":
+            # Const global variable.  The type isn't in the symbol, but it has to be there to be
+            # mangled with the L again.
+            self.pos += 1
+            signature.append(make_decorator(OperatorConst, SyntaxToken("auto")))
+            signature.append(self.parse_name()[0])
+        else:
+            name, const = self.parse_name()
+            signature.append(name)
+            if self.pos < len(self.symbol):
+                args = OperatorFunctionArgs()
+                while self.pos < len(self.symbol):
+                    args.append(self.parse_type())
+                signature.append(make_decorator(OperatorConst, args) if const else args)
+        
+        if self.pos != len(self.symbol):
+            raise self.unexpected()
+        return signature
+    
+    # The name of a function or variable, and whether it's a const method
+    def parse_name(self):
+        if self.peek() == "N":
+            return self.parse_nested_name()
+        return self.parse_unscoped_name(), False
+    
+    def parse_nested_name(self):
+        self.pos += 1
+        const = self.peek() == "K"
+        if const:
+            self.pos += 1
+        
+        node = None
+        while True:
+            char = self.peek()
+            if char == "E":
+                self.pos += 1
+                return node, const
+            if char == "":
+                raise self.unexpected()
+            if node == None:
+                if self.symbol.startswith("St", self.pos):
+                    self.pos += 2
+                    node = itanium_std
+                else:
+                    node = self.parse_component()
+            else:
+                # Every scope but the innermost is a substitution candidate
+                self.register(node)
+                node = make_namespace(node, self.parse_component(node))
+    
+    def parse_unscoped_name(self):
+        if self.symbol.startswith("St", self.pos):
+            self.pos += 2
+            return make_namespace(itanium_std, self.parse_component(itanium_std))
+        return self.parse_component()
+    
+    # A name or a substitution, and its template arguments
+    def parse_component(self, scope = None):
+        if self.peek() == "S":
+            node = self.parse_substitution()
+        else:
+            node = self.parse_unqualified_name()
+        if self.peek() == "I":
+            node = self.parse_template_args(node, scope)
+        return node
+    
+    def parse_unqualified_name(self):
+        match = number_pattern.match(self.symbol, self.pos)
+        if match:
+            length = int(match.group())
+            self.pos = match.end() + length
+            if self.pos > len(self.symbol) or length == 0:
+                raise MangleError("Bad name length in \"{}\"".format(self.symbol))
+            return SyntaxToken(self.symbol[match.end():self.pos])
+        token = itanium_name_tokens.get(self.symbol[self.pos:self.pos+2])
+        if token == None:
+            raise self.unexpected()
+        self.pos += 2
+        return token
+    
+    def parse_substitution(self):
+        match = itanium_substitution_pattern.match(self.symbol, self.pos)
+        if match:
+            index = int(match.group(1), 36) + 1 if match.group(1) else 0
+            if index >= len(self.substitutions):
+                raise MangleError("Substitution \"{}\" is out of range in \"{}\"".format(match.group(), self.symbol))
+            self.pos = match.end()
+            return self.substitutions[index]
+        node = itanium_abbreviations.get(self.symbol[self.pos:self.pos+2])
+        if node == None:
+            raise self.unexpected()
+        self.pos += 2
+        return node
+    
+    def parse_template_args(self, lhand, scope = None):
+        # The template name, then each argument, then the whole thing are candidates.  In a
+        # scope, the name is qualified by it, and the whole thing is registered with the scope.
+        self.register(lhand if scope == None else make_namespace(scope, lhand))
+        node = OperatorTemplateArgs()
+        node.lhand = lhand
+        self.pos += 1
+        while self.peek() != "E":
+            if self.peek() == "":
+                raise self.unexpected()
+            node.append(self.parse_type())
+        self.pos += 1
+        if scope == None:
+            self.register(node)
+        return node
+    
+    def parse_type(self):
+        char = self.peek()
+        node = itanium_builtin_types.get(char)
+        if node != None:
+            self.pos += 1
+            return node
+        decorator = itanium_indirections.get(char)
+        if decorator != None:
+            self.pos += 1
+            node = make_decorator(decorator, self.parse_type())
+        elif char == "D":
+            node = itanium_abbreviations.get(self.symbol[self.pos:self.pos+2])
+            if node == None:
+                raise self.unexpected()
+            self.pos += 2
+        elif char == "N":
+            node = self.parse_nested_name()[0]
+        elif char == "F" or char == "A" or char == "M":
+            # The mangler can't write these, so a prototype with one couldn't mangle back
+            raise MangleError("Function, array, and member pointer types aren't supported in \"{}\"".format(self.symbol))
+        else:
+            node = self.parse_unscoped_name()
+        self.register(node)
+        return node
+
+class MacintoshDemangler(object):
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.pos = 0
+        # Template arguments are parsed from inside the length-prefixed class name they're in
+        self.end = len(symbol)
+    
+    def peek(self):
+        if self.pos >= self.end:
+            return ""
+        return self.symbol[self.pos]
+    
+    def unexpected(self):
+        if self.pos >= self.end:
+            return MangleError("\"{}\" ended unexpectedly".format(self.symbol))
+        return MangleError("Unexpected \"{}\" in \"{}\"".format(self.symbol[self.pos:self.end], self.symbol))
+    
+    def demangle(self):
+        # The name ends at a "__", but names can have "__" in them too, so the first one the rest
+        # of the symbol makes sense after wins.  Leading underscores are part of the name.
+        split = self.symbol.find("__", 1)
+        if split == -1:
+            signature = Signature()
+            try:
+                signature.append(self.parse_name(len(self.symbol)))
+            except MangleError:
+                # Not mangled (C, or assembly)
+                signature.append(SyntaxToken(self.symbol))
+            return signature
+        error = None
+        while split != -1:
+            try:
+                return self.demangle_at(split)
+            except MangleError as e:
+                error = error or e
+            split = self.symbol.find("__", split + 1)
+        raise error
+    
+    def demangle_at(self, split):
+        node = self.parse_name(split)
+        self.pos = split + 2
+        self.end = len(self.symbol)
+        char = self.peek()
+        if char == "Q" or char.isdigit():
+            node = make_namespace(self.parse_qualified_name(), node)
+        const = self.symbol.startswith("CF", self.pos)
+        if const:
+            self.pos += 1
+        
+        signature = Signature()
+        signature.append(node)
+        if self.peek() == "F":
+            self.pos += 1
+            args = OperatorFunctionArgs()
+            while self.pos < self.end:
+                args.append(self.parse_type())
+            if not args:
+                raise self.unexpected()
+            signature.append(make_decorator(OperatorConst, args) if const else args)
+        elif type(node) != OperatorNamespace:
+            # Nothing after the "__", so it's part of the name
+            raise self.unexpected()
+        if self.pos != self.end:
+            raise self.unexpected()
+        return signature
+    
+    # The name before the "__"
+    def parse_name(self, end):
+        name = self.symbol[:end]
+        node = macintosh_name_tokens.get(name)
+        if node != None:
+            return node
+        if name[:1].isdigit():
+            # Templates have their arguments in the name
+            self.pos = 0
+            self.end = end
+            node = self.parse_class_name()
+            if self.pos == end:
+                return node
+        elif word_pattern.fullmatch(name):
+            return SyntaxToken(name)
+        raise MangleError("\"{}\" is not a valid name in \"{}\"".format(name, self.symbol))
+    
+    def parse_qualified_name(self):
+        if self.peek() != "Q":
+            return self.parse_class_name()
+        layers = self.symbol[self.pos+1:self.pos+2]
+        if not layers.isdigit() or int(layers) < 2:
+            raise self.unexpected()
+        self.pos += 2
+        node = self.parse_class_name()
+        for i in range(int(layers) - 1):
+            node = make_namespace(node, self.parse_class_name())
+        return node
+    
+    def parse_class_name(self):
+        match = number_pattern.match(self.symbol, self.pos, self.end)
+        if not match:
+            raise self.unexpected()
+        start = match.end()
+        end = start + int(match.group())
+        if end > self.end or end == start:
+            raise MangleError("Bad name length in \"{}\"".format(self.symbol))
+        bracket = self.symbol.find("<", start, end)
+        if bracket == -1:
+            self.pos = end
+            return SyntaxToken(self.symbol[start:end])
+        if self.symbol[end-1] != ">":
+            raise MangleError("Bad template name in \"{}\"".format(self.symbol))
+        
+        node = OperatorTemplateArgs()
+        node.lhand = SyntaxToken(self.symbol[start:bracket])
+        outer_end = self.end
+        self.pos = bracket + 1
+        self.end = end - 1
+        while True:
+            node.append(self.parse_type())
+            if self.pos == self.end:
+                break
+            if self.peek() != ",":
+                raise self.unexpected()
+            self.pos += 1
+        self.end = outer_end
+        self.pos = end
+        return node
+    
+    def parse_type(self):
+        char = self.peek()
+        decorator = macintosh_indirections.get(char)
+        if decorator != None:
+            self.pos += 1
+            return make_decorator(decorator, self.parse_type())
+        if char == "Q" or char.isdigit():
+            return self.parse_qualified_name()
+        if char == "F" or char == "A" or char == "M":
+            raise MangleError("Function, array, and member pointer types aren't supported in \"{}\"".format(self.symbol))
+        if char == "U" or char == "S":
+            node = macintosh_builtin_types.get(self.symbol[self.pos:min(self.pos+2, self.end)])
+            length = 2
+        else:
+            node = macintosh_builtin_types.get(char)
+            length = 1
+        if node == None:
+            raise self.unexpected()
+        self.pos += length
+        return node
+
+# A node as it's written in a prototype, which parses back into the same node
+def format_node(node):
+    kind = type(node)
+    if kind == Token:
+        return unary_prototypes.get(node, node.text)
+    if kind == OperatorNamespace:
+        return "{}::{}".format(format_node(node.lhand), format_node(node.rhand))
+    if kind == OperatorTemplateArgs:
+        return "{}<{}>".format(format_node(node.lhand), ", ".join(format_node(iter) for iter in node))
+    if kind == OperatorFunctionArgs:
+        if len(node) == 1 and node[0] is BuiltinVoid:
+            return "()"
+        return "({})".format(", ".join(format_node(iter) for iter in node))
+    if kind == OperatorConst:
+        return "{} const".format(format_node(node.lhand))
+    if kind == OperatorPointer:
+        return "{}*".format(format_node(node.lhand))
+    if kind == OperatorReference or kind == OperatorRValueReference:
+        lhand = format_node(node.lhand)
+        # Keep "&" "&&" from reading back as "&&" "&"
+        if lhand.endswith("&"):
+            lhand += " "
+        return lhand + ("&" if kind == OperatorReference else "&&")
+    return str(node)
+
+def format_signature(signature):
+    prototype = ""
+    for node in signature:
+        if type(node) == OperatorFunctionArgs \
+        or type(node) == OperatorConst and type(node.lhand) == OperatorFunctionArgs:
+            prototype += format_node(node)
+        elif prototype:
+            prototype += " " + format_node(node)
+        else:
+            prototype = format_node(node)
+    return prototype
+
 # Accessible for external use
 
 class ABI(Enum):
     Itanium = 0
     Macintosh = 1
 
+# Memo of mangled symbols, keyed by (prototype, ABI).  Prototypes are normalised first, so the same
+# signature spelled with different spacing only gets mangled once.  The least recently used
+# symbols are dropped once there are more than maxsize.  It can be saved to a file and loaded in a
+# later build, so unchanged prototypes don't need to be mangled again at all.
+class MangleCache(object):
+    # Bump this whenever a change to the mangler changes its output
+    Version = 4
+    
+    def __init__(self, maxsize = 0x40000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __str__(self):
+        return "{} hits, {} misses, {} symbols".format(self.hits, self.misses, len(self.entries))
+    
+    def mangle(self, prototype, abi):
+        key = (normalise_prototype(prototype), abi)
+        symbol = self.get(key)
+        if symbol == None:
+            symbol = mangle_signature(*key)
+            self.add(key, symbol)
+        return symbol
+    
+    # The symbol for a key, or None (and a miss) if it isn't cached
+    def get(self, key):
+        symbol = self.entries.get(key)
+        if symbol == None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return symbol
+    
+    def add(self, key, symbol):
+        self.entries[key] = symbol
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last = False)
+    
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+    
+    # Missing or outdated cache files are ignored, since everything in them can be mangled again
+    def load(self, filepath):
+        try:
+            with open(filepath, "r") as f:
+                cache = json.load(f)
+            if cache["version"] != MangleCache.Version:
+                return
+            for abi, prototype, symbol in cache["symbols"]:
+                self.add((prototype, ABI[abi]), symbol)
+        except OSError:
+            pass
+        except (ValueError, KeyError, TypeError):
+            print("Warning: \"{:s}\" is not a valid mangle cache!".format(repr(filepath)[+1:-1]))
+    
+    def save(self, filepath):
+        cache = {
+            "version" : MangleCache.Version,
+            "symbols" : [(abi.name, prototype, symbol) for (prototype, abi), symbol in self.entries.items()],
+        }
+        try:
+            with open(filepath, "w") as f:
+                json.dump(cache, f, separators = (",", ":"))
+        except OSError:
+            print("Warning: \"{:s}\" could not be opened!".format(repr(filepath)[+1:-1]))
+
+# Every mangle goes through this
+mangle_cache = MangleCache()
+
+def normalise_prototype(prototype):
+    return " ".join(prototype.split())
+
+# Mangle a normalised prototype, without the cache
+def mangle_signature(prototype, abi):
+    if abi == ABI.Itanium:
+        return Signature(PrototypeCursor(prototype)).itanium_mangle()
+    elif abi == ABI.Macintosh:
+        return Signature(PrototypeCursor(prototype)).macintosh_mangle()
+    else:
+        raise MangleError("Unsupported ABI!")
+
+# Mangle a list of normalised prototypes.  Anything that goes wrong with one of them is returned
+# as a MangleError in its place.  This runs in the worker processes of mangle_many.
+def mangle_chunk(prototypes, abi):
+    symbols = []
+    for prototype in prototypes:
+        try:
+            symbols.append(mangle_signature(prototype, abi))
+        except MangleError as e:
+            symbols.append(e)
+        except Exception as e:
+            symbols.append(MangleError("Could not parse \"{}\" ({}: {})".format(prototype, type(e).__name__, e)))
+    return symbols
+
+# Prototypes are sent to the worker processes this many at a time
+MangleChunkSize = 512
+
+# Mangle many prototypes, yielding the symbol for each one in order, or a MangleError if it
+# couldn't be mangled.  Symbols already in mangle_cache are taken from it; with jobs > 1 the rest
+# are mangled by that many processes, a chunk at a time.  Only a few chunks are in flight at
+# once, so prototypes can be streamed from a file of any size.
+def mangle_many(prototypes, abi, jobs = 1):
+    if abi != ABI.Itanium and abi != ABI.Macintosh:
+        raise MangleError("Unsupported ABI!")
+    prototypes = iter(prototypes)
+    
+    if jobs == None or jobs <= 1:
+        for prototype in prototypes:
+            try:
+                yield mangle_cache.mangle(prototype, abi)
+            except MangleError as e:
+                yield e
+            except Exception as e:
+                yield MangleError("Could not parse \"{}\" ({}: {})".format(prototype, type(e).__name__, e))
+        return
+    
+    # Only the prototypes missing from the cache are sent to the workers
+    chunks = deque()
+    def misses():
+        while True:
+            chunk = [normalise_prototype(prototype) for prototype in islice(prototypes, MangleChunkSize)]
+            if not chunk:
+                return
+            symbols = [mangle_cache.get((prototype, abi)) for prototype in chunk]
+            chunks.append((chunk, symbols))
+            yield [prototype for prototype, symbol in zip(chunk, symbols) if symbol == None]
+    
+    for mangled in map_chunks(mangle_chunk, misses(), abi, jobs):
+        chunk, symbols = chunks.popleft()
+        mangled = iter(mangled)
+        for prototype, symbol in zip(chunk, symbols):
+            if symbol == None:
+                symbol = next(mangled)
+                if not isinstance(symbol, MangleError):
+                    mangle_cache.add((prototype, abi), symbol)
+            yield symbol
+
+# Run worker(chunk, abi) for each chunk in a pool of jobs processes, yielding the results in order.
+# Every worker is kept busy with a chunk, plus one more queued behind it.
+def map_chunks(worker, chunks, abi, jobs):
+    with ProcessPoolExecutor(jobs) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(worker, chunk, abi))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def demangle_signature(symbol, abi):
+    if abi == ABI.Itanium:
+        return ItaniumDemangler(symbol).demangle()
+    elif abi == ABI.Macintosh:
+        return MacintoshDemangler(symbol).demangle()
+    else:
+        raise MangleError("Unsupported ABI!")
+
+# Demangle a list of symbols, with the same error handling as mangle_chunk
+def demangle_chunk(symbols, abi):
+    prototypes = []
+    for symbol in symbols:
+        try:
+            prototypes.append(format_signature(demangle_signature(symbol, abi)))
+        except MangleError as e:
+            prototypes.append(e)
+        except Exception as e:
+            prototypes.append(MangleError("Could not demangle \"{}\" ({}: {})".format(symbol, type(e).__name__, e)))
+    return prototypes
+
+# Demangle many symbols, yielding the prototype for each one in order, or a MangleError if it
+# couldn't be demangled.  With jobs > 1 they're demangled by that many processes, a chunk at a time.
+def demangle_many(symbols, abi, jobs = 1):
+    if abi != ABI.Itanium and abi != ABI.Macintosh:
+        raise MangleError("Unsupported ABI!")
+    symbols = iter(symbols)
+    
+    if jobs == None or jobs <= 1:
+        while True:
+            chunk = list(islice(symbols, MangleChunkSize))
+            if not chunk:
+                return
+            yield from demangle_chunk(chunk, abi)
+    
+    chunks = iter(lambda: list(islice(symbols, MangleChunkSize)), [])
+    for prototypes in map_chunks(demangle_chunk, chunks, abi, jobs):
+        yield from prototypes
+
 class LDPlusPlus(object):
-    def __init__(self, abi):
+    def __init__(self, abi, cache_path = None):
         self.buffer = ""
         self.abi = abi
+        self.cache_path = cache_path
+        if cache_path != None:
+            mangle_cache.load(cache_path)
     
     # https://sourceware.org/binutils/docs/ld/Simple-Assignments.html
     def assign(self, prototype, value):
-        if self.abi == ABI.Itanium:
-            self.buffer += "{} = {};\n".format(itanium_mangle(prototype), hex(value))
-        elif self.abi == ABI.Macintosh:
-            self.buffer += "{} = {};\n".format(macintosh_mangle(prototype), hex(value))
-        else:
-            raise MangleError("Unsupported ABI!")
+        self.buffer += "{} = {};\n".format(mangle(prototype, self.abi), hex(value))
     
     # https://sourceware.org/binutils/docs/ld/PROVIDE.html
     def provide(self, prototype, value):
-        if self.abi == ABI.Itanium:
-            self.buffer += "PROVIDE({} = {});\n".format(itanium_mangle(prototype), hex(value))
-        elif self.abi == ABI.Macintosh:
-            self.buffer += "PROVIDE({} = {});\n".format(macintosh_mangle(prototype), hex(value))
-        else:
-            raise MangleError("Unsupported ABI!")
+        self.buffer += "PROVIDE({} = {});\n".format(mangle(prototype, self.abi), hex(value))
+    
+    # Assign values to many symbols at once, given (prototype, value) pairs.  Prototypes that can't
+    # be mangled are skipped with a warning, and returned as (prototype, MangleError) pairs.
+    def assign_many(self, symbols, jobs = 1):
+        return self.add_many("{} = {};\n", symbols, jobs)
+    
+    def provide_many(self, symbols, jobs = 1):
+        return self.add_many("PROVIDE({} = {});\n", symbols, jobs)
+    
+    def add_many(self, line, symbols, jobs):
+        symbols = list(symbols)
+        lines = []
+        failures = []
+        for (prototype, value), symbol in zip(symbols, mangle_many((prototype for prototype, value in symbols), self.abi, jobs)):
+            if isinstance(symbol, MangleError):
+                print("Warning: could not mangle \"{}\": {}".format(prototype, symbol))
+                failures.append((prototype, symbol))
+            else:
+                lines.append(line.format(symbol, hex(value)))
+        self.buffer += "".join(lines)
+        return failures
+    
+    # Assign values to symbols declared in headers, given a HeaderIndex and a map of names to
+    # values.  Names are looked up in the index for their prototypes, which are then mangled all
+    # together.  Names that can't be found or mangled are skipped with a warning, and returned as
+    # (name, MangleError) pairs.
+    def assign_headers(self, index, addresses, jobs = 1):
+        return self.add_headers("{} = {};\n", index, addresses, jobs)
+    
+    def provide_headers(self, index, addresses, jobs = 1):
+        return self.add_headers("PROVIDE({} = {});\n", index, addresses, jobs)
+    
+    def add_headers(self, line, index, addresses, jobs):
+        entries = []
+        failures = []
+        for name, value in addresses.items():
+            try:
+                prototype, extern_c = index.lookup(name)
+            except MangleError as e:
+                print("Warning: could not find \"{}\": {}".format(name, e))
+                failures.append((name, e))
+                continue
+            entries.append((name, prototype, extern_c, value))
+        
+        # C symbols aren't mangled
+        symbols = mangle_many((prototype for name, prototype, extern_c, value in entries if not extern_c), self.abi, jobs)
+        lines = []
+        for name, prototype, extern_c, value in entries:
+            symbol = prototype if extern_c else next(symbols)
+            if isinstance(symbol, MangleError):
+                print("Warning: could not mangle \"{}\": {}".format(prototype, symbol))
+                failures.append((name, symbol))
+            else:
+                lines.append(line.format(symbol, hex(value)))
+        self.buffer += "".join(lines)
+        return failures
     
     def save(self, filepath):
         try:
@@ -1546,25 +1844,27 @@ class LDPlusPlus(object):
                 f.write(self.buffer)
         except OSError:
             print("Warning: \"{:s}\" could not be opened!".format(repr(filepath)[+1:-1]))
+        if self.cache_path != None:
+            mangle_cache.save(self.cache_path)
 
 def mangle(prototype, abi):
-    if abi == ABI.Itanium:
-        return itanium_mangle(prototype)
-    elif abi == ABI.Macintosh:
-        return macintosh_mangle(prototype)
-    else:
-        raise MangleError("Unsupported ABI!")
+    return mangle_cache.mangle(prototype, abi)
 
 def itanium_mangle(prototype):
-    return Signature(MutableString(prototype)).itanium_mangle()
+    return mangle_cache.mangle(prototype, ABI.Itanium)
 
 def macintosh_mangle(prototype):
-    return Signature(MutableString(prototype)).macintosh_mangle()
+    return mangle_cache.mangle(prototype, ABI.Macintosh)
+
+# The prototype for a symbol.  Return types aren't in symbols, so there isn't one, and const
+# globals get "auto" for their type.  The prototype always mangles back to the same symbol.
+def demangle(symbol, abi):
+    return format_signature(demangle_signature(symbol, abi))
 
 # Some diagnostics
 def diagnose(prototype, correct_mangled, verbose = False):
     compressibles = ItaniumSymbolDictionary()
-    signature = Signature(MutableString(prototype))
+    signature = Signature(PrototypeCursor(prototype))
     mangled = signature.itanium_mangle(compressibles)
     if verbose == True:
         print()
@@ -1573,11 +1873,16 @@ def diagnose(prototype, correct_mangled, verbose = False):
 #   print("{:50s} {:30s} {} {:30s}".format(str(signature), mangled, "==" if mangled == correct_mangled else "!=",correct_mangled))
 
 def diagnose2(prototype, correct_mangled, verbose = False):
-    signature = Signature(MutableString(prototype))
+    signature = Signature(PrototypeCursor(prototype))
     mangled = signature.macintosh_mangle()
     print("{:50s} {:30s} {} {:30s}".format(prototype, mangled, "==" if mangled == correct_mangled else "!=",correct_mangled))
 #   print("{:50s} {:30s} {} {:30s}".format(str(signature), mangled, "==" if mangled == correct_mangled else "!=",correct_mangled))
 
+def diagnose3(symbol, abi):
+    prototype = demangle(symbol, abi)
+    mangled = mangle_signature(normalise_prototype(prototype), abi)
+    print("{:50s} {:30s} {} {:30s}".format(prototype, symbol, "==" if mangled == symbol else "!=", mangled))
+
 if __name__ == "__main__":
     print("\nConst or nested variable declaration")
     diagnose("int* const bar", "_ZL3bar")
@@ -1665,4 +1970,14 @@ if __name__ == "__main__":
     diagnose2("void* operator new[](unsigned long int, int)", "?")
     diagnose2("int MyGlobal", "?")
     diagnose2("ANode::$$vtable", "?")
+    print("\nDemangling")
+    diagnose3("_ZNK1a1S9const_fooEv", ABI.Itanium)
+    diagnose3("_ZN1AI1BE3fooES0_S0_", ABI.Itanium)
+    diagnose3("_Z6myfuncPKiRKN4asdf3jklE", ABI.Itanium)
+    diagnose3("_ZLN4name4bar3E", ABI.Itanium)
+    diagnose3("_Zpsj", ABI.Itanium)
+    diagnose3("procWallMsg__8ActCrowdFP4PikiP7MsgWall", ABI.Macintosh)
+    diagnose3("recTraverseMaterials__9BaseShapeFP5JointP22IDelegate2<P5Joint,Ul>", ABI.Macintosh)
+    diagnose3("MethodB__Q24name4TestCFv", ABI.Macintosh)
+    diagnose3("__vt__5ANode", ABI.Macintosh)
 
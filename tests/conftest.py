@@ -0,0 +1,28 @@
+import struct
+
+import pytest
+
+from dolreader.dol import DolFile
+
+# A DOL with one zeroed text section, for builds to patch
+def write_dol(path, addr = 0x80003100, size = 0x1000):
+    header = bytearray(0x100)
+    struct.pack_into(">I", header, 0x00, 0x100)
+    struct.pack_into(">I", header, 0x48, addr)
+    struct.pack_into(">I", header, 0x90, size)
+    struct.pack_into(">I", header, 0xE0, addr)
+    with open(path, "wb") as f:
+        f.write(bytes(header) + bytes(size))
+
+def read_dol(path, addr, size):
+    with open(path, "rb") as f:
+        dol = DolFile(f)
+        dol.seek(addr)
+        return dol.read(size)
+
+@pytest.fixture
+def project_dir(tmp_path, monkeypatch):
+    # Projects make their src and obj directories relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    write_dol(str(tmp_path / "in.dol"))
+    return tmp_path
@@ -0,0 +1,48 @@
+// Declarations for the header scanner tests.  Every symbol in test_headerscan.py is what g++
+// emits for these, with each function defined.
+#ifndef GAME_H
+#define GAME_H
+
+typedef unsigned long u32;
+typedef float f32;
+
+namespace zen {
+    typedef int s32;
+    
+    class Vector3f {
+    public:
+        Vector3f();
+        Vector3f(f32 x, f32 y, f32 z);
+        Vector3f(const Vector3f& other);
+        ~Vector3f();
+        
+        Vector3f& operator =(const Vector3f& other);
+        bool operator ==(const Vector3f& other) const;
+        Vector3f operator -() const;
+        Vector3f operator -(const Vector3f& other) const;
+        f32& operator [](s32 index);
+        
+        f32 length() const;
+        void scale(f32 factor);
+        void scale(const Vector3f& factors);
+        
+        static u32 count;
+        f32 x, y, z;
+    };
+    typedef Vector3f Vec;
+    
+    namespace math {
+        Vec cross(const Vec& a, const Vec& b);
+        s32 round(f32 value);
+    }
+    
+    extern u32 frames;
+}
+
+extern "C" {
+    void OSReport(const char* msg, ...);
+    u32 OSGetTick(void);
+}
+extern "C" void* OSAlloc(u32 size);
+
+#endif
@@ -0,0 +1,112 @@
+import pytest
+
+from dol_c_kit import Project, assemble_asm, UndefinedSymbolError
+from dol_c_kit.doltools import AsmInstructions, AsmAliases, asm_encode
+from conftest import read_dol
+
+# Encodings checked against llvm-mc, and the Gekko user's manual for paired singles
+@pytest.mark.parametrize("src, expected", [
+    # D form
+    ("addi r3, r4, -1",            "3864ffff"),
+    ("stw r0, 8(r1)",              "90010008"),
+    ("lwz r3, -4(sp)",             "8061fffc"),
+    ("ori r3, r3, 0xFFFF",         "6063ffff"),
+    ("cmpwi cr7, r3, 10",          "2f83000a"),
+    # X and XO forms
+    ("add r3, r4, r5",             "7c642a14"),
+    ("subfo. r3, r4, r5",          "7c642c51"),
+    ("sub r3, r5, r4",             "7c642850"),
+    ("lwzx r3, r4, r5",            "7c64282e"),
+    ("mr r31, r3",                 "7c7f1b78"),
+    # M form
+    ("rlwinm r3, r4, 2, 0, 29",    "5483103a"),
+    ("slwi r3, r4, 2",             "5483103a"),
+    ("srwi. r3, r4, 8",            "5483c23f"),
+    # SPRs
+    ("mflr r0",                    "7c0802a6"),
+    ("mtctr r12",                  "7d8903a6"),
+    ("mtspr 912, r3",              "7c70e3a6"),
+    ("mtgqr0 r3",                  "7c70e3a6"),
+    ("mfspr r3, hid0",             "7c70faa6"),
+    # Paired singles
+    ("psq_l f1, 8(r3), 0, 0",      "e0230008"),
+    ("psq_st f2, -8(r1), 1, 7",    "f041fff8"),
+    ("ps_add f1, f2, f3",          "1022182a"),
+    # Unsigned halves are taken as signed, like GNU as
+    ("li r3, 0x8000",              "38608000"),
+    ("addi r3, r3, 0xFFFF",        "3863ffff"),
+    ("lis r3, 0x8000",             "3c608000"),
+    # @ha carries into the high half when the low half is negative
+    ("lis r3, 0x80008000@ha",      "3c608001"),
+    ("addi r3, r3, 0x80008000@l",  "38638000"),
+    ("lis r3, 0x80007FFF@ha",      "3c608000"),
+    ("oris r3, r3, 0x80008000@h",  "64638000"),
+    ("blr",                        "4e800020"),
+    ("nop",                        "60000000"),
+    (".long 0x12345678, -1",       "12345678ffffffff"),
+])
+def test_encodings(src, expected):
+    assert assemble_asm(src, 0x80003100).hex() == expected
+
+def test_branch_labels():
+    src = """
+    loop:
+        addi r3, r3, 1
+        cmpwi r3, 10
+        blt loop
+        b done          # forward reference
+        nop
+    done: blr
+    """
+    assert assemble_asm(src, 0x80003100).hex() == "38630001" "2c03000a" "4180fff8" "48000008" "60000000" "4e800020"
+
+@pytest.mark.parametrize("src, expected", [
+    ("bl OSReport",                "48001f01"),
+    ("b . + 0x10",                 "48000010"),
+    ("ba 0x100",                   "48000102"),
+    ("bla 0x100",                  "48000103"),
+    ("bdnz . - 8",                 "4200fff8"),
+    # Conditional aliases, with and without a CR field
+    ("beq cr1, . + 16",            "41860010"),
+    ("bnel . - 4",                 "4082fffd"),
+    ("bge cr7, OSReport",          "409c1f00"),
+    ("bnelr",                      "4c820020"),
+    ("beqctr cr2",                 "4d8a0420"),
+])
+def test_branch_targets(src, expected):
+    assert assemble_asm(src, 0x80003100, {"OSReport" : 0x80005000}).hex() == expected
+
+def test_project_symbols():
+    # Project symbol tables hold ELF symbols
+    assert assemble_asm("bl OSReport", 0x80003100, {"OSReport" : {'st_value' : 0x80005000}}).hex() == "48001f01"
+
+def test_encode_tables():
+    word, names = AsmInstructions["addi"]
+    assert asm_encode(word, names, [3, 4, 0xFFFF], 0) == 0x3864FFFF
+    instruction, names, expand = AsmAliases["mflr"]
+    word, instruction_names = AsmInstructions[instruction]
+    assert asm_encode(word, instruction_names, expand(0), 0) == 0x7C0802A6
+
+def test_undefined_symbol():
+    with pytest.raises(UndefinedSymbolError, match = "line 2: Undefined symbol \"missing\""):
+        assemble_asm("nop\nbl missing", 0x80003100)
+
+@pytest.mark.parametrize("src, message", [
+    ("frob r3",                    "line 1: Unknown instruction"),
+    ("addi r3, r4",                "line 1: Expected 3 operands"),
+    ("addi r3, r4, 0x10000",       "line 1: .* too large"),
+    ("b . + 2",                    "line 1: .* misaligned"),
+    ("a: nop\na: nop",             "line 2: Label \"a\" is already defined"),
+])
+def test_errors(src, message):
+    with pytest.raises(RuntimeError, match = message):
+        assemble_asm(src, 0x80003100)
+
+def test_hook_asm(project_dir):
+    project = Project(base_addr = 0x80400000)
+    project.symbols = {"foo" : {'st_value' : 0x80003200}}
+    project.hook_asm(0x80003100, "lis r3, foo@ha\naddi r3, r3, foo@l\nbl foo")
+    project.hook_asm(0x80003110, "bl missing")
+    project.build_dol("in.dol", "out.dol")
+    # Hooks with undefined symbols are skipped with a warning
+    assert read_dol("out.dol", 0x80003100, 20).hex() == "3c608000" "38633200" "480000f9" "00000000" "00000000"
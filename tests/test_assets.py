@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from dol_c_kit import Project
+from dol_c_kit.devkit_tools import parse_manifest_int, read_asset_manifest
+from conftest import read_dol
+
+ManifestRows = [
+    {"address" : "0x80003100", "path" : "a.bin", "string" : "", "start" : "4", "end" : "-2", "max_size" : "", "encoding" : ""},
+    {"address" : "0x80003110", "path" : "", "string" : "héllo", "start" : "", "end" : "", "max_size" : "8", "encoding" : "utf-8"},
+    {"address" : "0x80003118", "path" : "", "string" : "テスト", "start" : "", "end" : "", "max_size" : "", "encoding" : "shift_jis"},
+    {"address" : "0x80003120", "path" : "a.bin", "string" : "", "start" : "", "end" : "", "max_size" : "4", "encoding" : ""},
+    {"address" : "0x80003130", "path" : "missing.bin", "string" : "", "start" : "", "end" : "", "max_size" : "", "encoding" : ""},
+    # Directories have a size, but can't be opened
+    {"address" : "0x80003140", "path" : "folder", "string" : "", "start" : "", "end" : "", "max_size" : "", "encoding" : ""},
+]
+
+ManifestEntries = [
+    (0x80003100, "a.bin", None, 4, -2, None, "ascii"),
+    (0x80003110, None, "héllo", 0, None, 8, "utf-8"),
+    (0x80003118, None, "テスト", 0, None, None, "shift_jis"),
+    (0x80003120, "a.bin", None, 0, None, 4, "ascii"),
+    (0x80003130, "missing.bin", None, 0, None, None, "ascii"),
+    (0x80003140, "folder", None, 0, None, None, "ascii"),
+]
+
+def write_manifest(path):
+    if path.endswith(".json"):
+        # JSON manifests can use numbers, and leave out empty columns
+        rows = [{key : int(val, 0) if key in ("address", "start", "end", "max_size") else val
+                 for key, val in row.items() if val != ""} for row in ManifestRows]
+        with open(path, "w") as f:
+            json.dump(rows, f)
+    else:
+        with open(path, "w") as f:
+            f.write(",".join(ManifestRows[0]) + "\n")
+            for row in ManifestRows:
+                f.write(",".join(row.values()) + "\n")
+
+@pytest.mark.parametrize("val, expected", [
+    (None, None),
+    ("", None),
+    ("16", 16),
+    ("0x10", 16),
+    ("0b11", 3),
+    ("-2", -2),
+    (16, 16),
+])
+def test_parse_manifest_int(val, expected):
+    assert parse_manifest_int(val) == expected
+
+@pytest.mark.parametrize("name", ["assets.csv", "assets.json"])
+def test_read_asset_manifest(tmp_path, name):
+    path = str(tmp_path / name)
+    write_manifest(path)
+    assert read_asset_manifest(path) == ManifestEntries
+
+@pytest.mark.parametrize("text", [
+    "address,path,string\n,a.bin,\n",
+    "address,path,string\n0x80003100,,\n",
+])
+def test_read_asset_manifest_errors(tmp_path, text):
+    with open(tmp_path / "assets.csv", "w") as f:
+        f.write(text)
+    with pytest.raises(RuntimeError, match = "entry 0 needs an address"):
+        read_asset_manifest(str(tmp_path / "assets.csv"))
+
+@pytest.mark.parametrize("name", ["assets.csv", "assets.json"])
+def test_hook_table(project_dir, capsys, name):
+    with open("a.bin", "wb") as f:
+        f.write(bytes(range(1, 17)))
+    (project_dir / "folder").mkdir()
+    write_manifest(name)
+    project = Project(base_addr = 0x80400000)
+    project.hook_table(name, jobs = 2)
+    project.build_dol("in.dol", "out.dol")
+    assert read_dol("out.dol", 0x80003100, 0x50).hex() == \
+        "05060708090a0b0c0d0e" "000000000000" \
+        "68c3a96c6c6f0000" \
+        "8365835883670000" \
+        "0102030405060708090a0b0c0d0e0f10" \
+        + "00" * 0x20
+    # Files too large are still written, with a warning
+    out = capsys.readouterr().out
+    assert "Warning: \"a.bin\" exceeds 4 bytes!" in out
+    assert "Warning: \"missing.bin\" could not be opened!" in out
+    assert "Warning: \"folder\" could not be opened!" in out
@@ -0,0 +1,64 @@
+import os
+
+from dolreader.dol import DolFile
+
+from dol_c_kit import Project, assemble_branch, assemble_far_branch
+from dol_c_kit.devkit_tools import write_if_changed
+from conftest import read_dol
+
+def test_write_if_changed(tmp_path):
+    path = str(tmp_path / "out.bin")
+    # Missing files are written
+    assert write_if_changed(path, b"abcd")
+    os.utime(path, ns = (1, 1))
+    assert not write_if_changed(path, b"abcd")
+    assert os.stat(path).st_mtime_ns == 1
+    # Same size, same mtime, different content
+    with open(path, "r+b") as f:
+        f.write(b"x")
+    os.utime(path, ns = (1, 1))
+    assert write_if_changed(path, b"abcd")
+    assert write_if_changed(path, b"abcdef")
+    with open(path, "rb") as f:
+        assert f.read() == b"abcdef"
+    # Nothing but the file itself is written
+    assert os.listdir(tmp_path) == ["out.bin"]
+
+def test_build_dol_skips_unchanged(project_dir):
+    Project().build_dol("in.dol", "out.dol")
+    os.utime("out.dol", ns = (1, 1))
+    Project().build_dol("in.dol", "out.dol")
+    assert os.stat("out.dol").st_mtime_ns == 1
+    project = Project()
+    project.hook_string(0x80003100, "ABC")
+    project.build_dol("in.dol", "out.dol")
+    assert os.stat("out.dol").st_mtime_ns != 1
+
+# The injected section holds the program, then the veneers, then the trampolines on a fresh
+# cache line, packed first fit
+def test_injected_section_layout(project_dir, monkeypatch):
+    project = Project(base_addr = 0x80400000)
+    project.symbols = {"far" : {'st_value' : 0x90001000}}
+    def build_project():
+        with open(project.obj_dir + project.project_name + ".bin", "wb") as f:
+            f.write(b"\x11" * 10)
+        return True
+    monkeypatch.setattr(project, "_Project__build_project", build_project)
+    with open("codes.txt", "w") as f:
+        f.write("[Gecko]\n$Insert\nC2003108 00000001\n38600001 00000000\n"
+                "$Insert Twice\nC2003104 00000002\n38600002 38800002\n60000000 00000000\n")
+    project.add_gecko_txt_file("codes.txt")
+    project.hook_branchlink(0x80003100, "far")
+    project.build_dol("in.dol", "out.dol")
+    
+    expected = b"\x11" * 10 + bytes(2) \
+             + assemble_far_branch(0x90001000) \
+             + bytes(4) \
+             + bytes.fromhex("38600002" "38800002" "60000000") + assemble_branch(0x8040002C, 0x80003108) \
+             + bytes.fromhex("38600001") + assemble_branch(0x80400034, 0x8000310C)
+    assert read_dol("out.dol", 0x80400000, len(expected)) == expected
+    assert read_dol("out.dol", 0x80003100, 12) == assemble_branch(0x80003100, 0x8040000C, LK = True) \
+        + assemble_branch(0x80003104, 0x80400020) + assemble_branch(0x80003108, 0x80400030)
+    with open("out.dol", "rb") as f:
+        dol = DolFile(f)
+    assert [(section.address, section.size) for section in dol.textSections] == [(0x80003100, 0x1000), (0x80400000, len(expected))]
@@ -0,0 +1,119 @@
+import struct
+from array import array
+from io import BytesIO
+
+import pytest
+
+from dolreader.dol import DolFile
+from dol_c_kit import DolScanner, assemble_asm, build_function_index, load_function_index, translate_addresses
+from dol_c_kit.dolscan import mask_relocations
+
+def make_scanner(words):
+    header = bytearray(0x100)
+    struct.pack_into(">I", header, 0x00, 0x100)
+    struct.pack_into(">I", header, 0x48, 0x80003100)
+    struct.pack_into(">I", header, 0x90, len(words) * 4)
+    return DolScanner(DolFile(BytesIO(bytes(header) + struct.pack(">{}I".format(len(words)), *words))))
+
+Words = [
+    0x9421FFF0, 0x7C0802A6, 0x38600001, 0x48000101, 0x4E800020,
+    0x9421FFE0, 0x7C0802A6, 0x38600002, 0x48000201, 0x4E800020,
+    0x38600003, 0x38800004, 0x4E800020,
+]
+
+def test_find_many_matches_find_all():
+    scanner = make_scanner(Words)
+    signatures = [
+        "9421FFF0 7C0802A6",                # fully specified
+        "9421???? 7C0802A6 3860????",       # anchored on its fully specified word
+        "3860???? 48000001/FC000003",       # no fully specified word
+        "3860???? 3880????",
+        "9421???? 7C0802A6 3860????",       # a copy of an earlier one
+        "7FFFFFFF",                         # no match
+        "????????",
+    ]
+    results = scanner.find_many(signatures)
+    assert results == [scanner.find_all(signature) for signature in signatures]
+    assert results[2] == [0x80003108, 0x8000311C]
+    assert results[3] == [0x80003128]
+    assert results[1] == results[4] and results[1] is not results[4]
+    assert len(results[6]) == len(Words)
+
+def test_find():
+    scanner = make_scanner(Words)
+    assert scanner.find("3860???? 3880????", 4) == 0x8000312C
+
+def make_dol(text, addr = 0x80003100, symbols = None):
+    data = assemble_asm(text, addr, symbols)
+    header = bytearray(0x100)
+    struct.pack_into(">I", header, 0x00, 0x100)
+    struct.pack_into(">I", header, 0x48, addr)
+    struct.pack_into(">I", header, 0x90, len(data))
+    return DolFile(BytesIO(bytes(header) + data))
+
+Main = """
+main:
+    stwu r1, -16(r1)
+    mflr r0
+    stw r0, 20(r1)
+    lis r3, table@ha
+    addi r3, r3, table@l
+    bl add_one
+    lis r4, counter@ha
+    stw r3, counter@l(r4)
+    lwz r0, 20(r1)
+    mtlr r0
+    addi r1, r1, 16
+    blr
+"""
+
+# Only differ in an immediate, once r4 no longer holds an @h half
+AddOne = """
+add_one:
+    lis r4, table@ha
+    lwz r3, table@l(r4)
+    li r4, 7
+    addi r3, r4, 1
+    blr
+"""
+AddTwo = AddOne.replace("add_one", "add_two").replace("addi r3, r4, 1", "addi r3, r4, 2")
+
+# The second revision gains a function at the start, so everything moves, and its data moves too
+Source = make_dol(Main + AddOne, symbols = {"table" : 0x80407FF0, "counter" : 0x80410000})
+Target = make_dol(AddTwo + "    .long 0\n" + Main + AddOne, symbols = {"table" : 0x80508010, "counter" : 0x80520000})
+
+def test_mask_relocations():
+    words = array("I", struct.unpack(">5I", assemble_asm(AddOne, 0, {"table" : 0x80408010})))
+    assert [hex(word) for word in mask_relocations(words)] == ["0x3c800000", "0x80640000", "0x38800007", "0x38640001", "0x4e800020"]
+    # Calls and jumps end the @h half too
+    words = array("I", struct.unpack(">3I", assemble_asm("lis r3, 0x8040\nbl .\naddi r3, r3, 0x10", 0)))
+    assert mask_relocations(words)[2] == 0x38630010
+
+def test_function_index():
+    source = build_function_index(Source)
+    target = build_function_index(Target)
+    assert list(source.starts) == [0x80003100, 0x80003130]
+    assert list(target.starts) == [0x80003100, 0x80003118, 0x80003148]
+    assert list(target.sizes) == [0x14, 0x30, 0x14]
+    assert source.fingerprints[0] == target.fingerprints[1]
+    assert source.fingerprints[1] == target.fingerprints[2] != target.fingerprints[0]
+    assert source.lookup(0x8000312C) == 0 and source.lookup(0x80003144) == None
+
+def test_function_index_save_load(tmp_path):
+    index = build_function_index(Target)
+    index.save(str(tmp_path / "target.idx"))
+    loaded = load_function_index(str(tmp_path / "target.idx"))
+    assert (loaded.starts, loaded.sizes, loaded.fingerprints) == (index.starts, index.sizes, index.fingerprints)
+    with open(tmp_path / "other.idx", "wb") as f:
+        f.write(b"DOLFIDX0" + bytes(4))
+    with pytest.raises(RuntimeError, match = "not a function index"):
+        load_function_index(str(tmp_path / "other.idx"))
+
+def test_translate_addresses():
+    source = build_function_index(Source)
+    target = build_function_index(Target)
+    assert translate_addresses([0x80003100, 0x8000310C, 0x80003130, 0x8000313C, 0x80003144, 0x80000000], source, target) == \
+        [0x80003118, 0x80003124, 0x80003148, 0x80003154, None, None]
+    # Functions which appear twice can't be matched
+    twice = build_function_index(make_dol(Main + AddOne + AddOne.replace("add_one", "again"), symbols = {"table" : 0, "counter" : 0}))
+    assert translate_addresses([0x80003100, 0x80003130], twice, target) == [0x80003118, None]
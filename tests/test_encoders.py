@@ -0,0 +1,82 @@
+import pytest
+
+from dolreader.dol import DolFile
+
+from dol_c_kit import doltools
+from dol_c_kit import assemble_branch, assemble_branch_many, assemble_nop, assemble_nop_many, assemble_far_branch, assemble_far_branch_many
+from dol_c_kit import write_branch, write_branch_many, write_nop_many, write_far_branch_many
+from conftest import write_dol
+
+Addrs = [0x80003100 + i*4 for i in range(6)]
+Targets = [0x80003100, 0x80003200, 0x80000000, 0x81FFFFFC, 0x80003104, 0x7E003114]
+Registers = [0, 1, 3, 12, 31, 31]
+SIMMs = [0, 1, -1, 0x7FFF, -0x8000, 0x1234]
+UIMMs = [0, 1, 0xFFFF, 0x8000, 0x7FFF, 0x1234]
+
+@pytest.mark.parametrize("LK, AA", [(False, False), (True, False), (False, True), (True, True)])
+def test_branch_many(LK, AA):
+    assert assemble_branch_many(Addrs, Targets, LK, AA) == b"".join(assemble_branch(addr, target, LK, AA) for addr, target in zip(Addrs, Targets))
+    # A single value is used for every instruction
+    assert assemble_branch_many(Addrs, 0x80003200, LK, AA) == b"".join(assemble_branch(addr, 0x80003200, LK, AA) for addr in Addrs)
+
+@pytest.mark.parametrize("name, operands", [
+    ("addi",  (Registers, Registers[::-1], SIMMs)),
+    ("addis", (Registers, 3, SIMMs)),
+    ("ori",   (Registers, Registers[::-1], UIMMs)),
+    ("oris",  (4, Registers, UIMMs)),
+    ("li",    (Registers, SIMMs)),
+    ("lis",   (Registers, -1)),
+])
+def test_immediate_many(name, operands):
+    assemble = getattr(doltools, "assemble_" + name)
+    assemble_many = getattr(doltools, "assemble_" + name + "_many")
+    count = max(len(val) if isinstance(val, list) else 1 for val in operands)
+    scalars = [[val[i] if isinstance(val, list) else val for val in operands] for i in range(count)]
+    assert assemble_many(*operands) == b"".join(assemble(*vals) for vals in scalars)
+    # Any iterable will do
+    assert assemble_many(*(iter(val) if isinstance(val, list) else val for val in operands)) == assemble_many(*operands)
+
+def test_numpy_operands():
+    numpy = pytest.importorskip("numpy")
+    assert doltools.assemble_addi_many(numpy.int32(3), numpy.array([4, 5]), numpy.int64(-1)) == doltools.assemble_addi_many(3, [4, 5], -1)
+
+def test_nop_and_far_branch_many():
+    assert assemble_nop_many(3) == assemble_nop() * 3
+    assert assemble_far_branch_many(Targets, 11) == b"".join(assemble_far_branch(target, 11) for target in Targets)
+
+def test_write_many(tmp_path):
+    write_dol(str(tmp_path / "in.dol"))
+    with open(tmp_path / "in.dol", "rb") as f:
+        dol = DolFile(f)
+    dol.seek(0x80003100)
+    for target in Targets:
+        write_branch(dol, target, True)
+    dol.seek(0x80003100)
+    expected = dol.read(4 * len(Targets))
+    dol.seek(0x80003200)
+    write_branch_many(dol, [target + 0x100 for target in Targets], True)
+    write_nop_many(dol, 2)
+    write_far_branch_many(dol, Targets[:2])
+    dol.seek(0x80003200)
+    assert dol.read(4 * len(Targets)) == expected
+    assert dol.read(8) == assemble_nop() * 2
+    assert dol.read(32) == assemble_far_branch(Targets[0]) + assemble_far_branch(Targets[1])
+
+@pytest.mark.parametrize("assemble, operands, message", [
+    (doltools.assemble_addi_many, ([3, 4], [1, 2, 3], 0), "different lengths: \\[2, 3\\]"),
+    (assemble_branch_many, (Addrs, Targets[:2]), "different lengths"),
+    (doltools.assemble_addi_many, (3, 3, [0, 0x8000]), "too large for 16-bit signed field"),
+    (doltools.assemble_ori_many, (3, 3, [0x10000]), "too large for 16-bit unsigned field"),
+    (doltools.assemble_li_many, ([32], 0), "too large for 5-bit unsigned field"),
+    (assemble_branch_many, ([0x80003100, 0x80003104], [0x80003100, 0x82003104]), "too large for 24-bit signed field"),
+])
+def test_many_errors(assemble, operands, message):
+    with pytest.raises(RuntimeError, match = message):
+        assemble(*operands)
+
+# Misaligned branches raise the same error in bulk as one at a time
+def test_misaligned_branch():
+    with pytest.raises(RuntimeError, match = "Branch from 80003104 to 80003202 is misaligned"):
+        assemble_branch(0x80003104, 0x80003202)
+    with pytest.raises(RuntimeError, match = "Branch from 80003104 to 80003202 is misaligned"):
+        assemble_branch_many([0x80003100, 0x80003104], [0x80003200, 0x80003202])
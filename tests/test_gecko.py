@@ -0,0 +1,250 @@
+import os
+import random
+import struct
+from io import BytesIO
+
+import pytest
+
+from dolreader.dol import DolFile
+from geckolibs.geckocode import GeckoCode, GeckoCommand, Write8, Write16, Write32, WriteString, WriteSerial
+
+from dol_c_kit import Project, assemble_asm, SectionBuffers
+from conftest import read_dol
+from dol_c_kit.geckotools import read_gecko_text, yaz0_compress, yaz0_decompress, Yaz0Stub, GeckoLinePattern
+from dol_c_kit.geckotools import optimize_gecko_commands, encode_run, gecko_command_writes, gecko_command_chunks, gecko_code_size
+from dol_c_kit.geckotools import gecko_code_writes, merge_writes, apply_runs, pack_trampolines, CacheLineSize
+
+DolphinCodes = "[Gecko]\n$Infinite Lives [Me]\n04123458 00000063\n$Other\n04000000 00000001\n[Gecko_Enabled]\n$Infinite Lives\n"
+OcarinaCodes = "GMSE01\nSuper Mario Sunshine\n\nInfinite Lives [Me]\n*04123458 00000063\n\nOther\n04000000 00000001\n"
+RawCodes = "04123458 00000063\n04000000 00000001\n"
+
+def read_codes(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    with open(path, "r") as f:
+        return read_gecko_text(f)
+
+@pytest.mark.parametrize("text, expected", [
+    (DolphinCodes, [("Infinite Lives", True), ("Other", False)]),
+    (OcarinaCodes, [("Infinite Lives", True), ("Other", False)]),
+    (RawCodes, [(None, True)]),
+])
+def test_read_code_list_types(tmp_path, text, expected):
+    entries = read_codes(tmp_path / "codes.txt", text)
+    assert [(entry.name if expected[0][0] != None else None, entry.enabled) for entry in entries] == expected
+    assert entries[0].data.startswith(bytes.fromhex("0412345800000063"))
+
+@pytest.mark.parametrize("text", ["hello world\n", "[Gecko]\n"])
+def test_read_code_list_without_codes(tmp_path, text):
+    with pytest.raises(RuntimeError):
+        read_codes(tmp_path / "codes.txt", text)
+
+def test_code_list_cache(project_dir):
+    with open("codes.txt", "w") as f:
+        f.write(DolphinCodes)
+    Project().add_gecko_txt_file("codes.txt")
+    with open("codes.txt", "w") as f:
+        f.write(RawCodes)
+    project = Project()
+    project.add_gecko_txt_file("codes.txt")
+    # Editing the code list replaces its cache, and nothing is written next to it
+    assert len([gecko_code for gecko_code in project.gecko_codetable]) == 1
+    names = sorted(os.listdir(project_dir))
+    assert names[0] == "codes.txt" and names[1].startswith("gecko_") and names[2:] == ["in.dol"]
+
+def test_cleanup_removes_unused_caches(project_dir):
+    with open("codes.txt", "w") as f:
+        f.write(DolphinCodes)
+    Project().add_gecko_txt_file("codes.txt")
+    os.rename("codes.txt", "renamed.txt")
+    project = Project()
+    project.add_gecko_txt_file("renamed.txt")
+    project.cleanup()
+    assert len([name for name in os.listdir(project_dir) if name.startswith("gecko_")]) == 1
+
+# Disabled codes are never run, so they don't get trampolines or hooks
+def test_disabled_c2_code(project_dir):
+    project = Project(base_addr = 0x80400000)
+    gecko_code = GeckoCode("Insert", None, "", enabled = False)
+    gecko_code.add_child(GeckoCommand.bytes_to_geckocommand(BytesIO(bytes.fromhex("C2003104000000016000000000000000"))))
+    project.gecko_codetable.add_child(gecko_code)
+    project.build_dol("in.dol", "out.dol")
+    assert read_dol("out.dol", 0x80003104, 4) == bytes(4)
+
+@pytest.mark.parametrize("data", [
+    b"",
+    bytes(0x3000),
+    bytes(random.Random(0).getrandbits(8) for i in range(0x2000)),
+    b"abcabcabd" * 500 + bytes(range(256)) * 40,
+])
+def test_yaz0_round_trip(data):
+    compressed = yaz0_compress(data)
+    assert compressed[:8] == b"Yaz0" + len(data).to_bytes(4, "big")
+    assert yaz0_decompress(compressed) == data
+
+def test_yaz0_stub():
+    # The stub loads base and end with lis/addi pairs, so @ha has to carry for end
+    stub = assemble_asm(Yaz0Stub, 0, {"base" : 0x80400000, "end" : 0x80409000})
+    assert len(stub) == 0x108
+    assert stub[20:36].hex() == "3c608040" "38630000" "3ca08041" "38a59000"
+
+def test_compressed_program_data(project_dir, monkeypatch):
+    datablob = bytes(range(256)) * 16 + bytes(0x1000)
+    project = Project(base_addr = 0x80400000)
+    def build_project():
+        with open(project.obj_dir + project.project_name + ".bin", "wb") as f:
+            f.write(datablob)
+        return True
+    monkeypatch.setattr(project, "_Project__build_project", build_project)
+    project.build_gecko("out.txt", compress = True)
+    with open("out.txt") as f:
+        words = bytes.fromhex("".join(line.replace(" ", "") for line in f.read().splitlines() if GeckoLinePattern.fullmatch(line)))
+    # One C0 code: the stub, then the Yaz0 data without its header
+    assert words[:4] == bytes.fromhex("C0000000")
+    code = words[8:8 + int.from_bytes(words[4:8], "big") * 8]
+    stub = assemble_asm(Yaz0Stub, 0, {"base" : 0x80400000, "end" : 0x80400000 + len(datablob)})
+    assert code[:len(stub)] == stub
+    assert yaz0_decompress(b"Yaz0" + len(datablob).to_bytes(4, "big") + bytes(8) + code[len(stub):]) == datablob
+
+# Run plain writes one by one, like the code handler, over memory filled with 0xEE
+def run_writes(gecko_commands, addr = 0x80003000, size = 0x1000):
+    memory = bytearray(b"\xEE" * size)
+    for gecko_command in gecko_commands:
+        for write_addr, data in gecko_command_writes(gecko_command):
+            memory[write_addr-addr:write_addr-addr+len(data)] = data
+    return bytes(memory)
+
+def codetypes(gecko_commands):
+    return ["{:02X}".format(next(gecko_command_chunks(gecko_command))[0]) for gecko_command in gecko_commands]
+
+def test_optimize_later_writes_win():
+    gecko_commands = optimize_gecko_commands([Write32(0x11111111, 0x80003100), Write8(0x22, 0x80003101), Write16(0x3333, 0x80003100)])
+    assert [gecko_command.as_bytes().hex() for gecko_command in gecko_commands] == ["0400310033331111"]
+
+@pytest.mark.parametrize("addr, data, expected", [
+    (0x80003100, bytes.fromhex("12"),                         ["00"]),
+    (0x80003100, bytes.fromhex("1234"),                       ["02"]),
+    (0x80003100, bytes.fromhex("12345678"),                   ["04"]),
+    (0x80003102, bytes.fromhex("12345678"),                   ["06"]),
+    (0x80003100, bytes.fromhex("12345678abcdef01cafe"),       ["06"]),
+    (0x80003100, b"\xAB" * 0x40,                              ["00"]),
+    (0x80003100, b"\xAB\xCD" * 0x40,                          ["02"]),
+    (0x80003101, b"\xAB" * 0x20000,                           ["00", "00"]),
+    # Pointer tables with a fixed stride
+    (0x80003100, b"".join((0x80400000 + i*0x20).to_bytes(4, "big") for i in range(16)), ["08"]),
+])
+def test_encode_run_codetypes(addr, data, expected):
+    gecko_commands = encode_run(addr, data)
+    assert codetypes(gecko_commands) == expected
+    assert run_writes(gecko_commands, addr, len(data)) == data
+
+def test_optimize_keeps_gaps():
+    # Writes with memory between them stay apart, so the gap is never written
+    gecko_commands = optimize_gecko_commands([Write32(0x11111111, 0x80003100), Write32(0x22222222, 0x80003108)])
+    assert codetypes(gecko_commands) == ["04", "04"]
+    assert run_writes(gecko_commands)[0x100:0x10C].hex() == "11111111" "eeeeeeee" "22222222"
+    # Long zero runs inside a run become fills of their own
+    gecko_commands = optimize_gecko_commands([WriteString(b"\x01" * 8 + bytes(0x40) + b"\x02" * 8, 0x80003100)])
+    assert codetypes(gecko_commands) == ["00", "00", "00"]
+
+def test_optimize_applies_the_same():
+    rng = random.Random(1)
+    gecko_commands = [WriteString(bytes(rng.choice((0, rng.getrandbits(8))) for i in range(0x200)), 0x80003200)]
+    for i in range(200):
+        addr = 0x80003000 + rng.randrange(0, 0x800, 4)
+        kind = rng.randrange(5)
+        if kind == 0:
+            gecko_commands.append(Write8(rng.getrandbits(8), addr + rng.randrange(4), rng.randrange(8)))
+        elif kind == 1:
+            gecko_commands.append(Write16(rng.getrandbits(16), addr + rng.choice((0, 2)), rng.randrange(4)))
+        elif kind == 2:
+            gecko_commands.append(Write32(rng.getrandbits(32), addr))
+        elif kind == 3:
+            gecko_commands.append(WriteString(bytes(rng.getrandbits(8) for i in range(rng.randrange(1, 40))), addr + rng.randrange(4)))
+        else:
+            gecko_commands.append(WriteSerial(rng.getrandbits(32), addr, rng.randrange(8), valueSize = 2, addrInc = 4, valueInc = 8))
+    optimized = optimize_gecko_commands(gecko_commands)
+    assert run_writes(optimized) == run_writes(gecko_commands)
+    assert gecko_code_size(optimized) < gecko_code_size(gecko_commands)
+
+@pytest.mark.parametrize("optimize, expected", [
+    (False, ["* Hooks", "C6003104 80003200", "C6003100 80003200"]),
+    # Two branches to one target make a serial write going down by 4
+    (True, ["* Program Data and Hooks", "08003100 48000100", "20010004 FFFFFFFC"]),
+])
+def test_build_gecko_optimize(project_dir, optimize, expected):
+    project = Project(base_addr = 0x80400000)
+    project.symbols = {"foo" : {'st_value' : 0x80003200}}
+    project.hook_branch(0x80003104, "foo")
+    project.hook_branch(0x80003100, "foo")
+    project.build_gecko("out.txt", optimize = optimize)
+    with open("out.txt") as f:
+        lines = f.read().splitlines()
+    assert lines[2:] == expected
+
+def make_dol(sections):
+    header = bytearray(0x100)
+    offset = 0x100
+    for i, (addr, size) in enumerate(sections):
+        struct.pack_into(">I", header, 0x00 + i*4, offset)
+        struct.pack_into(">I", header, 0x48 + i*4, addr)
+        struct.pack_into(">I", header, 0x90 + i*4, size)
+        offset += size
+    return DolFile(BytesIO(bytes(header) + b"\xEE" * (offset - 0x100)))
+
+def test_merge_writes_later_wins():
+    gecko_commands = [
+        WriteString(bytes(range(1, 21)), 0x80003101),
+        Write8(0xAA, 0x80003100, 3),
+        Write16(0xBBBB, 0x80003102, 1),
+        Write32(0xCCCCCCCC, 0x80003108),
+        # Serial writes with gaps between their elements
+        WriteSerial(0xDD, 0x80003103, 3, valueSize = 0, addrInc = 2, valueInc = 1),
+        WriteString(b"\x77", 0x80003115),
+        Write32(0x12345678, 0x80003120),
+    ]
+    runs = merge_writes(gecko_code_writes([gecko_commands]))
+    assert [(hex(addr), len(data)) for addr, data in runs] == [("0x80003100", 0x16), ("0x80003120", 4)]
+    memory = bytearray(b"\xEE" * 0x1000)
+    for addr, data in runs:
+        memory[addr-0x80003000:addr-0x80003000+len(data)] = data
+    assert bytes(memory) == run_writes(gecko_commands)
+
+def test_apply_runs_skips_unmapped():
+    dol = make_dol([(0x80003100, 0x100), (0x80003300, 0x100)])
+    with SectionBuffers(dol) as buffers:
+        written = apply_runs(buffers, [(0x800031F0, bytes(i & 0xFF for i in range(0x120))), (0x80000000, b"\x01" * 4), (0x80003400, b"\x02" * 4)])
+    assert written == 0x20
+    dol.seek(0x800031F0)
+    assert dol.read(0x10) == bytes(range(0x10))
+    dol.seek(0x80003300)
+    assert dol.read(0x14) == bytes(range(0x10, 0x20)) + b"\xEE" * 4
+
+def c2_code(addr, lines):
+    data = bytes.fromhex("C2{:06X}{:08X}".format(addr & 0xFFFFFF, lines)) + bytes.fromhex("60000000") * (lines*2 - 1) + bytes(4)
+    return GeckoCommand.bytes_to_geckocommand(BytesIO(data))
+
+def test_pack_trampolines_first_fit():
+    inserts = [c2_code(0x80003100, 1), c2_code(0x80003104, 3), c2_code(0x80003108, 1), c2_code(0x8000310C, 2)]
+    # 24 bytes start a line, then 16 don't fit the 8 left so start the next, and the 8s fill the gaps
+    assert pack_trampolines(inserts) == ([24, 0, 48, 32], 56)
+
+def test_pack_trampolines_superseded():
+    inserts = [c2_code(0x80003100, 2), c2_code(0x80003104, 1), c2_code(0x80003100, 1)]
+    assert pack_trampolines(inserts) == ([None, 0, 8], 16)
+    assert pack_trampolines([]) == ([], 0)
+
+def test_pack_trampolines_cache_lines():
+    rng = random.Random(2)
+    inserts = [c2_code(0x80003100 + i*4, rng.randint(1, 6)) for i in range(40)]
+    offsets, size = pack_trampolines(inserts)
+    spans = sorted((offset, offset + len(gecko_command.value)) for offset, gecko_command in zip(offsets, inserts))
+    assert all(end <= start for (_, end), (start, _) in zip(spans, spans[1:]))
+    assert size == spans[-1][1]
+    for offset, gecko_command in zip(offsets, inserts):
+        length = len(gecko_command.value)
+        # Trampolines that fit in a cache line never straddle two, and longer ones start on a line
+        if length <= CacheLineSize:
+            assert offset // CacheLineSize == (offset + length - 1) // CacheLineSize
+        else:
+            assert offset % CacheLineSize == 0
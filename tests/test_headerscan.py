@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from dol_c_kit import HeaderIndex, LDPlusPlus, ABI, MangleError
+
+GameHeader = os.path.join(os.path.dirname(__file__), "headers", "game.h")
+
+# Symbols from g++, with every function in game.h defined
+ItaniumSymbols = {
+    "zen::Vector3f::$$ctor()"                        : "_ZN3zen8Vector3fC1Ev",
+    "zen::Vector3f::$$ctor(f32, f32, f32)"           : "_ZN3zen8Vector3fC1Efff",
+    "zen::Vector3f::$$ctor(const zen::Vector3f&)"    : "_ZN3zen8Vector3fC1ERKS0_",
+    "zen::Vector3f::$$dtor"                          : "_ZN3zen8Vector3fD1Ev",
+    "zen::Vector3f::operator ="                      : "_ZN3zen8Vector3faSERKS0_",
+    "zen::Vector3f::operator =="                     : "_ZNK3zen8Vector3feqERKS0_",
+    "zen::Vector3f::operator - $$unary"              : "_ZNK3zen8Vector3fngEv",
+    "zen::Vector3f::operator -"                      : "_ZNK3zen8Vector3fmiERKS0_",
+    "zen::Vector3f::operator []"                     : "_ZN3zen8Vector3fixEi",
+    "zen::Vector3f::length"                          : "_ZNK3zen8Vector3f6lengthEv",
+    "zen::Vector3f::scale(float)"                    : "_ZN3zen8Vector3f5scaleEf",
+    "zen::Vector3f::scale(const zen::Vec&)"          : "_ZN3zen8Vector3f5scaleERKS0_",
+    "zen::Vector3f::count"                           : "_ZN3zen8Vector3f5countE",
+    "zen::math::cross"                               : "_ZN3zen4math5crossERKNS_8Vector3fES3_",
+    "zen::math::round"                               : "_ZN3zen4math5roundEf",
+    "zen::frames"                                    : "_ZN3zen6framesE",
+    "OSReport"                                       : "OSReport",
+    "OSGetTick"                                      : "OSGetTick",
+    "OSAlloc"                                        : "OSAlloc",
+}
+
+MacintoshSymbols = {
+    "zen::Vector3f::$$ctor(f32, f32, f32)"           : "__ct__Q23zen8Vector3fFfff",
+    "zen::Vector3f::$$dtor"                          : "__dt__Q23zen8Vector3fFv",
+    "zen::Vector3f::operator =="                     : "__eq__Q23zen8Vector3fCFRCQ23zen8Vector3f",
+    "zen::Vector3f::length"                          : "length__Q23zen8Vector3fCFv",
+    "zen::math::round"                               : "round__Q23zen4mathFf",
+    "OSAlloc"                                        : "OSAlloc",
+}
+
+@pytest.fixture(scope = "module")
+def index():
+    index = HeaderIndex()
+    index.add_header(GameHeader)
+    return index
+
+@pytest.mark.parametrize("abi, symbols", [
+    (ABI.Itanium, ItaniumSymbols),
+    (ABI.Macintosh, MacintoshSymbols),
+])
+def test_assign_headers(index, tmp_path, abi, symbols):
+    addresses = {name : 0x80003100 + i*4 for i, name in enumerate(symbols)}
+    ld = LDPlusPlus(abi)
+    assert ld.assign_headers(index, addresses) == []
+    ld.save(str(tmp_path / "symbols.ld"))
+    with open(tmp_path / "symbols.ld") as f:
+        assert f.read().splitlines() == ["{} = {};".format(symbols[name], hex(value)) for name, value in addresses.items()]
+
+@pytest.mark.parametrize("name, prototype", [
+    ("zen::Vector3f::$$ctor(f32, f32, f32)",         "zen::Vector3f::$$ctor(float, float, float)"),
+    ("zen::math::cross",                             "zen::math::cross(const zen::Vector3f &, const zen::Vector3f &)"),
+    ("zen::math::round",                             "zen::math::round(float)"),
+    ("zen::Vector3f::operator -()",                  "zen::Vector3f::operator - $$unary() const"),
+    ("zen::Vector3f::length() const",                "zen::Vector3f::length() const"),
+])
+def test_typedefs_resolve(index, name, prototype):
+    assert index.lookup(name) == (prototype, False)
+
+def test_extern_c(index):
+    assert index.lookup("OSReport") == ("OSReport", True)
+    assert index.lookup("OSReport(const char*, ...)") == ("OSReport", True)
+
+@pytest.mark.parametrize("name, message", [
+    ("zen::Vector3f::scale",                         "overloaded"),
+    ("zen::Vector3f::$$ctor",                        "overloaded"),
+    ("zen::Vector3f::x",                             "isn't declared"),
+    ("zen::missing",                                 "isn't declared"),
+])
+def test_lookup_errors(index, name, message):
+    with pytest.raises(MangleError, match = message):
+        index.lookup(name)
@@ -0,0 +1,103 @@
+import pytest
+
+from dol_c_kit import Project
+from conftest import read_dol
+
+def make_project():
+    project = Project(base_addr = 0x80400000)
+    project.symbols = {"foo" : {'st_value' : 0x80003200}}
+    return project
+
+# Whichever hook is declared last wins, whatever kind of hook it is
+@pytest.mark.parametrize("string_last, expected", [
+    (True, "41424300"),
+    (False, "48000100"),
+])
+def test_hooks_apply_in_declaration_order(project_dir, string_last, expected):
+    project = make_project()
+    if string_last:
+        project.hook_branch(0x80003100, "foo")
+        project.hook_string(0x80003100, "ABC")
+    else:
+        project.hook_string(0x80003100, "ABC")
+        project.hook_branch(0x80003100, "foo")
+    project.hook_pointer(0x80003108, "foo")
+    project.build_dol("in.dol", "out.dol")
+    assert read_dol("out.dol", 0x80003100, 12).hex() == expected + "0000000080003200"
+
+@pytest.mark.parametrize("string_last, expected", [
+    (True, "04003100 41424300"),
+    (False, "04003100 48000100"),
+])
+def test_gecko_hooks_apply_in_declaration_order(project_dir, string_last, expected):
+    project = make_project()
+    if string_last:
+        project.hook_branch(0x80003100, "foo")
+        project.hook_string(0x80003100, "ABC")
+    else:
+        project.hook_string(0x80003100, "ABC")
+        project.hook_branch(0x80003100, "foo")
+    # Merging writes mustn't reorder them
+    project.build_gecko("out.txt", optimize = True)
+    with open("out.txt") as f:
+        assert expected in f.read().splitlines()
+
+# Bad modifiers are caught where the hook is declared, not dropped at build time
+@pytest.mark.parametrize("modifier", ["@hi", "", None])
+def test_unknown_modifier(modifier):
+    project = make_project()
+    with pytest.raises(RuntimeError, match = "Unknown modifier"):
+        project.hook_immediate16(0x80003102, "foo", modifier)
+    with pytest.raises(RuntimeError, match = "Unknown modifier"):
+        project.hook_immediate12(0x80003102, 0, 0, "foo", modifier)
+    assert len(project.symbol_hooks) == 0
+
+def fill_dol(path):
+    with open(path, "r+b") as f:
+        f.seek(0x100)
+        f.write(b"\xFF" * 0x1000)
+
+def test_file_hooks(project_dir, capsys):
+    fill_dol("in.dol")
+    with open("a.bin", "wb") as f:
+        f.write(bytes(range(1, 33)))
+    open("empty.bin", "wb").close()
+    project = make_project()
+    project.hook_file(0x80003100, "a.bin", 4, 8)
+    project.hook_file(0x80003108, "a.bin", -4)
+    project.hook_file(0x80003110, "a.bin", 8, -20)
+    project.hook_file(0x80003118, "a.bin", 8, 4)
+    project.hook_file(0x80003120, "empty.bin")
+    project.hook_file(0x80003128, "empty.bin", max_size = 4)
+    project.hook_file(0x80003130, "a.bin", 0, 4, max_size = 8)
+    # Files too large are written whole, with a warning
+    project.hook_file(0x80003140, "a.bin", max_size = 8)
+    project.hook_file(0x80003160, "missing.bin")
+    project.build_dol("in.dol", "out.dol")
+    assert read_dol("out.dol", 0x80003100, 0x68).hex() == \
+        "05060708" "ffffffff" "1d1e1f20" "ffffffff" "090a0b0c" "ffffffff" "ffffffff" "ffffffff" \
+        "ffffffff" "ffffffff" "00000000" "ffffffff" "0102030400000000" "ffffffffffffffff" \
+        + bytes(range(1, 33)).hex() + "ffffffff" * 2
+    out = capsys.readouterr().out
+    assert "Warning: \"a.bin\" exceeds 8 bytes!" in out
+    assert "Warning: \"missing.bin\" could not be opened!" in out
+
+def test_file_hooks_share_mappings(project_dir):
+    with open("a.bin", "wb") as f:
+        f.write(bytes(range(1, 33)))
+    project = make_project()
+    project.hook_file(0x80003100, "a.bin", 0, 4)
+    project.hook_file(0x80003108, "a.bin", -4)
+    hooks = project.hooks
+    for hook in hooks:
+        hook.resolve(project.symbols)
+    # The file is mapped once, and each hook only reads its own range
+    assert len(project.file_mappings.mappings) == 1
+    assert hooks[0].mapping is hooks[1].mapping
+    assert [hook.read() for hook in hooks] == [bytes((1, 2, 3, 4)), bytes((29, 30, 31, 32))]
+    project.file_mappings.close()
+    # Builds close their mappings when they're done
+    project.build_gecko("out.txt")
+    assert project.file_mappings.mappings == {}
+    with open("out.txt") as f:
+        assert f.read().splitlines()[3:7] == ["06003100 00000004", "01020304 00000000", "06003108 00000004", "1D1E1F20 00000000"]
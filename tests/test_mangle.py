@@ -0,0 +1,124 @@
+import importlib
+import json
+
+import pytest
+
+from dol_c_kit.mangle import ABI, MangleError, MangleCache, mangle_signature, mangle_many, demangle
+
+# dol_c_kit.mangle is also the name of a function in the package
+mangle = importlib.import_module("dol_c_kit.mangle")
+
+# Symbols from g++
+@pytest.mark.parametrize("prototype, symbol", [
+    ("void f1(const A&, const A*)",           "_Z2f1RK1APS0_"),
+    ("void f2(const A, B, B*)",               "_Z2f21A1BPS0_"),
+    ("void f3(X<const int>, X<int>)",         "_Z2f31XIKiES_IiE"),
+    ("A::f() const",                          "_ZNK1A1fEv"),
+    ("void f5(long long int*, __int64*)",     "_Z2f5PxS_"),
+    ("void f6(int*, signed int*)",            "_Z2f6PiS_"),
+    ("void f7(long double*, __float80*)",     "_Z2f7PeS_"),
+    ("A::operator [](int)",                   "_ZN1AixEi"),
+    ("int& A::operator [](int)",              "_ZN1AixEi"),
+    ("long long A::f() const",                "_ZNK1A1fEv"),
+    ("unsigned long A::f() const",            "_ZNK1A1fEv"),
+    ("void f(unsigned long, long long, unsigned, signed, wchar_t, const wchar_t*)", "_Z1fmxjiwPKw"),
+    ("void ns::Tpl<int>::run(const Tpl2<Foo, Foo>**, Tpl2<Foo, Foo>)",              "_ZN2ns3TplIiE3runEPPK4Tpl2I3FooS3_ES4_"),
+    ("void ns::Tpl<int>::go(ns::Tpl<int>, ns::Tpl<float>, Foo)",                    "_ZN2ns3TplIiE2goES1_NS0_IfEE3Foo"),
+    ("void ns::in::A::h(ns::Tpl<int>, std::X<int>, std::X<int>, ns::Tpl<int>*)",   "_ZN2ns2in1A1hENS_3TplIiEESt1XIiES5_PS3_"),
+    ("void f(std::X<int>, std::X<int>, std::X<float>)",                              "_Z1fSt1XIiES0_S_IfE"),
+    ("void g(ns::Tpl<ns::Tpl<int> >, ns::Tpl<int>)",                                 "_Z1gN2ns3TplINS0_IiEEEES1_"),
+])
+def test_itanium_mangle(prototype, symbol):
+    assert mangle_signature(prototype, ABI.Itanium) == symbol
+
+@pytest.mark.parametrize("prototype, symbol", [
+    ("void f(signed char)",                   "f__FSc"),
+    ("A::f() const",                          "f__1ACFv"),
+    ("int MyGlobal",                          "MyGlobal"),
+])
+def test_macintosh_mangle(prototype, symbol):
+    assert mangle_signature(prototype, ABI.Macintosh) == symbol
+
+@pytest.mark.parametrize("prototype", [
+    "int f() const",
+    "unsigned long f() const",
+])
+def test_const_function_isnt_a_method(prototype):
+    for abi in (ABI.Itanium, ABI.Macintosh):
+        with pytest.raises(MangleError):
+            mangle_signature(prototype, abi)
+
+# Symbols from g++, which demangle to what c++filt gives, spelled the way the mangler reads it
+@pytest.mark.parametrize("symbol, prototype", [
+    ("_Z2f2PKcPKS0_yeawb",                       "f2(char const*, char const* const*, unsigned long long int, long double, signed char, wchar_t, bool)"),
+    ("_ZN2ns3TplIiE3runEPPK4Tpl2I3FooS3_ES4_",   "ns::Tpl<int>::run(Tpl2<Foo, Foo> const**, Tpl2<Foo, Foo>)"),
+    ("_ZN2ns3TplIiE2goES1_NS0_IfEE3Foo",         "ns::Tpl<int>::go(ns::Tpl<int>, ns::Tpl<float>, Foo)"),
+    ("_Z1fSt1XIiES0_S_IfE",                      "f(std::X<int>, std::X<int>, std::X<float>)"),
+    ("_ZNK1A1fEv",                               "A::f() const"),
+    ("_ZN1AixEi",                                "A::operator [](int)"),
+])
+def test_itanium_demangle(symbol, prototype):
+    assert demangle(symbol, ABI.Itanium) == prototype
+    assert mangle_signature(prototype, ABI.Itanium) == symbol
+
+@pytest.mark.parametrize("symbol, abi", [
+    ("_Z1fPFviE", ABI.Itanium),
+    ("f__FPFi_v", ABI.Macintosh),
+])
+def test_demangle_function_pointer(symbol, abi):
+    with pytest.raises(MangleError, match = "aren't supported"):
+        demangle(symbol, abi)
+
+def test_mangle_cache_lru():
+    cache = MangleCache(maxsize = 2)
+    assert cache.mangle("void a()", ABI.Itanium) == "_Z1av"
+    cache.mangle("void b()", ABI.Itanium)
+    # Whitespace is normalised, and a hit makes a the most recently used
+    assert cache.mangle(" void  a()", ABI.Itanium) == "_Z1av"
+    cache.mangle("void c()", ABI.Itanium)
+    assert list(cache.entries) == [("void a()", ABI.Itanium), ("void c()", ABI.Itanium)]
+    assert (cache.hits, cache.misses) == (1, 3)
+
+def test_mangle_cache_save_load(tmp_path, capsys):
+    path = str(tmp_path / "symbols.cache")
+    cache = MangleCache()
+    cache.mangle("void a()", ABI.Itanium)
+    cache.mangle("void a()", ABI.Macintosh)
+    cache.save(path)
+    loaded = MangleCache()
+    loaded.load(path)
+    assert loaded.entries == cache.entries
+    assert (loaded.hits, loaded.misses) == (0, 0)
+    # Caches from another version of the mangler are ignored, and so are missing ones
+    with open(path) as f:
+        saved = json.load(f)
+    saved["version"] = MangleCache.Version - 1
+    with open(path, "w") as f:
+        json.dump(saved, f)
+    loaded = MangleCache()
+    loaded.load(path)
+    loaded.load(str(tmp_path / "missing.cache"))
+    assert len(loaded) == 0
+    assert capsys.readouterr().out == ""
+    with open(path, "w") as f:
+        f.write("{")
+    loaded.load(path)
+    assert "is not a valid mangle cache" in capsys.readouterr().out
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_mangle_many(monkeypatch, jobs):
+    monkeypatch.setattr(mangle, "mangle_cache", MangleCache())
+    monkeypatch.setattr(mangle, "MangleChunkSize", 3)
+    mangle.mangle_cache.mangle("void cached()", ABI.Itanium)
+    prototypes = ["void f{}()".format(i) if i % 4 else "void f{}(".format(i) for i in range(20)] + ["void cached()", "::"]
+    symbols = list(mangle_many(iter(prototypes), ABI.Itanium, jobs))
+    assert len(symbols) == len(prototypes)
+    for i, symbol in enumerate(symbols[:20]):
+        if i % 4:
+            assert symbol == "_Z{}f{}v".format(len(str(i)) + 1, i)
+        else:
+            assert isinstance(symbol, MangleError)
+    assert symbols[20] == "_Z6cachedv"
+    assert isinstance(symbols[21], MangleError) and "Could not parse" in str(symbols[21])
+    # Failures aren't cached
+    assert len(mangle.mangle_cache) == 16
@@ -0,0 +1,96 @@
+import pytest
+
+from dolreader.dol import DolFile
+
+from dol_c_kit import Project, encode_relocation, apply_relocations
+from dol_c_kit import R_PPC_ADDR32, R_PPC_ADDR16_LO, R_PPC_ADDR16_HI, R_PPC_ADDR16_HA, R_PPC_REL24, R_PPC_REL14
+from dol_c_kit import R_PPC_SDAREL16, R_PPC_EMB_SDA21, PS12_LO, PS12_HI, PS12_HA, PS12_SDAREL, PS12_SDA2REL
+from conftest import write_dol, read_dol
+
+SDABase = 0x80500000
+SDA2Base = 0x80510000
+
+@pytest.mark.parametrize("r_type, value, expected", [
+    (R_PPC_ADDR32,      0x80408010, (4, 0xFFFFFFFF, 0x80408010)),
+    (R_PPC_ADDR16_LO,   0x80408010, (2, 0xFFFF, 0x8010)),
+    (R_PPC_ADDR16_HI,   0x80408010, (2, 0xFFFF, 0x8040)),
+    # HA carries once the low half is 0x8000 or more, since it's added sign extended
+    (R_PPC_ADDR16_HA,   0x80407FFF, (2, 0xFFFF, 0x8040)),
+    (R_PPC_ADDR16_HA,   0x80408000, (2, 0xFFFF, 0x8041)),
+    (R_PPC_ADDR16_HA,   0xFFFF8000, (2, 0xFFFF, 0x0000)),
+    (R_PPC_REL24,       0x80003200, (4, 0x03FFFFFC, 0x00000100)),
+    (R_PPC_REL24,       0x80003000, (4, 0x03FFFFFC, 0x03FFFF00)),
+    (R_PPC_REL14,       0x800030F0, (4, 0x0000FFFC, 0x0000FFF0)),
+    (R_PPC_SDAREL16,    0x804FFFF0, (2, 0xFFFF, 0xFFF0)),
+    # EMB_SDA21 picks r13, r2 or r0 along with the offset
+    (R_PPC_EMB_SDA21,   0x80500010, (4, 0x1FFFFF, 0xD0010)),
+    (R_PPC_EMB_SDA21,   0x8050FFF0, (4, 0x1FFFFF, 0x2FFF0)),
+    (R_PPC_EMB_SDA21,   0x80517FF0, (4, 0x1FFFFF, 0x27FF0)),
+    (R_PPC_EMB_SDA21,   0x00000100, (4, 0x1FFFFF, 0x00100)),
+    (PS12_LO,           0x01230456, (2, 0xFFF, 0x456)),
+    (PS12_HI,           0x01230456, (2, 0xFFF, 0x123)),
+    (PS12_HA,           0x01238800, (2, 0xFFF, 0x124)),
+    (PS12_SDAREL,       0x804FFFF8, (2, 0xFFF, 0xFF8)),
+    (PS12_SDA2REL,      0x80510010, (2, 0xFFF, 0x010)),
+])
+def test_encode_relocation(r_type, value, expected):
+    assert encode_relocation(r_type, 0x80003100, value, SDABase, SDA2Base) == expected
+
+@pytest.mark.parametrize("r_type, value, sda_base, message", [
+    (R_PPC_REL24,       0x80003100 + 0x2000000, SDABase, "too large"),
+    (R_PPC_REL24,       0x80003100 - 0x2000004, SDABase, "too large"),
+    (R_PPC_REL14,       0x80003100 + 0x8000,    SDABase, "too large"),
+    (R_PPC_REL24,       0x80003102,             SDABase, "misaligned"),
+    (PS12_LO,           0x80400800,             SDABase, "too large"),
+    (PS12_SDAREL,       0x80500010,             None,    "_SDA_BASE_"),
+    (R_PPC_EMB_SDA21,   0x80600000,             SDABase, "too large"),
+])
+def test_encode_relocation_errors(r_type, value, sda_base, message):
+    with pytest.raises(RuntimeError, match = message):
+        encode_relocation(r_type, 0x80003100, value, sda_base, SDA2Base)
+
+def test_apply_relocations(tmp_path):
+    path = str(tmp_path / "in.dol")
+    write_dol(path)
+    with open(path, "r+b") as f:
+        f.seek(0x100)
+        f.write(bytes.fromhex("48000001" "3C600000" "E0230000" "FFFFFFFF"))
+    with open(path, "rb") as f:
+        dol = DolFile(f)
+        results = apply_relocations(dol, [
+            (R_PPC_REL24, 0x80003100, 0x80003200),
+            (R_PPC_ADDR16_HA, 0x80003106, 0x80408000),
+            # Paired single displacements keep W and I
+            (PS12_LO, 0x8000310A, 0x80400010),
+            (R_PPC_ADDR32, 0x8000310C, 0x80400000, 0),
+            (R_PPC_ADDR32, 0x90000000, 0x80400000),
+        ], SDABase, SDA2Base)
+        dol.seek(0x80003100)
+        assert dol.read(16).hex() == "48000101" "3c608041" "e0230010" "80400000"
+    assert results == [True, True, True, True, False]
+
+# The relocation engine replaced one hook class per kind.  These are the bytes the old classes
+# wrote over a DOL filled with 0xFF.
+def test_immediate_hooks_match_old_hooks(project_dir):
+    with open("in.dol", "r+b") as f:
+        f.seek(0x100)
+        f.write(b"\xFF" * 0x1000)
+    project = Project(base_addr = 0x80400000)
+    project.set_sda_bases(SDABase, SDA2Base)
+    project.symbols = {"foo"         : {'st_value' : 0x80408010},
+                       "small"       : {'st_value' : 0x01230456},
+                       "sda"         : {'st_value' : 0x80500010},
+                       "sda2"        : {'st_value' : 0x80510020},
+                       "_SDA_BASE_"  : {'st_value' : SDABase},
+                       "_SDA2_BASE_" : {'st_value' : SDA2Base}}
+    addr = 0x80003100
+    for sym_name, modifier in (("foo", "@h"), ("foo", "@l"), ("foo", "@ha"), ("small", "@ha"), ("sda", "@sda"), ("sda2", "@sda2")):
+        project.hook_immediate16(addr + 2, sym_name, modifier)
+        addr += 4
+    for sym_name, modifier in (("small", "@h"), ("small", "@l"), ("small", "@ha"), ("sda", "@sda"), ("sda2", "@sda2")):
+        project.hook_immediate12(addr + 2, 5, 1, sym_name, modifier)
+        addr += 4
+    project.build_dol("in.dol", "out.dol")
+    assert read_dol("out.dol", 0x80003100, addr - 0x80003100).hex() == \
+        "ffff8040" "ffff8010" "ffff8041" "ffff0123" "ffff0010" "ffff0020" \
+        "ffffb123" "ffffb456" "ffffb123" "ffffb010" "ffffb020"
@@ -0,0 +1,52 @@
+import pytest
+
+from dol_c_kit import Project, assemble_branch, assemble_far_branch
+from dol_c_kit.devkit_tools import veneer_target
+from conftest import read_dol
+
+def test_veneer_target():
+    veneers = {0x90001000 : 0x80400000}
+    assert veneer_target(0x80003100, 0x80003200, veneers) == 0x80003200
+    assert veneer_target(0x80003100, 0x90001000, veneers) == 0x80400000
+
+def test_veneer_out_of_range():
+    with pytest.raises(RuntimeError, match = "can't reach 90001000, nor its veneer at 90000F00"):
+        veneer_target(0x80003100, 0x90001000, {0x90001000 : 0x90000F00})
+
+def make_project(base_addr):
+    project = Project(base_addr = base_addr)
+    project.symbols = {"far" : {'st_value' : 0x90001000}}
+    return project
+
+def test_far_branch_hook(project_dir):
+    project = make_project(0x80400000)
+    project.hook_branchlink(0x80003100, "far")
+    project.build_dol("in.dol", "out.dol")
+    assert read_dol("out.dol", 0x80003100, 4) == assemble_branch(0x80003100, 0x80400000, LK = True)
+    assert read_dol("out.dol", 0x80400000, 16) == assemble_far_branch(0x90001000)
+
+def test_far_branch_hook_unreachable_veneer(project_dir):
+    project = make_project(0x90000000)
+    project.hook_branchlink(0x80003100, "far")
+    with pytest.raises(RuntimeError, match = "can't reach 90001000"):
+        project.build_dol("in.dol", "out.dol")
+    assert not (project_dir / "out.dol").exists()
+
+def add_c2_code(project, project_dir):
+    with open(project_dir / "codes.txt", "w") as f:
+        f.write("[Gecko]\n$Insert\nC2003104 00000001\n60000000 00000000\n")
+    project.add_gecko_txt_file("codes.txt")
+
+def test_c2_trampoline(project_dir):
+    project = make_project(0x80400000)
+    add_c2_code(project, project_dir)
+    project.build_dol("in.dol", "out.dol")
+    assert read_dol("out.dol", 0x80003104, 4) == assemble_branch(0x80003104, 0x80400000)
+    assert read_dol("out.dol", 0x80400004, 4) == assemble_branch(0x80400004, 0x80003108)
+
+# A C2 code can't go through a veneer, which would clobber r12 and ctr
+def test_c2_trampoline_out_of_range(project_dir):
+    project = make_project(0x90000000)
+    add_c2_code(project, project_dir)
+    with pytest.raises(RuntimeError, match = "C2 code at 80003104 can't reach its trampoline at 90000000"):
+        project.build_dol("in.dol", "out.dol")